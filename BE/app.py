@@ -1,3 +1,4 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -7,6 +8,11 @@ from BE.controller.ai_controller import ai_router
 from BE.controller.intent_controller import router as intent_router
 from BE.controller.context_controller import context_router
 from BE.utils.config import env
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.index_manager import index_manager
+from BE.repository.conservation_repo import ConservationRepository
+from BE.service.conservation_service import ConservationService
+from BE.utils.providers import lazy, provider_stats, warm_up
 
 
 def create_app() -> FastAPI:
@@ -38,6 +44,63 @@ def create_app() -> FastAPI:
     app.include_router(intent_router, prefix=env.PREFIX_API)
     app.include_router(context_router, prefix=env.PREFIX_API)
     
+    # Services/clients are created lazily on first use; create them here (in a worker
+    # thread) so the first request does not pay for it. Import never touches the network.
+    @app.on_event("startup")
+    async def warm_up_providers():
+        if not env.WARM_UP_PROVIDERS:
+            return
+        errors = await asyncio.to_thread(warm_up)
+        for name, error in errors.items():
+            if error:
+                print(f"Warning: could not initialize {name}: {error}")
+    
+    # Create repository indexes on startup (idempotent, does not block the event loop)
+    @app.on_event("startup")
+    async def ensure_mongo_indexes():
+        if not env.MONGO_ENSURE_INDEXES:
+            return
+        try:
+            await asyncio.to_thread(index_manager.ensure_indexes)
+        except Exception as e:
+            print(f"Warning: could not create MongoDB indexes: {str(e)}")
+    
+    # Resume cascade deletes interrupted by a restart (runs in a worker thread)
+    @app.on_event("startup")
+    async def resume_cascade_deletes():
+        async def resume():
+            try:
+                await asyncio.to_thread(lazy(ConservationService).resume_cascade_deletes)
+            except Exception as e:
+                print(f"Warning: could not resume cascade deletes: {str(e)}")
+        app.state.cascade_delete_resumer = asyncio.create_task(resume())
+    
+    # Recompute drifted conservation messageCount periodically (writes without a replica set
+    # are not transactional, and messages deleted outside the service never decrement)
+    async def reconcile_message_counts_periodically():
+        repo = ConservationRepository()
+        while True:
+            await asyncio.sleep(env.MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS)
+            try:
+                result = await asyncio.to_thread(repo.reconcile_message_counts)
+                if result["fixed"]:
+                    print(f"Reconciled messageCount of {result['fixed']}/{result['checked']} conservation(s)")
+            except Exception as e:
+                print(f"Warning: could not reconcile message counts: {str(e)}")
+    
+    @app.on_event("startup")
+    async def start_message_count_reconciler():
+        if env.MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS > 0:
+            app.state.message_count_reconciler = asyncio.create_task(reconcile_message_counts_periodically())
+    
+    # Close shared MongoDB connection pool on shutdown
+    @app.on_event("shutdown")
+    async def close_mongo_connections():
+        reconciler = getattr(app.state, "message_count_reconciler", None)
+        if reconciler is not None:
+            reconciler.cancel()
+        mongo_manager.close()
+    
     # Root endpoint
     @app.get("/", tags=["Root"])
     async def root():
@@ -69,7 +132,8 @@ def create_app() -> FastAPI:
         """Health check endpoint"""
         return {
             "status": "healthy",
-            "service": env.APP_NAME
+            "service": env.APP_NAME,
+            "providers": provider_stats()
         }
     
     return app
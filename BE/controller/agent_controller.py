@@ -1,25 +1,35 @@
 """
 Agent Controller - API endpoints cho Agent Orchestration
 """
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
 
 from BE.model.orchestration_models import (
     AgentRequest,
     AgentResponse,
     SessionCreateRequest,
     SessionResponse,
+    SessionListResponse,
     ContextParseRequest,
     ContextParseResponse
 )
 from BE.service.agent_orchestration_service import AgentOrchestrationService
+from BE.repository.session_cache import session_cache
+from BE.service.local_intent_classifier import local_intent_classifier
+from BE.utils.llm_cache import llm_cache
+from BE.utils.gemini_client import gemini_ai
+from BE.utils.structured_output import json_parse_metrics
+from BE.utils.async_utils import run_until_disconnected
+from BE.utils.sse import SSE_HEADERS, sse_stream
+from BE.utils.providers import lazy
 
 
 # Create router
 agent_router = APIRouter(prefix="/agent", tags=["Agent Orchestration"])
 
 # Initialize service
-agent_service = AgentOrchestrationService()
+agent_service = lazy(AgentOrchestrationService)
 
 
 # ==================== SESSION ENDPOINTS ====================
@@ -30,8 +40,8 @@ agent_service = AgentOrchestrationService()
     summary="Create New Session",
     description="Tạo session mới cho user để bắt đầu làm việc"
 )
-async def create_session(request: SessionCreateRequest) -> SessionResponse:
-    """Tạo session mới"""
+def create_session(request: SessionCreateRequest) -> SessionResponse:
+    """Tạo session mới (sync pymongo -> chạy trong threadpool)"""
     try:
         return agent_service.create_session(request)
     except Exception as e:
@@ -41,15 +51,46 @@ async def create_session(request: SessionCreateRequest) -> SessionResponse:
         )
 
 
+@agent_router.get(
+    "/sessions",
+    response_model=SessionListResponse,
+    summary="List User Sessions",
+    description="Lấy sessions của user (mới nhất trước) với cursor pagination"
+)
+def list_sessions(
+    user_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor của trang trước (bỏ trống cho trang đầu)"),
+    page_size: int = Query(10, ge=1, le=100),
+    view: str = Query("summary", description="summary (chỉ state) | full (kèm context)")
+) -> SessionListResponse:
+    """Lấy danh sách sessions của user (sync pymongo -> chạy trong threadpool)"""
+    try:
+        return agent_service.list_sessions(user_id, cursor=cursor or None, page_size=page_size, view=view)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @agent_router.get(
     "/session/{session_id}",
     response_model=SessionResponse,
     summary="Get Session Info",
     description="Lấy thông tin session hiện tại"
 )
-async def get_session(session_id: str) -> SessionResponse:
+async def get_session(
+    session_id: str,
+    view: str = Query("full", description="full (kèm context + code history) | summary (chỉ state)")
+) -> SessionResponse:
     """Lấy thông tin session"""
-    session = agent_service.get_session(session_id)
+    try:
+        session = await agent_service.get_session_async(session_id, view=view)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     if not session:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -58,6 +99,22 @@ async def get_session(session_id: str) -> SessionResponse:
     return session
 
 
+@agent_router.get(
+    "/cache/stats",
+    summary="Cache Stats",
+    description="Counters của session cache, LLM response cache, Gemini model registry, local intent classifier và JSON parsing (process hiện tại)"
+)
+async def cache_stats() -> dict:
+    """Counters của các cache in-process"""
+    return {
+        "session_cache": session_cache.stats(),
+        "llm_cache": llm_cache.stats(),
+        "model_registry": gemini_ai.registry.stats(),
+        "local_intent": local_intent_classifier.stats(),
+        "json_parse": json_parse_metrics.stats()
+    }
+
+
 # ==================== FLOW 1: CONTEXT PARSING ====================
 
 @agent_router.post(
@@ -66,7 +123,7 @@ async def get_session(session_id: str) -> SessionResponse:
     summary="Parse Context (F1)",
     description="Luồng F1: Parse context text thành JSON structure"
 )
-async def parse_context(
+def parse_context(
     session_id: str,
     context_text: str,
     model: str = "gemini-2.5-flash"
@@ -77,14 +134,23 @@ async def parse_context(
     - **session_id**: ID của session
     - **context_text**: Text mô tả context/yêu cầu từ user
     - **model**: Model để sử dụng
+    
+    Endpoint sync (chạy trong threadpool): F1 gọi Gemini và ghi session qua
+    SessionUnitOfWork đều là blocking I/O
     """
     try:
-        return agent_service.process_context(session_id, context_text, model)
+        response = agent_service.process_context(session_id, context_text, model)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+    if response is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    return response
 
 
 # ==================== FLOW 2: PROMPT PROCESSING ====================
@@ -95,7 +161,7 @@ async def parse_context(
     summary="Process Prompt (F2)",
     description="Luồng F2: Classify intent và generate code"
 )
-async def process_prompt(request: AgentRequest) -> AgentResponse:
+async def process_prompt(request: AgentRequest, http_request: Request) -> AgentResponse:
     """
     Process prompt từ user
     
@@ -105,7 +171,9 @@ async def process_prompt(request: AgentRequest) -> AgentResponse:
     3. Save vào history
     """
     try:
-        return agent_service.process_prompt(request)
+        return await run_until_disconnected(http_request, agent_service.process_prompt_async(request))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -113,6 +181,24 @@ async def process_prompt(request: AgentRequest) -> AgentResponse:
         )
 
 
+@agent_router.post(
+    "/prompt/process/stream",
+    summary="Process Prompt (F2, Streaming)",
+    description="Luồng F2: Classify intent và stream code qua Server-Sent Events"
+)
+async def process_prompt_stream(request: AgentRequest) -> StreamingResponse:
+    """
+    Process prompt từ user, stream kết quả qua SSE
+    
+    Events: intent → code/explanation (nhiều lần) → done (AgentResponse) hoặc error
+    """
+    return StreamingResponse(
+        sse_stream(agent_service.process_prompt_stream(request)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 # ==================== FLOW 3: CODE ANALYSIS ====================
 
 @agent_router.post(
@@ -121,14 +207,16 @@ async def process_prompt(request: AgentRequest) -> AgentResponse:
     summary="Analyze Code (F3)",
     description="Luồng F3: Phân tích code và tạo summary"
 )
-async def analyze_code(session_id: str) -> AgentResponse:
+async def analyze_code(session_id: str, http_request: Request) -> AgentResponse:
     """
     Analyze code vừa generate
     
     - **session_id**: ID của session
     """
     try:
-        return agent_service.analyze_code(session_id)
+        return await run_until_disconnected(http_request, agent_service.analyze_code_async(session_id))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
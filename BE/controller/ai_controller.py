@@ -1,21 +1,24 @@
-from fastapi import APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from model.ai_models import (
+from BE.model.ai_models import (
     CodeGenerationRequest, 
     CodeGenerationResponse,
     CodeReviewRequest,
     CodeReviewResponse
 )
-from service.ai_service import CodeGenerationService, CodeReviewService
+from BE.service.ai_service import CodeGenerationService, CodeReviewService
+from BE.utils.async_utils import run_until_disconnected
+from BE.utils.sse import SSE_HEADERS, sse_stream
+from BE.utils.providers import lazy
 
 
 # Create APIRouter (equivalent to Flask Blueprint)
 ai_router = APIRouter(prefix="/ai", tags=["AI"])
 
 # Initialize services
-code_gen_service = CodeGenerationService()
-code_review_service = CodeReviewService()
+code_gen_service = lazy(CodeGenerationService)
+code_review_service = lazy(CodeReviewService)
 
 
 @ai_router.post(
@@ -24,7 +27,7 @@ code_review_service = CodeReviewService()
     summary="Generate Code",
     description="Generate code based on natural language prompt"
 )
-async def generate_code(request: CodeGenerationRequest) -> CodeGenerationResponse:
+async def generate_code(request: CodeGenerationRequest, http_request: Request) -> CodeGenerationResponse:
     """
     Generate code using AI based on the provided prompt.
     
@@ -34,8 +37,8 @@ async def generate_code(request: CodeGenerationRequest) -> CodeGenerationRespons
     - **additional_context**: Extra context or requirements (optional)
     """
     try:
-        # Generate code
-        response = code_gen_service.generate_code(request)
+        # Generate code (cancelled if the client disconnects)
+        response = await run_until_disconnected(http_request, code_gen_service.generate_code_async(request))
         
         if not response.success:
             raise HTTPException(
@@ -54,13 +57,35 @@ async def generate_code(request: CodeGenerationRequest) -> CodeGenerationRespons
         )
 
 
+@ai_router.post(
+    "/generate/stream",
+    summary="Generate Code (Streaming)",
+    description="Generate code and stream it back as Server-Sent Events"
+)
+async def generate_code_stream(request: CodeGenerationRequest) -> StreamingResponse:
+    """
+    Stream generated code as Server-Sent Events.
+    
+    Events:
+    - **code**: chunk of the first fenced code block
+    - **explanation**: chunk of text outside the code block
+    - **done**: final CodeGenerationResponse
+    - **error**: error_message if generation failed
+    """
+    return StreamingResponse(
+        sse_stream(code_gen_service.stream_code(request)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
 @ai_router.post(
     "/review",
     response_model=CodeReviewResponse,
     summary="Review Code",
     description="Analyze and review code quality with AI"
 )
-async def review_code(request: CodeReviewRequest) -> CodeReviewResponse:
+async def review_code(request: CodeReviewRequest, http_request: Request) -> CodeReviewResponse:
     """
     Review code and provide feedback, issues, and suggestions.
     
@@ -70,8 +95,8 @@ async def review_code(request: CodeReviewRequest) -> CodeReviewResponse:
     - **additional_notes**: Additional notes for the review (optional)
     """
     try:
-        # Review code
-        response = code_review_service.review_code(request)
+        # Review code (cancelled if the client disconnects)
+        response = await run_until_disconnected(http_request, code_review_service.review_code_async(request))
         
         if not response.success:
             raise HTTPException(
@@ -8,13 +8,14 @@ from datetime import datetime
 
 from BE.service.chat_room_service import ChatRoomService
 from BE.service.message_service import MessageService
+from BE.utils.providers import lazy
 
 # Router
 router = APIRouter(prefix="/api/chat", tags=["Chat"])
 
 # Services
-chat_room_service = ChatRoomService()
-message_service = MessageService()
+chat_room_service = lazy(ChatRoomService)
+message_service = lazy(MessageService)
 
 
 # ==================== Pydantic Models ====================
@@ -7,9 +7,10 @@ from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 from BE.service.code_generation_service import CodeGenerationService
 from BE.entities.code_generation_entity import CodeGeneration
+from BE.utils.providers import lazy
 
 router = APIRouter(prefix="/api/code-generations", tags=["Code Generations"])
-service = CodeGenerationService()
+service = lazy(CodeGenerationService)
 
 
 # Request/Response Models
@@ -45,7 +46,8 @@ async def get_code_generations(
     page: int = Query(1, ge=1, description="Số trang"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
     request_id: Optional[str] = Query(None, description="Filter by request_id"),
-    status_filter: Optional[str] = Query(None, alias="status", description="Filter by status")
+    status_filter: Optional[str] = Query(None, alias="status", description="Filter by status"),
+    exact_total: bool = Query(False, description="Đếm total chính xác (mặc định có thể là giá trị ước lượng/cache)")
 ):
     """Lấy danh sách code generations"""
     try:
@@ -55,11 +57,12 @@ async def get_code_generations(
         if status_filter:
             filter_query["status"] = status_filter
         
-        result = service.get_all(page, page_size, filter_query if filter_query else None)
+        result = service.get_all(page, page_size, filter_query if filter_query else None, exact_total=exact_total)
         
         return {
             "items": [item.to_response() for item in result["items"]],
             "total": result["total"],
+            "total_exact": result["total_exact"],
             "page": result["page"],
             "page_size": result["page_size"],
             "total_pages": result["total_pages"]
@@ -2,14 +2,20 @@
 Conservation Controller - API endpoints
 Collection name: "conservations" (không phải "conversations")
 """
-from fastapi import APIRouter, HTTPException, Query, status
+import asyncio
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from BE.service.conservation_service import ConservationService
+from BE.service.message_service import MessageService
 from BE.entities.conservation_entity import Conservation
+from BE.repository.projection import parse_fields
+from BE.utils.providers import lazy
 
 router = APIRouter(prefix="/api/conservations", tags=["Conservations"])
-service = ConservationService()
+service = lazy(ConservationService)
+message_service = lazy(MessageService)
 
 
 # Request/Response Models
@@ -32,9 +38,9 @@ class AddFactRequest(BaseModel):
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_conservation(data: ConservationCreateRequest):
+def create_conservation(data: ConservationCreateRequest):
     """
-    Tạo conservation mới
+    Tạo conservation mới (sync pymongo -> chạy trong threadpool)
     
     - Message count khởi tạo = 0
     - Facts có thể empty
@@ -53,32 +59,58 @@ async def create_conservation(data: ConservationCreateRequest):
 
 
 @router.get("/{id}")
-async def get_conservation(id: str):
+async def get_conservation(
+    id: str,
+    view: Optional[str] = Query(None, description="View: summary | full"),
+    fields: Optional[str] = Query(None, description="Các field cần lấy, phân cách bằng dấu phẩy (vd: title,goal)")
+):
     """Lấy conservation theo ID"""
-    conservation = service.get_by_id(id)
+    try:
+        conservation = await service.get_by_id_async(id, fields=parse_fields(fields), view=view)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not conservation:
         raise HTTPException(status_code=404, detail="Conservation không tồn tại")
     return conservation.to_response()
 
 
 @router.get("/{id}/with-messages")
-async def get_conservation_with_messages(id: str):
+async def get_conservation_with_messages(
+    id: str,
+    limit: int = Query(50, ge=1, le=200, description="Số messages mới nhất trả về"),
+    cursor: Optional[str] = Query(None, description="nextCursor để lấy messages cũ hơn"),
+    stream: bool = Query(False, description="Stream toàn bộ messages (JSON streaming, bỏ qua limit/cursor)")
+):
     """
-    Lấy conservation cùng với tất cả messages
+    Lấy conservation cùng với messages
     
     Returns:
     - conservation: Conservation object
-    - messages: Array of messages
-    - total_messages: Count
+    - messages: Cửa sổ messages mới nhất (theo thứ tự thời gian)
+    - totalMessages: Tổng số messages (messageCount)
+    - nextCursor/hasMore: Lấy messages cũ hơn
+    
+    stream=true: trả về toàn bộ messages dưới dạng JSON stream
     """
-    result = service.get_with_messages(id)
+    if stream:
+        chunks = await service.stream_with_messages(id)
+        if chunks is None:
+            raise HTTPException(status_code=404, detail="Conservation không tồn tại")
+        return StreamingResponse(chunks, media_type="application/json")
+    
+    try:
+        result = await asyncio.to_thread(service.get_with_messages, id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not result:
         raise HTTPException(status_code=404, detail="Conservation không tồn tại")
     
     return {
         "conservation": result["conservation"].to_response(),
         "messages": [msg.to_response() for msg in result["messages"]],
-        "totalMessages": result["total_messages"]
+        "totalMessages": result["total_messages"],
+        "nextCursor": result["next_cursor"],
+        "hasMore": result["has_more"]
     }
 
 
@@ -86,37 +118,66 @@ async def get_conservation_with_messages(id: str):
 async def get_conservations(
     page: int = Query(1, ge=1, description="Số trang"),
     page_size: int = Query(10, ge=1, le=100, description="Items per page"),
-    title: Optional[str] = Query(None, description="Search by title"),
-    recent: bool = Query(False, description="Lấy recent conservations")
+    title: Optional[str] = Query(None, description="Search theo title/goal/facts (không phân biệt dấu)"),
+    recent: bool = Query(False, description="Lấy recent conservations"),
+    view: Optional[str] = Query(None, description="View: summary | full"),
+    fields: Optional[str] = Query(None, description="Các field cần lấy, phân cách bằng dấu phẩy (vd: title,goal)"),
+    cursor: Optional[str] = Query(None, description="Cursor pagination: truyền rỗng cho trang đầu, sau đó next_cursor"),
+    include_total: bool = Query(False, description="Đếm total (chỉ với cursor pagination)"),
+    exact_total: bool = Query(False, description="Đếm total chính xác (mặc định có thể là giá trị ước lượng/cache)")
 ):
     """
     Lấy danh sách conservations
     
-    - Support search by title (partial match)
+    - Support search theo title/goal/facts (text index, xếp theo độ liên quan)
     - Support recent conservations (sorted by createdAt)
+    - Support projection: view=summary hoặc fields=title,goal (chỉ trả về các field đó)
+    - Support cursor pagination (createdAt, _id): trả về next_cursor thay vì page/total_pages
     """
     try:
+        field_list = parse_fields(fields)
+        if cursor is not None:
+            filter_query = None
+            if title:
+                filter_query = service.repo.build_search_filter(title) or {"_id": None}
+            result = await service.get_page_async(
+                cursor or None, page_size, filter_query=filter_query,
+                include_total=include_total, fields=field_list, view=view
+            )
+            return {
+                **result,
+                "items": [item.to_response() for item in result["items"]]
+            }
+        
+        # search/recent dùng sync pymongo -> chạy trong thread, không block event loop
         if title:
-            result = service.search_by_title(title, page, page_size)
+            result = await asyncio.to_thread(
+                service.search_by_title, title, page, page_size, fields=field_list, view=view, exact_total=exact_total
+            )
         elif recent:
-            result = service.get_recent(page, page_size)
+            result = await asyncio.to_thread(
+                service.get_recent, page, page_size, fields=field_list, view=view, exact_total=exact_total
+            )
         else:
-            result = service.get_all(page, page_size)
+            result = await service.get_all_async(page, page_size, fields=field_list, view=view, exact_total=exact_total)
         
         return {
             "items": [item.to_response() for item in result["items"]],
             "total": result["total"],
+            "total_exact": result["total_exact"],
             "page": result["page"],
             "page_size": result["page_size"],
             "total_pages": result["total_pages"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{id}")
-async def update_conservation(id: str, data: ConservationUpdateRequest):
-    """Update conservation title hoặc goal"""
+def update_conservation(id: str, data: ConservationUpdateRequest):
+    """Update conservation title hoặc goal (sync pymongo -> chạy trong threadpool)"""
     try:
         updated = service.update_conservation(id, title=data.title, goal=data.goal)
         if not updated:
@@ -129,9 +190,9 @@ async def update_conservation(id: str, data: ConservationUpdateRequest):
 
 
 @router.post("/{id}/facts")
-async def add_fact(id: str, data: AddFactRequest):
+def add_fact(id: str, data: AddFactRequest):
     """
-    Thêm fact vào conservation
+    Thêm fact vào conservation (sync pymongo -> chạy trong threadpool)
     
     - Fact được thêm vào array facts
     - Updated_at được update tự động
@@ -151,29 +212,51 @@ async def add_fact(id: str, data: AddFactRequest):
 
 
 @router.delete("/{id}")
-async def delete_conservation(
+def delete_conservation(
     id: str,
+    background_tasks: BackgroundTasks,
+    response: Response,
     delete_messages: bool = Query(True, description="Có xóa messages không")
 ):
     """
-    Xóa conservation
+    Xóa conservation (sync pymongo -> chạy trong threadpool)
     
     - Optionally xóa tất cả messages trong conservation
-    - Default: xóa cả messages
+    - Default: xóa cả messages - chạy nền theo batch, trả về 202 cùng delete job
+      (conservation có status "deleting" cho tới khi xong, xem GET /delete-jobs/{job_id})
     """
     try:
-        success = service.delete_conservation(id, delete_messages=delete_messages)
+        if delete_messages:
+            job = service.start_cascade_delete(id)
+            background_tasks.add_task(service.run_cascade_delete, job.id)
+            response.status_code = status.HTTP_202_ACCEPTED
+            return {"message": "Conservation đang được xóa cùng messages", "job": job.to_response()}
+        
+        success = service.delete_conservation(id, delete_messages=False)
         if not success:
             raise HTTPException(status_code=404, detail="Conservation không tồn tại")
         
-        msg = "Conservation và messages đã được xóa" if delete_messages else "Conservation đã được xóa"
-        return {"message": msg}
+        return {"message": "Conservation đã được xóa"}
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/delete-jobs/{job_id}")
+def get_delete_job(job_id: str):
+    """
+    Lấy tiến trình cascade delete (status, deletedMessages/totalMessages, progress)
+    (sync pymongo -> chạy trong threadpool)
+    """
+    job = service.get_delete_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Delete job không tồn tại")
+    return job.to_response()
+
+
 # ============================================================
 # NESTED ENDPOINTS - Messages trong Conservation
 # Dùng cho Chatbox UI (tiện hơn)
@@ -187,9 +270,9 @@ class MessageInConservationRequest(BaseModel):
 
 
 @router.post("/{conservation_id}/messages", status_code=status.HTTP_201_CREATED)
-async def add_message_to_conservation(conservation_id: str, data: MessageInConservationRequest):
+def add_message_to_conservation(conservation_id: str, data: MessageInConservationRequest):
     """
-    Thêm message vào conservation (Nested endpoint cho Chatbox)
+    Thêm message vào conservation (Nested endpoint cho Chatbox, sync pymongo -> chạy trong threadpool)
     
     - Tự động link message với conservation
     - Auto update conservation message count
@@ -205,10 +288,6 @@ async def add_message_to_conservation(conservation_id: str, data: MessageInConse
     ```
     """
     try:
-        # Import message service
-        from BE.service.message_service import MessageService
-        message_service = MessageService()
-        
         # Tạo message với conservation_id từ URL
         message = message_service.create_message(
             conversation_id=conservation_id,
@@ -224,14 +303,62 @@ async def add_message_to_conservation(conservation_id: str, data: MessageInConse
         raise HTTPException(status_code=500, detail=f"Lỗi: {str(e)}")
 
 
+class MessageBatchRequest(BaseModel):
+    """Request để thêm nhiều messages vào conservation"""
+    messages: List[MessageInConservationRequest] = Field(..., min_length=1, max_length=1000, description="Danh sách messages (tối đa 1000)")
+
+
+@router.post("/{conservation_id}/messages:batch", status_code=status.HTTP_201_CREATED)
+def add_messages_batch_to_conservation(conservation_id: str, data: MessageBatchRequest, response: Response):
+    """
+    Thêm nhiều messages vào conservation trong một request (import transcript, replay agent)
+    
+    - Một lần kiểm tra conservation, một insert_many, một lần tăng message count
+    - Endpoint sync: insert_many (tối đa 1000 documents) và transaction tăng count
+      chạy trong threadpool, không block event loop
+    - Message lỗi không làm hỏng batch: trả về trong "failed" với index trong request
+    - 201 nếu tất cả thành công, 207 nếu có message lỗi
+    
+    Example:
+    ```
+    POST /api/conservations/6905a4bada4db5565a169084/messages:batch
+    {
+      "messages": [
+        {"sender": "user", "text": "Hello!"},
+        {"sender": "system", "text": "Hi, how can I help?"}
+      ]
+    }
+    ```
+    """
+    try:
+        result = message_service.create_messages_batch(
+            conversation_id=conservation_id,
+            items=[message.model_dump() for message in data.messages]
+        )
+        
+        if result["failed_count"]:
+            response.status_code = status.HTTP_207_MULTI_STATUS
+        
+        return {
+            "items": [message.to_response() for message in result["items"]],
+            "inserted_count": result["inserted_count"],
+            "failed": result["failed"],
+            "failed_count": result["failed_count"]
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lỗi: {str(e)}")
+
+
 @router.delete("/{conservation_id}/messages/{message_id}")
-async def remove_message_from_conservation(
+def remove_message_from_conservation(
     conservation_id: str,
     message_id: str,
     update_count: bool = Query(True, description="Update message count")
 ):
     """
-    Xóa message từ conservation (Nested endpoint cho Chatbox)
+    Xóa message từ conservation (Nested endpoint cho Chatbox, sync pymongo -> chạy trong threadpool)
     
     - Verify message thuộc về conservation
     - Auto update conservation message count
@@ -243,10 +370,6 @@ async def remove_message_from_conservation(
     ```
     """
     try:
-        # Import message service
-        from BE.service.message_service import MessageService
-        message_service = MessageService()
-        
         # Verify message exists và thuộc về conservation này
         message = message_service.get_by_id(message_id)
         if not message:
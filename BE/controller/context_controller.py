@@ -7,23 +7,25 @@ Context Controller - API cho Context Parsing Service
 import logging
 from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 
 from BE.model.context_models import ContextParsingRequest, ContextParsingResponse
 from BE.model.intent_models import ParsedContextV2
 from BE.service.context_parsing_service import ContextParsingService
+from BE.utils.async_utils import run_until_disconnected
+from BE.utils.providers import lazy
 
 # Create router
 context_router = APIRouter(prefix="/context", tags=["Context Parsing"])
 
 # Initialize service
-context_service = ContextParsingService()
+context_service = lazy(ContextParsingService)
 
 logger = logging.getLogger(__name__)
 
 
 @context_router.post("/parse", response_model=ContextParsingResponse)
-async def parse_context(request: ContextParsingRequest):
+async def parse_context(request: ContextParsingRequest, http_request: Request):
     """
     Parse user context to extract structured information
 
@@ -36,10 +38,10 @@ async def parse_context(request: ContextParsingRequest):
     try:
         logger.info(f"[ContextController] Parsing context: {request.user_context[:50]}...")
 
-        # Extract context
-        success, parsed_context, error = context_service.extract_one_shot(
-            request.user_context,
-            request.model
+        # Extract context (cancelled if the client disconnects)
+        success, parsed_context, error = await run_until_disconnected(
+            http_request,
+            context_service.extract_one_shot_async(request.user_context, request.model)
         )
 
         if not success or not parsed_context:
@@ -57,6 +59,8 @@ async def parse_context(request: ContextParsingRequest):
             error=None
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ [ContextController] Error: {str(e)}")
         raise HTTPException(
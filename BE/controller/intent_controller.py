@@ -5,28 +5,35 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, Any
 
 from BE.service.intent_classifier_service import IntentClassifierService
+from BE.service.state_management_service import StateConflictError
 from BE.model.intent_models import IntentClassifierRequest, IntentClassifierResponse
+from BE.utils.providers import lazy
 
 
 # Create router
 router = APIRouter(prefix="/intent", tags=["Intent Classifier"])
 
 # Initialize service
-intent_service = IntentClassifierService()
+intent_service = lazy(IntentClassifierService)
 
 
 @router.post("/classify", response_model=IntentClassifierResponse)
-async def classify_intent(request: IntentClassifierRequest) -> IntentClassifierResponse:
+def classify_intent(request: IntentClassifierRequest) -> IntentClassifierResponse:
     """
     Phân loại intent từ user message
 
     - **user_message**: Tin nhắn từ người dùng
     - **session_id**: ID phiên để lưu trữ state
+
+    Endpoint sync (chạy trong threadpool): refine facts gọi Gemini và đọc/ghi state
+    (backend mongo) đều là blocking I/O
     """
     try:
         result = intent_service.classify_intent(request)
         return result
 
+    except StateConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
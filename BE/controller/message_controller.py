@@ -6,9 +6,11 @@ from pydantic import BaseModel, Field
 from typing import Optional
 from BE.service.message_service import MessageService
 from BE.entities.message_entity import Message
+from BE.repository.projection import parse_fields
+from BE.utils.providers import lazy
 
 router = APIRouter(prefix="/api/messages", tags=["Messages"])
-service = MessageService()
+service = lazy(MessageService)
 
 
 # Request/Response Models
@@ -26,9 +28,9 @@ class MessageUpdateRequest(BaseModel):
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_message(data: MessageCreateRequest):
+def create_message(data: MessageCreateRequest):
     """
-    Tạo message mới
+    Tạo message mới (sync pymongo -> chạy trong threadpool)
     
     - Tự động update message count của conservation
     - Sender phải là 'system' hoặc 'user'
@@ -48,9 +50,16 @@ async def create_message(data: MessageCreateRequest):
 
 
 @router.get("/{id}")
-async def get_message(id: str):
+async def get_message(
+    id: str,
+    view: Optional[str] = Query(None, description="View: summary | full"),
+    fields: Optional[str] = Query(None, description="Các field cần lấy, phân cách bằng dấu phẩy (vd: sender,text)")
+):
     """Lấy message theo ID"""
-    message = service.get_by_id(id)
+    try:
+        message = await service.get_by_id_async(id, fields=parse_fields(fields), view=view)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not message:
         raise HTTPException(status_code=404, detail="Message không tồn tại")
     return message.to_response()
@@ -59,51 +68,90 @@ async def get_message(id: str):
 @router.get("/")
 async def get_messages(
     page: int = Query(1, ge=1, description="Số trang"),
-    page_size: int = Query(50, ge=1, le=200, description="Messages per page (max 200)")
+    page_size: int = Query(50, ge=1, le=200, description="Messages per page (max 200)"),
+    view: Optional[str] = Query(None, description="View: summary | full"),
+    fields: Optional[str] = Query(None, description="Các field cần lấy, phân cách bằng dấu phẩy (vd: sender,text)"),
+    cursor: Optional[str] = Query(None, description="Cursor pagination: truyền rỗng cho trang đầu, sau đó next_cursor"),
+    include_total: bool = Query(False, description="Đếm total (chỉ với cursor pagination)"),
+    exact_total: bool = Query(False, description="Đếm total chính xác (mặc định có thể là giá trị ước lượng/cache)")
 ):
     """Lấy tất cả messages"""
     try:
-        result = service.get_all(page, page_size)
+        if cursor is not None:
+            result = await service.get_page_async(
+                cursor or None, page_size, include_total=include_total,
+                fields=parse_fields(fields), view=view
+            )
+            return {
+                **result,
+                "items": [item.to_response() for item in result["items"]]
+            }
+        
+        result = await service.get_all_async(
+            page, page_size, fields=parse_fields(fields), view=view, exact_total=exact_total
+        )
         return {
             "items": [item.to_response() for item in result["items"]],
             "total": result["total"],
+            "total_exact": result["total_exact"],
             "page": result["page"],
             "page_size": result["page_size"],
             "total_pages": result["total_pages"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/conversation/{conversation_id}")
-async def get_messages_by_conversation(
+def get_messages_by_conversation(
     conversation_id: str,
     page: int = Query(1, ge=1),
-    page_size: int = Query(50, ge=1, le=200)
+    page_size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor pagination: truyền rỗng cho trang đầu, sau đó next_cursor"),
+    include_total: bool = Query(False, description="Đếm total (chỉ với cursor pagination)"),
+    exact_total: bool = Query(False, description="Đếm total chính xác (mặc định có thể là giá trị ước lượng/cache)")
 ):
     """
-    Lấy tất cả messages của một conversation
+    Lấy tất cả messages của một conversation (sync pymongo -> chạy trong threadpool)
     
     - Sorted by createdAt (mới nhất trước)
-    - Pagination support
+    - Pagination support: page/page_size hoặc cursor (chi phí như nhau ở mọi trang)
     """
     try:
-        result = service.get_by_conversation(conversation_id, page, page_size)
+        if cursor is not None:
+            result = service.get_page_by_conversation(conversation_id, cursor or None, page_size, include_total)
+            response = {
+                "items": [item.to_response() for item in result["items"]],
+                "next_cursor": result["next_cursor"],
+                "has_more": result["has_more"],
+                "page_size": result["page_size"],
+                "conversationId": result["conversation_id"]
+            }
+            if "total" in result:
+                response["total"] = result["total"]
+            return response
+        
+        result = service.get_by_conversation(conversation_id, page, page_size, exact_total=exact_total)
         return {
             "items": [item.to_response() for item in result["items"]],
             "total": result["total"],
+            "total_exact": result["total_exact"],
             "page": result["page"],
             "page_size": result["page_size"],
             "total_pages": result["total_pages"],
             "conversationId": result["conversation_id"]
         }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.put("/{id}")
-async def update_message(id: str, data: MessageUpdateRequest):
-    """Update message text"""
+def update_message(id: str, data: MessageUpdateRequest):
+    """Update message text (sync pymongo -> chạy trong threadpool)"""
     try:
         updated = service.update_message(id, data.text)
         if not updated:
@@ -116,12 +164,12 @@ async def update_message(id: str, data: MessageUpdateRequest):
 
 
 @router.delete("/{id}")
-async def delete_message(
+def delete_message(
     id: str,
     update_count: bool = Query(True, description="Update conservation message count")
 ):
     """
-    Xóa message
+    Xóa message (sync pymongo -> chạy trong threadpool)
     
     - Optionally update conservation message count
     """
@@ -5,14 +5,20 @@ from datetime import datetime
 from typing import Optional, List, Dict
 from dataclasses import dataclass, field
 from bson import ObjectId
+from BE.entities.dirty_tracking import DirtyTrackingMixin
 
 
 @dataclass
-class CodeGeneration:
+class CodeGeneration(DirtyTrackingMixin):
     """
     CodeGeneration Entity - Domain model cho code generation
     Khớp với structure thực tế trong MongoDB
     """
+    # Projection views (MongoDB field names), None = full document
+    VIEWS = {
+        "summary": ("request_id", "status", "created_at"),
+        "full": None
+    }
     request_id: str
     files_json: List[Dict] = field(default_factory=list)
     id: Optional[str] = None
@@ -23,7 +29,7 @@ class CodeGeneration:
     @staticmethod
     def from_dict(data: dict) -> 'CodeGeneration':
         """Tạo CodeGeneration entity từ dictionary"""
-        return CodeGeneration(
+        entity = CodeGeneration(
             id=str(data["_id"]) if "_id" in data else None,
             request_id=str(data["request_id"]) if isinstance(data.get("request_id"), ObjectId) else data.get("request_id", ""),
             files_json=data.get("files_json", []),
@@ -31,6 +37,8 @@ class CodeGeneration:
             status=data.get("status", "pending"),
             created_at=data.get("created_at")
         )
+        entity.mark_clean()
+        return entity
     
     def to_dict(self, include_id: bool = True) -> dict:
         """Chuyển CodeGeneration entity thành dictionary"""
@@ -49,14 +57,14 @@ class CodeGeneration:
     
     def to_response(self) -> dict:
         """Chuyển CodeGeneration entity thành response dictionary"""
-        return {
+        return self.project_response({
             "_id": self.id,
             "request_id": self.request_id,
             "files_json": self.files_json,
             "run_instructions": self.run_instructions,
             "status": self.status,
             "created_at": self.created_at.isoformat() if self.created_at else None
-        }
+        })
     
     def __repr__(self) -> str:
         return f"CodeGeneration(id={self.id}, request_id={self.request_id}, status={self.status})"
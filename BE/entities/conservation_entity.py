@@ -7,17 +7,26 @@ from datetime import datetime
 from typing import Optional, List
 from dataclasses import dataclass, field
 from bson import ObjectId
+from BE.entities.dirty_tracking import DirtyTrackingMixin
+from BE.utils.text_normalize import normalize_text, normalize_many
 
 
 @dataclass
-class Conservation:
+class Conservation(DirtyTrackingMixin):
     """
     Conservation Entity - Domain model cho conservations
     """
+    APPEND_ONLY_FIELDS = ("facts",)
+    # Projection views (MongoDB field names), None = full document
+    VIEWS = {
+        "summary": ("title", "goal", "messageCount", "status", "createdAt", "updatedAt"),
+        "full": None
+    }
     title: str
     goal: str
     message_count: int = 0
     facts: List[str] = field(default_factory=list)
+    status: str = "active"  # "active" hoặc "deleting" (đang được xóa nền cùng messages)
     id: Optional[str] = None
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
@@ -25,15 +34,18 @@ class Conservation:
     @staticmethod
     def from_dict(data: dict) -> 'Conservation':
         """Tạo Conservation entity từ dictionary"""
-        return Conservation(
+        entity = Conservation(
             id=str(data["_id"]) if "_id" in data else None,
             title=data.get("title", ""),
             goal=data.get("goal", ""),
             message_count=data.get("messageCount", 0),
             facts=data.get("facts", []),
+            status=data.get("status", "active"),
             created_at=data.get("createdAt"),
             updated_at=data.get("updatedAt")
         )
+        entity.mark_clean()
+        return entity
     
     def to_dict(self, include_id: bool = True) -> dict:
         """Chuyển Conservation entity thành dictionary"""
@@ -42,6 +54,8 @@ class Conservation:
             "goal": self.goal,
             "messageCount": self.message_count,
             "facts": self.facts,
+            "status": self.status,
+            "search": self.build_search_fields(),
             "createdAt": self.created_at or datetime.utcnow(),
             "updatedAt": self.updated_at or datetime.utcnow()
         }
@@ -51,17 +65,26 @@ class Conservation:
         
         return result
     
+    def build_search_fields(self) -> dict:
+        """Bản chuẩn hóa (bỏ dấu, lowercase) của title/goal/facts cho text index"""
+        return {
+            "title": normalize_text(self.title),
+            "goal": normalize_text(self.goal),
+            "facts": normalize_many(self.facts)
+        }
+    
     def to_response(self) -> dict:
         """Chuyển Conservation entity thành response dictionary"""
-        return {
+        return self.project_response({
             "_id": self.id,
             "title": self.title,
             "goal": self.goal,
             "messageCount": self.message_count,
             "facts": self.facts,
+            "status": self.status,
             "createdAt": self.created_at.isoformat() if self.created_at else None,
             "updatedAt": self.updated_at.isoformat() if self.updated_at else None
-        }
+        })
     
     def __repr__(self) -> str:
         return f"Conservation(id={self.id}, title={self.title}, messages={self.message_count})"
@@ -0,0 +1,97 @@
+"""
+DeleteJob Entity - Job xóa conservation cùng messages chạy nền theo từng batch
+"""
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+from dataclasses import dataclass
+from bson import ObjectId
+from BE.entities.dirty_tracking import DirtyTrackingMixin
+
+
+class DeleteJobStatus(str, Enum):
+    """Trạng thái của delete job"""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+@dataclass
+class DeleteJob(DirtyTrackingMixin):
+    """
+    DeleteJob Entity - Tiến trình cascade delete của một conservation
+
+    Job được lưu trong MongoDB nên có thể chạy tiếp sau khi process bị restart
+    """
+    conservation_id: str
+    status: str = DeleteJobStatus.PENDING.value
+    total_messages: int = 0  # messageCount lúc bắt đầu xóa (ước lượng cho progress)
+    deleted_messages: int = 0
+    error: Optional[str] = None
+    id: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None  # Cũng là heartbeat khi job đang chạy
+    completed_at: Optional[datetime] = None
+
+    @staticmethod
+    def from_dict(data: dict) -> 'DeleteJob':
+        """Tạo DeleteJob entity từ dictionary"""
+        entity = DeleteJob(
+            id=str(data["_id"]) if "_id" in data else None,
+            conservation_id=str(data["conservationId"]) if isinstance(data.get("conservationId"), ObjectId) else data.get("conservationId", ""),
+            status=data.get("status", DeleteJobStatus.PENDING.value),
+            total_messages=data.get("totalMessages", 0),
+            deleted_messages=data.get("deletedMessages", 0),
+            error=data.get("error"),
+            created_at=data.get("createdAt"),
+            updated_at=data.get("updatedAt"),
+            completed_at=data.get("completedAt")
+        )
+        entity.mark_clean()
+        return entity
+
+    def to_dict(self, include_id: bool = True) -> dict:
+        """Chuyển DeleteJob entity thành dictionary"""
+        result = {
+            "conservationId": ObjectId(self.conservation_id) if self.conservation_id else None,
+            "status": self.status,
+            "totalMessages": self.total_messages,
+            "deletedMessages": self.deleted_messages,
+            "error": self.error,
+            "createdAt": self.created_at or datetime.utcnow(),
+            "updatedAt": self.updated_at or datetime.utcnow(),
+            "completedAt": self.completed_at
+        }
+
+        if include_id and self.id:
+            result["_id"] = ObjectId(self.id)
+
+        return result
+
+    @property
+    def progress(self) -> float:
+        """Tỉ lệ hoàn thành (0.0 - 1.0)"""
+        if self.status == DeleteJobStatus.COMPLETED.value:
+            return 1.0
+        if not self.total_messages:
+            return 0.0
+        return min(1.0, self.deleted_messages / self.total_messages)
+
+    def to_response(self) -> dict:
+        """Chuyển DeleteJob entity thành response dictionary"""
+        return self.project_response({
+            "_id": self.id,
+            "conservationId": self.conservation_id,
+            "status": self.status,
+            "totalMessages": self.total_messages,
+            "deletedMessages": self.deleted_messages,
+            "progress": round(self.progress, 4),
+            "error": self.error,
+            "createdAt": self.created_at.isoformat() if self.created_at else None,
+            "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
+            "completedAt": self.completed_at.isoformat() if self.completed_at else None
+        })
+
+    def __repr__(self) -> str:
+        return f"DeleteJob(id={self.id}, conservation={self.conservation_id}, status={self.status})"
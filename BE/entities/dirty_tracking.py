@@ -0,0 +1,114 @@
+"""
+Dirty Tracking - Theo dõi field thay đổi của entity để update chỉ gửi phần thay đổi
+"""
+import copy
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class DirtyTrackingMixin:
+    """
+    Mixin cho các entity dataclass có to_dict(include_id=False)
+
+    - mark_clean(): chụp snapshot document hiện tại (gọi sau khi load/lưu)
+    - get_changes(): so sánh với snapshot -> ($set fields, $push items)
+    - APPEND_ONLY_FIELDS: các array chỉ append (code_history, facts...) -> dùng $push
+    - mark_fields_clean(): cập nhật snapshot cho vài field đã được ghi trực tiếp
+      (vd current_step qua repository.update_step)
+    - mark_partial(): entity được load bằng projection, chỉ các field đã load
+      được so sánh/update và trả về trong response
+    """
+
+    APPEND_ONLY_FIELDS: Tuple[str, ...] = ()
+
+    def mark_clean(self):
+        """Đánh dấu trạng thái hiện tại là đã đồng bộ với MongoDB"""
+        try:
+            self._snapshot = copy.deepcopy(self.to_dict(include_id=False))
+        except Exception:
+            # Document không serialize lại được (dữ liệu cũ) -> update sẽ $set toàn bộ
+            self._snapshot = None
+
+    def mark_fields_clean(self, fields: Iterable[str]):
+        """Đánh dấu các field đã đồng bộ với MongoDB, giữ nguyên thay đổi của các field khác"""
+        snapshot = getattr(self, "_snapshot", None)
+        if snapshot is None:
+            return
+        current = self.to_dict(include_id=False)
+        for field in fields:
+            if field in current:
+                snapshot[field] = copy.deepcopy(current[field])
+
+    def mark_partial(self, loaded_fields: Iterable[str]):
+        """Đánh dấu entity chỉ được load một phần (MongoDB field names)"""
+        self._loaded_fields = frozenset(loaded_fields)
+
+    @property
+    def is_partial(self) -> bool:
+        """Entity được load bằng projection (không đủ field)"""
+        return getattr(self, "_loaded_fields", None) is not None
+
+    def project_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Bỏ các field không được load khỏi response (giữ _id)"""
+        loaded = getattr(self, "_loaded_fields", None)
+        if loaded is None:
+            return response
+        return {key: value for key, value in response.items() if key == "_id" or key in loaded}
+
+    @property
+    def is_tracked(self) -> bool:
+        """Entity đã có snapshot chưa (được load từ/lưu vào MongoDB)"""
+        return getattr(self, "_snapshot", None) is not None
+
+    def get_changes(self) -> Tuple[Dict[str, Any], Dict[str, List[Any]]]:
+        """
+        Tính các thay đổi so với snapshot
+
+        Returns:
+            (set_fields, push_fields): push_fields là field -> items mới được append
+        """
+        current = self.to_dict(include_id=False)
+        loaded = getattr(self, "_loaded_fields", None)
+        if loaded is not None:
+            # Field không được load -> giá trị hiện tại chỉ là default
+            current = {field: value for field, value in current.items() if field in loaded}
+
+        snapshot = getattr(self, "_snapshot", None)
+        if snapshot is None:
+            return current, {}
+
+        set_fields: Dict[str, Any] = {}
+        push_fields: Dict[str, List[Any]] = {}
+
+        for field, value in current.items():
+            old_value = snapshot.get(field)
+            if field in snapshot and old_value == value:
+                continue
+
+            if (
+                field in self.APPEND_ONLY_FIELDS
+                and isinstance(old_value, list)
+                and isinstance(value, list)
+                and len(value) > len(old_value)
+                and value[:len(old_value)] == old_value
+            ):
+                push_fields[field] = value[len(old_value):]
+            else:
+                set_fields[field] = value
+
+        return set_fields, push_fields
+
+    @property
+    def is_dirty(self) -> bool:
+        """Có thay đổi chưa được lưu không"""
+        set_fields, push_fields = self.get_changes()
+        return bool(set_fields or push_fields)
+
+    def build_update(self) -> Optional[Dict[str, Any]]:
+        """Tạo MongoDB update document ($set/$push), None nếu không có thay đổi"""
+        set_fields, push_fields = self.get_changes()
+        update: Dict[str, Any] = {}
+        if set_fields:
+            update["$set"] = set_fields
+        if push_fields:
+            update["$push"] = {field: {"$each": items} for field, items in push_fields.items()}
+        return update or None
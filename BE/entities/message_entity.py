@@ -6,13 +6,19 @@ from datetime import datetime
 from typing import Optional
 from dataclasses import dataclass
 from bson import ObjectId
+from BE.entities.dirty_tracking import DirtyTrackingMixin
 
 
 @dataclass
-class Message:
+class Message(DirtyTrackingMixin):
     """
     Message Entity - Domain model cho messages
     """
+    # Projection views (MongoDB field names), None = full document
+    VIEWS = {
+        "summary": ("conversationId", "sender", "text", "type", "createdAt"),
+        "full": None
+    }
     conversation_id: str  # Link to conservation
     sender: str  # "system" hoặc "user"
     text: str
@@ -25,7 +31,7 @@ class Message:
     @staticmethod
     def from_dict(data: dict) -> 'Message':
         """Tạo Message entity từ dictionary"""
-        return Message(
+        entity = Message(
             id=str(data["_id"]) if "_id" in data else None,
             conversation_id=str(data["conversationId"]) if isinstance(data.get("conversationId"), ObjectId) else data.get("conversationId", ""),
             sender=data.get("sender", "user"),
@@ -35,6 +41,8 @@ class Message:
             updated_at=data.get("updatedAt"),
             v=data.get("__v", 0)
         )
+        entity.mark_clean()
+        return entity
     
     def to_dict(self, include_id: bool = True) -> dict:
         """Chuyển Message entity thành dictionary"""
@@ -55,7 +63,7 @@ class Message:
     
     def to_response(self) -> dict:
         """Chuyển Message entity thành response dictionary"""
-        return {
+        return self.project_response({
             "_id": self.id,
             "conversationId": self.conversation_id,
             "sender": self.sender,
@@ -64,7 +72,7 @@ class Message:
             "createdAt": self.created_at.isoformat() if self.created_at else None,
             "updatedAt": self.updated_at.isoformat() if self.updated_at else None,
             "__v": self.v
-        }
+        })
     
     def __repr__(self) -> str:
         return f"Message(id={self.id}, sender={self.sender}, conversation={self.conversation_id})"
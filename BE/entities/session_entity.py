@@ -2,9 +2,10 @@
 Session Entity - Quản lý phiên làm việc của user
 """
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from dataclasses import dataclass, field
 from bson import ObjectId
+from BE.entities.dirty_tracking import DirtyTrackingMixin
 from enum import Enum
 
 
@@ -20,16 +21,24 @@ class WorkflowStep(str, Enum):
 
 
 @dataclass
-class Session:
+class Session(DirtyTrackingMixin):
     """
     Session Entity - Đại diện cho một phiên làm việc
     
     Lưu trữ:
     - State hiện tại (đang ở bước nào)
     - Context đã được parse
-    - Lịch sử code đã generate
     - Metadata khác
+    
+    Lịch sử code được lưu ở collection session_code_history (không nằm trong
+    session document): code_history chỉ chứa các entries đã load/thêm trong
+    memory, đọc thêm qua get_code_history().
     """
+    # Projection views (MongoDB field names), None = full document
+    VIEWS = {
+        "summary": ("user_id", "current_step", "last_intent", "created_at", "updated_at"),
+        "full": None
+    }
     user_id: str
     current_step: WorkflowStep = WorkflowStep.IDLE
     context_json: Optional[Dict[str, Any]] = None
@@ -44,7 +53,7 @@ class Session:
     @staticmethod
     def from_dict(data: dict) -> 'Session':
         """Tạo Session từ MongoDB document"""
-        return Session(
+        entity = Session(
             id=str(data["_id"]) if "_id" in data else None,
             user_id=data["user_id"],
             current_step=WorkflowStep(data.get("current_step", "idle")),
@@ -56,6 +65,8 @@ class Session:
             created_at=data.get("created_at"),
             updated_at=data.get("updated_at")
         )
+        entity.mark_clean()
+        return entity
     
     def to_dict(self, include_id: bool = True) -> dict:
         """Chuyển Session thành dictionary để lưu vào MongoDB"""
@@ -71,7 +82,6 @@ class Session:
             "user_id": self.user_id,
             "current_step": self.current_step.value,
             "context_json": self.context_json,
-            "code_history": self.code_history,
             "last_intent": self.last_intent,
             "last_prompt": self.last_prompt,
             "metadata": self.metadata,
@@ -86,7 +96,7 @@ class Session:
     
     def to_response(self) -> dict:
         """Chuyển thành response cho API"""
-        return {
+        return self.project_response({
             "_id": self.id,
             "user_id": self.user_id,
             "current_step": self.current_step.value,
@@ -97,16 +107,42 @@ class Session:
             "metadata": self.metadata,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "updated_at": self.updated_at.isoformat() if self.updated_at else None
-        }
+        })
     
     def add_code_to_history(self, code: str, language: str, description: str = ""):
-        """Thêm code vào lịch sử"""
-        self.code_history.append({
+        """Thêm code vào lịch sử (được ghi vào session_code_history khi repository update/create)"""
+        entry = Session.build_code_entry(code, language, description)
+        self.code_history.append(entry)
+        if not hasattr(self, "_pending_code_entries"):
+            self._pending_code_entries = []
+        self._pending_code_entries.append(entry)
+    
+    def pop_pending_code_entries(self) -> List[Dict[str, Any]]:
+        """Lấy và xóa các entries chưa được lưu vào session_code_history"""
+        entries = getattr(self, "_pending_code_entries", [])
+        self._pending_code_entries = []
+        return entries
+    
+    def attach_history_loader(self, loader: Callable[[str, int, int], List[Dict[str, Any]]]):
+        """Gắn hàm load history (session_id, skip, limit) -> entries, do repository cung cấp"""
+        self._history_loader = loader
+    
+    def get_code_history(self, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lấy lịch sử code theo trang (lazy - chỉ query khi được gọi)"""
+        loader = getattr(self, "_history_loader", None)
+        if loader and self.id:
+            return loader(self.id, skip, limit)
+        return self.code_history[skip:skip + limit]
+    
+    @staticmethod
+    def build_code_entry(code: str, language: str, description: str = "") -> Dict[str, Any]:
+        """Tạo một entry cho code_history"""
+        return {
             "code": code,
             "language": language,
             "description": description,
             "timestamp": datetime.utcnow().isoformat()
-        })
+        }
     
     def update_step(self, new_step: WorkflowStep):
         """Cập nhật bước hiện tại"""
@@ -13,6 +13,7 @@ class CodeGenerationRequest(BaseModel):
         default="gemini-2.5-flash",
         description="Gemini model to use: gemini-2.5-flash, gemini-1.5-pro, gemini-1.5-flash"
     )
+    use_cache: bool = Field(default=False, description="Opt in to reuse a cached response for an identical prompt (default: always call Gemini)")
     
     model_config = {
         "json_schema_extra": {
@@ -47,6 +48,7 @@ class CodeReviewRequest(BaseModel):
         default="gemini-2.5-flash",
         description="Gemini model to use: gemini-2.5-flash, gemini-1.5-pro, gemini-1.5-flash"
     )
+    use_cache: bool = Field(default=False, description="Opt in to reuse a cached response for an identical prompt (default: always call Gemini)")
     
     model_config = {
         "json_schema_extra": {
@@ -96,6 +96,14 @@ class SessionResponse(BaseModel):
     updated_at: datetime
 
 
+class SessionListResponse(BaseModel):
+    """Danh sách sessions của user (keyset pagination)"""
+    items: List[SessionResponse]
+    next_cursor: Optional[str] = None
+    has_more: bool = False
+    page_size: int
+
+
 class IntentClassifyRequest(BaseModel):
     """Request để classify intent"""
     prompt: str = Field(..., description="Prompt từ user")
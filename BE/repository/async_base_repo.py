@@ -0,0 +1,172 @@
+"""
+Async Base Repository - Reusable MongoDB operations trên motor (asyncio)
+"""
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar, Generic
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.projection import build_projection, materialize
+from BE.repository.pagination import build_page, keyset_filter, keyset_sort, merge_filters
+from BE.repository.counting import count_cache_key, get_count_cache, invalidate_counts
+
+T = TypeVar('T')
+
+
+class AsyncBaseRepository(Generic[T]):
+    """Async base repository - cùng API với BaseRepository nhưng không block event loop"""
+
+    def __init__(self, collection_name: str, entity_class: Type[T], sort_field: str = "created_at"):
+        """
+        Khởi tạo async base repository
+
+        Args:
+            collection_name: Tên collection trong MongoDB
+            entity_class: Class của entity (để convert dict -> entity)
+            sort_field: Field timestamp dùng để sort (conservations/messages dùng "createdAt")
+        """
+        self.entity_class = entity_class
+        self.sort_field = sort_field
+        self.collection = mongo_manager.get_async_collection(collection_name)
+
+    async def create(self, entity: T) -> T:
+        """Tạo entity mới"""
+        try:
+            entity_data = entity.to_dict(include_id=False)
+            result = await self.collection.insert_one(entity_data)
+            entity.id = str(result.inserted_id)
+            entity.mark_clean()
+            invalidate_counts(self.collection.name)
+            return entity
+        except PyMongoError as e:
+            raise Exception(f"Error creating entity: {str(e)}")
+
+    async def find_by_id(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[T]:
+        """Tìm entity theo ID (fields/view: chỉ lấy một phần document)"""
+        projection = build_projection(self.entity_class, fields, view)
+        try:
+            object_id = ObjectId(entity_id)
+            data = await self.collection.find_one({"_id": object_id}, projection)
+            return materialize(self.entity_class, data, projection) if data else None
+        except (PyMongoError, ValueError):
+            return None
+
+    async def find_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[T]:
+        """Lấy danh sách entities (fields/view: chỉ lấy một phần document)"""
+        projection = build_projection(self.entity_class, fields, view)
+        try:
+            query = filter_query or {}
+            cursor = self.collection.find(query, projection).skip(skip).limit(limit).sort(self.sort_field, -1)
+            return [materialize(self.entity_class, data, projection) async for data in cursor]
+        except PyMongoError:
+            return []
+
+    async def find_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        """
+        Keyset pagination theo (sort_field, _id) giảm dần
+
+        Args:
+            limit: Số items mỗi trang
+            cursor: next_cursor của trang trước (None = trang đầu)
+
+        Returns:
+            (entities, next_cursor) - next_cursor None nếu là trang cuối
+
+        Raises:
+            ValueError: Nếu cursor không hợp lệ
+        """
+        projection = build_projection(self.entity_class, fields, view)
+        if projection is not None:
+            projection[self.sort_field] = 1
+        query = merge_filters(filter_query, keyset_filter(self.sort_field, cursor))
+        try:
+            documents = await self.collection.find(query, projection).sort(keyset_sort(self.sort_field)).limit(limit + 1).to_list(length=limit + 1)
+            page, next_cursor = build_page(documents, limit, self.sort_field)
+            return [materialize(self.entity_class, data, projection) for data in page], next_cursor
+        except PyMongoError:
+            return [], None
+
+    async def update(self, entity: T) -> Optional[T]:
+        """Update entity"""
+        if not entity.id:
+            return None
+
+        try:
+            object_id = ObjectId(entity.id)
+
+            # Chỉ gửi các field đã thay đổi ($set) và item mới append ($push)
+            update_doc = entity.build_update()
+            if not update_doc:
+                return entity
+
+            result = await self.collection.find_one_and_update(
+                {"_id": object_id},
+                update_doc,
+                return_document=ReturnDocument.AFTER
+            )
+
+            return self.entity_class.from_dict(result) if result else None
+        except (PyMongoError, ValueError):
+            return None
+
+    async def delete(self, entity_id: str) -> bool:
+        """Xóa entity"""
+        try:
+            object_id = ObjectId(entity_id)
+            result = await self.collection.delete_one({"_id": object_id})
+            if result.deleted_count:
+                invalidate_counts(self.collection.name)
+            return result.deleted_count > 0
+        except (PyMongoError, ValueError):
+            return False
+
+    async def count(self, filter_query: dict = None) -> int:
+        """Đếm số lượng entities"""
+        try:
+            query = filter_query or {}
+            return await self.collection.count_documents(query)
+        except PyMongoError:
+            return 0
+
+    async def count_total(self, filter_query: dict = None, exact: bool = False) -> Tuple[int, bool]:
+        """
+        Đếm total cho pagination theo count strategy
+
+        - exact=True: count_documents
+        - không filter: estimated_document_count (metadata, không scan)
+        - có filter: count_documents được cache ngắn hạn theo filter
+
+        Returns:
+            (total, is_exact) - is_exact False nếu là giá trị ước lượng/cache
+        """
+        try:
+            if exact:
+                return await self.collection.count_documents(filter_query or {}), True
+            if not filter_query:
+                return await self.collection.estimated_document_count(), False
+
+            cache = get_count_cache(self.collection.name)
+            key = count_cache_key(filter_query)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached, False
+
+            total = await self.collection.count_documents(filter_query)
+            cache.set(key, total)
+            return total, True
+        except PyMongoError:
+            return 0, False
@@ -0,0 +1,41 @@
+"""
+Async Context Repository - CRUD operations cho Context collection trên motor
+"""
+from typing import List, Optional
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.entities.context_entity import Context
+
+
+class AsyncContextRepository:
+    """Async repository cho Context collection - cùng API với ContextRepository"""
+
+    def __init__(self):
+        """Khởi tạo collection từ motor client dùng chung"""
+        self.collection = mongo_manager.get_async_collection("contexts")
+
+    async def create(self, context: Context) -> Context:
+        """Lưu context mới"""
+        context_data = context.to_dict(include_id=False)
+        result = await self.collection.insert_one(context_data)
+        context.id = str(result.inserted_id)
+        return context
+
+    async def find_by_session_id(self, session_id: str) -> Optional[Context]:
+        """Tìm context theo session_id (lấy context mới nhất)"""
+        try:
+            data = await self.collection.find_one(
+                {"session_id": session_id},
+                sort=[("created_at", -1)]
+            )
+            return Context.from_dict(data) if data else None
+        except PyMongoError:
+            return None
+
+    async def find_all_by_session(self, session_id: str) -> List[Context]:
+        """Lấy tất cả contexts của một session"""
+        try:
+            cursor = self.collection.find({"session_id": session_id}).sort("created_at", -1)
+            return [Context.from_dict(data) async for data in cursor]
+        except PyMongoError:
+            return []
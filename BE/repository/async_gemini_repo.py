@@ -0,0 +1,158 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+from BE.utils.gemini_client import gemini_ai
+from BE.utils.config import env
+from BE.repository.gemini_repo import GeminiRepository, json_generation_config
+from BE.utils.llm_cache import llm_cache
+
+
+# Global limit on in-flight Gemini calls for this worker (created lazily inside the event loop)
+_gemini_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def get_gemini_semaphore() -> asyncio.Semaphore:
+    """Get the process-wide semaphore bounding concurrent Gemini calls"""
+    global _gemini_semaphore
+    if _gemini_semaphore is None:
+        _gemini_semaphore = asyncio.Semaphore(max(1, env.GEMINI_MAX_CONCURRENCY))
+    return _gemini_semaphore
+
+
+class AsyncGeminiRepository:
+    """Async repository for Google Gemini API - never blocks the event loop"""
+
+    def __init__(self, timeout: Optional[float] = None):
+        """
+        Initialize async Gemini repository using the shared singleton client
+
+        Args:
+            timeout: Per-call timeout in seconds (default: GEMINI_TIMEOUT_SECONDS)
+        """
+        self.gemini_client = gemini_ai
+        self.timeout = timeout or env.GEMINI_TIMEOUT_SECONDS
+        self.cache = llm_cache
+
+    async def _generate(self, prompt: str, model_name: Optional[str] = None, timeout: Optional[float] = None,
+                        generation_config: Optional[Dict[str, Any]] = None):
+        """Call generate_content_async bounded by the global semaphore and a timeout"""
+        if model_name or generation_config:
+            model = self.gemini_client.get_model(model_name or "gemini-2.5-flash", generation_config=generation_config)
+        else:
+            model = self.gemini_client.model
+
+        async with get_gemini_semaphore():
+            return await asyncio.wait_for(
+                model.generate_content_async(prompt),
+                timeout=timeout or self.timeout
+            )
+
+    async def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash",
+                            timeout: Optional[float] = None, use_cache: bool = False) -> str:
+        try:
+            cache_key = self.cache.make_key(model_name, prompt)
+            if use_cache:
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+
+            response = await self._generate(prompt, model_name, timeout)
+
+            # Check if response has text
+            if not response or not hasattr(response, 'text'):
+                raise Exception("No response received from Gemini")
+
+            if not response.text:
+                raise Exception("Empty response from Gemini")
+
+            if use_cache:
+                await self.cache.aset(cache_key, response.text, model_name)
+            return response.text
+        except asyncio.TimeoutError:
+            raise Exception(f"Error generating code: Gemini call timed out after {timeout or self.timeout}s")
+        except Exception as e:
+            raise Exception(f"Error generating code: {str(e)}")
+
+    async def generate_json(self, prompt: str, response_schema: Dict[str, Any],
+                            model_name: str = "gemini-2.5-flash", timeout: Optional[float] = None,
+                            use_cache: bool = True) -> str:
+        """Generate với structured output (response_mime_type JSON + response_schema)"""
+        try:
+            generation_config = json_generation_config(response_schema)
+            cache_key = self.cache.make_key(model_name, prompt, generation_config)
+            if use_cache:
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+
+            response = await self._generate(prompt, model_name, timeout, generation_config)
+
+            if not response or not getattr(response, 'text', None):
+                raise Exception("Empty response from Gemini")
+
+            await self.cache.aset(cache_key, response.text, model_name)
+            return response.text
+        except asyncio.TimeoutError:
+            raise Exception(f"Error generating JSON: Gemini call timed out after {timeout or self.timeout}s")
+        except Exception as e:
+            raise Exception(f"Error generating JSON: {str(e)}")
+
+    async def stream_code(self, prompt: str, model_name: str = "gemini-2.5-flash",
+                          timeout: Optional[float] = None, use_cache: bool = False) -> AsyncIterator[str]:
+        """
+        Stream generated text chunk by chunk (timeout applies to each chunk)
+
+        With use_cache, a cached response is replayed as a single chunk and a completed
+        stream is cached.
+        """
+        cache_key = self.cache.make_key(model_name, prompt)
+        if use_cache:
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                yield cached
+                return
+
+        model = self.gemini_client.get_model(model_name) if model_name else self.gemini_client.model
+        chunk_timeout = timeout or self.timeout
+        parts = []
+
+        try:
+            async with get_gemini_semaphore():
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True),
+                    timeout=chunk_timeout
+                )
+                iterator = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(iterator.__anext__(), timeout=chunk_timeout)
+                    except StopAsyncIteration:
+                        break
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        parts.append(text)
+                        yield text
+        except asyncio.TimeoutError:
+            raise Exception(f"Error generating code: Gemini stream timed out after {chunk_timeout}s")
+
+        if use_cache:
+            await self.cache.aset(cache_key, "".join(parts), model_name)
+
+    async def review_code(self, code: str, language: str, review_type: str = "general",
+                          model_name: str = "gemini-2.5-flash", timeout: Optional[float] = None,
+                          use_cache: bool = False) -> str:
+        try:
+            prompt = GeminiRepository.build_review_prompt(code, language, review_type)
+            cache_key = self.cache.make_key(model_name, prompt)
+            if use_cache:
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    return cached
+
+            response = await self._generate(prompt, model_name, timeout)
+            if use_cache:
+                await self.cache.aset(cache_key, response.text, model_name)
+            return response.text
+        except asyncio.TimeoutError:
+            raise Exception(f"Error reviewing code: Gemini call timed out after {timeout or self.timeout}s")
+        except Exception as e:
+            raise Exception(f"Error reviewing code: {str(e)}")
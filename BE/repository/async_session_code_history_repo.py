@@ -0,0 +1,55 @@
+"""
+Async Session Code History Repository - cùng API với SessionCodeHistoryRepository trên motor
+"""
+from typing import Any, Dict, List
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.session_code_history_repo import to_history_document, to_history_entry
+
+
+class AsyncSessionCodeHistoryRepository:
+    """Async repository cho session_code_history collection"""
+
+    def __init__(self):
+        """Khởi tạo collection từ motor client dùng chung"""
+        self.collection = mongo_manager.get_async_collection("session_code_history")
+
+    async def add(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Thêm một entry vào history"""
+        return await self.add_many(session_id, [entry]) > 0
+
+    async def add_many(self, session_id: str, entries: List[Dict[str, Any]]) -> int:
+        """Thêm nhiều entries trong một lần ghi"""
+        if not entries:
+            return 0
+        try:
+            result = await self.collection.insert_many(
+                [to_history_document(session_id, entry) for entry in entries],
+                ordered=True
+            )
+            return len(result.inserted_ids)
+        except PyMongoError:
+            return 0
+
+    async def find_by_session(self, session_id: str, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lấy history của session theo trang (cũ nhất trước)"""
+        try:
+            cursor = self.collection.find(
+                {"session_id": session_id},
+                {"_id": 0, "session_id": 0}
+            ).sort("timestamp", ASCENDING).skip(skip).limit(limit)
+            return [to_history_entry(data) async for data in cursor]
+        except PyMongoError:
+            return []
+
+    async def find_latest(self, session_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """Lấy N entries mới nhất (trả về theo thứ tự cũ -> mới)"""
+        try:
+            cursor = self.collection.find(
+                {"session_id": session_id},
+                {"_id": 0, "session_id": 0}
+            ).sort("timestamp", DESCENDING).limit(limit)
+            return [to_history_entry(data) async for data in cursor][::-1]
+        except PyMongoError:
+            return []
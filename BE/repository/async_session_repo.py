@@ -0,0 +1,164 @@
+"""
+Async Session Repository - CRUD operations cho Session collection trên motor
+"""
+from typing import Iterable, List, Optional
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.entities.session_entity import Session, WorkflowStep
+from BE.repository.session_repo import SESSION_PROJECTION, project_cached, session_projection
+from BE.repository.session_cache import session_cache
+from BE.repository.async_session_code_history_repo import AsyncSessionCodeHistoryRepository
+
+
+class AsyncSessionRepository:
+    """Async repository cho Session collection - cùng API với SessionRepository"""
+
+    def __init__(self):
+        """Khởi tạo collection từ motor client dùng chung"""
+        self.collection = mongo_manager.get_async_collection("sessions")
+        self.history_repo = AsyncSessionCodeHistoryRepository()
+
+    async def create(self, session: Session) -> Session:
+        """Tạo session mới"""
+        if not session.created_at:
+            session.created_at = datetime.utcnow()
+        if not session.updated_at:
+            session.updated_at = datetime.utcnow()
+
+        session_data = session.to_dict(include_id=False)
+        result = await self.collection.insert_one(session_data)
+        session.id = str(result.inserted_id)
+        await self.history_repo.add_many(session.id, session.pop_pending_code_entries())
+        session.mark_clean()
+        return session
+
+    @staticmethod
+    def _to_entity(data: dict, projection: dict = SESSION_PROJECTION) -> Session:
+        """Tạo Session từ document, đánh dấu partial nếu đọc bằng projection"""
+        session = Session.from_dict(data)
+        if projection is not SESSION_PROJECTION:
+            session.mark_partial(projection.keys())
+        return session
+
+    async def find_by_id(self, session_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[Session]:
+        """Tìm session theo ID (fields/view: chỉ lấy một phần document)"""
+        projection = session_projection(fields, view)
+        cached = session_cache.get(session_id)
+        if cached is not None:
+            return self._to_entity(project_cached(cached, projection), projection)
+
+        try:
+            object_id = ObjectId(session_id)
+            generation = session_cache.generation()
+            data = await self.collection.find_one({"_id": object_id}, projection)
+            if data and projection is SESSION_PROJECTION:
+                session_cache.set(session_id, data, generation)
+            return self._to_entity(data, projection) if data else None
+        except (PyMongoError, ValueError):
+            return None
+
+    async def find_by_user_id(
+        self,
+        user_id: str,
+        limit: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[Session]:
+        """Lấy danh sách sessions của user"""
+        projection = session_projection(fields, view)
+        try:
+            cursor = self.collection.find({"user_id": user_id}, projection).sort("created_at", -1).limit(limit)
+            return [self._to_entity(data, projection) async for data in cursor]
+        except PyMongoError:
+            return []
+
+    async def update(self, session: Session) -> Optional[Session]:
+        """Update session (code mới chỉ được ghi khi session còn tồn tại)"""
+        if not session.id:
+            return None
+
+        try:
+            object_id = ObjectId(session.id)
+
+            # Chỉ gửi các field đã thay đổi
+            code_entries = session.pop_pending_code_entries()
+            update_doc = session.build_update()
+            if not update_doc and not code_entries:
+                return session
+
+            result = await self.collection.find_one_and_update(
+                {"_id": object_id},
+                update_doc or {"$set": {"updated_at": datetime.utcnow()}},
+                projection=SESSION_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            session_cache.invalidate(session.id)
+            if not result:
+                return None
+
+            # Code mới được ghi vào session_code_history, không nằm trong session document
+            await self.history_repo.add_many(session.id, code_entries)
+            return Session.from_dict(result)
+        except (PyMongoError, ValueError):
+            return None
+
+    async def delete(self, session_id: str) -> bool:
+        """Xóa session"""
+        try:
+            object_id = ObjectId(session_id)
+            result = await self.collection.delete_one({"_id": object_id})
+            session_cache.invalidate(session_id)
+            return result.deleted_count > 0
+        except (PyMongoError, ValueError):
+            return False
+
+    async def update_step(self, session_id: str, new_step: WorkflowStep, session: Optional[Session] = None) -> bool:
+        """
+        Cập nhật step của session
+
+        session: entity đang được giữ trong memory -> step được cập nhật cả trên entity
+        (snapshot), để update(session) sau đó chỉ ghi step khi entity đổi step tiếp
+        """
+        try:
+            object_id = ObjectId(session_id)
+            updated_at = datetime.utcnow()
+            result = await self.collection.update_one(
+                {"_id": object_id},
+                {"$set": {
+                    "current_step": new_step.value,
+                    "updated_at": updated_at
+                }}
+            )
+            session_cache.invalidate(session_id)
+            if session is not None and result.matched_count > 0:
+                session.current_step = new_step
+                session.updated_at = updated_at
+                session.mark_fields_clean(("current_step", "updated_at"))
+            return result.modified_count > 0
+        except (PyMongoError, ValueError):
+            return False
+
+    async def add_code_history(self, session_id: str, code_entry: dict) -> bool:
+        """Thêm code vào history (collection session_code_history), False nếu session không tồn tại"""
+        try:
+            result = await self.collection.update_one(
+                {"_id": ObjectId(session_id)},
+                {"$set": {"updated_at": datetime.utcnow()}}
+            )
+            session_cache.invalidate(session_id)
+        except (PyMongoError, ValueError):
+            return False
+        if result.matched_count == 0:
+            return False
+        return await self.history_repo.add(session_id, code_entry)
+
+    async def find_code_history(self, session_id: str, skip: int = 0, limit: int = 20) -> List[dict]:
+        """Lấy code history của session theo trang"""
+        return await self.history_repo.find_by_session(session_id, skip=skip, limit=limit)
+
+    async def find_latest_code(self, session_id: str, limit: int = 1) -> List[dict]:
+        """Lấy N code entries mới nhất của session"""
+        return await self.history_repo.find_latest(session_id, limit=limit)
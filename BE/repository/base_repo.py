@@ -1,15 +1,15 @@
 """
 Base Repository - Reusable MongoDB operations
 """
-from typing import List, Optional, Type, TypeVar, Generic
+from typing import Iterable, List, Optional, Tuple, Type, TypeVar, Generic
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo.client_session import ClientSession
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.projection import build_projection, materialize
+from BE.repository.pagination import build_page, keyset_filter, keyset_sort, merge_filters
+from BE.repository.counting import count_cache_key, get_count_cache, invalidate_counts
 
 T = TypeVar('T')
 
@@ -17,67 +17,106 @@ T = TypeVar('T')
 class BaseRepository(Generic[T]):
     """Base repository với common CRUD operations"""
     
-    def __init__(self, collection_name: str, entity_class: Type[T]):
+    def __init__(self, collection_name: str, entity_class: Type[T], sort_field: str = "created_at"):
         """
         Khởi tạo base repository
         
         Args:
             collection_name: Tên collection trong MongoDB
             entity_class: Class của entity (để convert dict -> entity)
+            sort_field: Field timestamp dùng để sort (conservations/messages dùng "createdAt")
         """
         self.entity_class = entity_class
+        self.sort_field = sort_field
         
-        # MongoDB connection
-        username = os.getenv("MONGO_USERNAME", "mongo")
-        password = os.getenv("MONGO_PASSWORD", "OtfagZQFKuslkxmpTCZTlvctRGsQBLnk")
-        host = os.getenv("MONGO_HOST", "shortline.proxy.rlwy.net")
-        port = int(os.getenv("MONGO_PORT", "21101"))
-        database = os.getenv("MONGO_DATABASE", "basic-hackathon")
-        
-        from urllib.parse import quote_plus
-        password_encoded = quote_plus(password)
-        uri = f"mongodb://{username}:{password_encoded}@{host}:{port}/{database}?authSource=admin&directConnection=true"
-        
-        self.client = MongoClient(
-            uri,
-            directConnection=True,
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=10000
-        )
-        self.db = self.client[database]
+        # MongoDB connection - dùng chung client/pool của process
+        self.client = mongo_manager.get_client()
+        self.db = mongo_manager.get_database()
         self.collection: Collection = self.db[collection_name]
     
-    def create(self, entity: T) -> T:
-        """Tạo entity mới"""
+    def create(self, entity: T, session: Optional[ClientSession] = None) -> T:
+        """Tạo entity mới (session: ghi trong transaction, lỗi được raise nguyên bản)"""
         try:
             entity_data = entity.to_dict(include_id=False)
-            result = self.collection.insert_one(entity_data)
+            result = self.collection.insert_one(entity_data, session=session)
             entity.id = str(result.inserted_id)
+            entity.mark_clean()
+            invalidate_counts(self.collection.name)
             return entity
         except PyMongoError as e:
+            if session is not None:
+                raise
             raise Exception(f"Error creating entity: {str(e)}")
     
-    def find_by_id(self, entity_id: str) -> Optional[T]:
-        """Tìm entity theo ID"""
+    def find_by_id(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[T]:
+        """Tìm entity theo ID (fields/view: chỉ lấy một phần document)"""
+        projection = build_projection(self.entity_class, fields, view)
         try:
             object_id = ObjectId(entity_id)
-            data = self.collection.find_one({"_id": object_id})
-            return self.entity_class.from_dict(data) if data else None
+            data = self.collection.find_one({"_id": object_id}, projection)
+            return materialize(self.entity_class, data, projection) if data else None
         except (PyMongoError, ValueError):
             return None
     
-    def find_all(self, skip: int = 0, limit: int = 100, filter_query: dict = None) -> List[T]:
-        """Lấy danh sách entities"""
+    def find_all(
+        self,
+        skip: int = 0,
+        limit: int = 100,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[T]:
+        """Lấy danh sách entities (fields/view: chỉ lấy một phần document)"""
+        projection = build_projection(self.entity_class, fields, view)
         try:
             query = filter_query or {}
-            cursor = self.collection.find(query).skip(skip).limit(limit).sort("created_at", -1)
-            return [self.entity_class.from_dict(data) for data in cursor]
+            cursor = self.collection.find(query, projection).skip(skip).limit(limit).sort(self.sort_field, -1)
+            return [materialize(self.entity_class, data, projection) for data in cursor]
         except PyMongoError:
             return []
     
-    def find_by_user(self, user_id: str, skip: int = 0, limit: int = 100) -> List[T]:
+    def find_page(
+        self,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> Tuple[List[T], Optional[str]]:
+        """
+        Keyset pagination theo (sort_field, _id) giảm dần
+
+        Args:
+            limit: Số items mỗi trang
+            cursor: next_cursor của trang trước (None = trang đầu)
+
+        Returns:
+            (entities, next_cursor) - next_cursor None nếu là trang cuối
+
+        Raises:
+            ValueError: Nếu cursor không hợp lệ
+        """
+        projection = build_projection(self.entity_class, fields, view)
+        if projection is not None:
+            projection[self.sort_field] = 1
+        query = merge_filters(filter_query, keyset_filter(self.sort_field, cursor))
+        try:
+            documents = list(self.collection.find(query, projection).sort(keyset_sort(self.sort_field)).limit(limit + 1))
+            page, next_cursor = build_page(documents, limit, self.sort_field)
+            return [materialize(self.entity_class, data, projection) for data in page], next_cursor
+        except PyMongoError:
+            return [], None
+    
+    def find_by_user(
+        self,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[T]:
         """Tìm entities theo user_id"""
-        return self.find_all(skip=skip, limit=limit, filter_query={"user_id": user_id})
+        return self.find_all(skip=skip, limit=limit, filter_query={"user_id": user_id}, fields=fields, view=view)
     
     def update(self, entity: T) -> Optional[T]:
         """Update entity"""
@@ -86,11 +125,15 @@ class BaseRepository(Generic[T]):
         
         try:
             object_id = ObjectId(entity.id)
-            entity_data = entity.to_dict(include_id=False)
+            
+            # Chỉ gửi các field đã thay đổi ($set) và item mới append ($push)
+            update_doc = entity.build_update()
+            if not update_doc:
+                return entity
             
             result = self.collection.find_one_and_update(
                 {"_id": object_id},
-                {"$set": entity_data},
+                update_doc,
                 return_document=True
             )
             
@@ -98,13 +141,17 @@ class BaseRepository(Generic[T]):
         except (PyMongoError, ValueError):
             return None
     
-    def delete(self, entity_id: str) -> bool:
-        """Xóa entity"""
+    def delete(self, entity_id: str, session: Optional[ClientSession] = None) -> bool:
+        """Xóa entity (session: ghi trong transaction, lỗi được raise nguyên bản)"""
         try:
             object_id = ObjectId(entity_id)
-            result = self.collection.delete_one({"_id": object_id})
+            result = self.collection.delete_one({"_id": object_id}, session=session)
+            if result.deleted_count:
+                invalidate_counts(self.collection.name)
             return result.deleted_count > 0
         except (PyMongoError, ValueError):
+            if session is not None:
+                raise
             return False
     
     def count(self, filter_query: dict = None) -> int:
@@ -115,12 +162,45 @@ class BaseRepository(Generic[T]):
         except PyMongoError:
             return 0
     
+    def count_total(self, filter_query: dict = None, exact: bool = False) -> Tuple[int, bool]:
+        """
+        Đếm total cho pagination theo count strategy
+        
+        - exact=True: count_documents
+        - không filter: estimated_document_count (metadata, không scan)
+        - có filter: count_documents được cache ngắn hạn theo filter
+        
+        Returns:
+            (total, is_exact) - is_exact False nếu là giá trị ước lượng/cache
+        """
+        try:
+            if exact:
+                return self.collection.count_documents(filter_query or {}), True
+            if not filter_query:
+                return self.collection.estimated_document_count(), False
+            
+            cache = get_count_cache(self.collection.name)
+            key = count_cache_key(filter_query)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached, False
+            
+            total = self.collection.count_documents(filter_query)
+            cache.set(key, total)
+            return total, True
+        except PyMongoError:
+            return 0, False
+    
     def count_by_user(self, user_id: str) -> int:
         """Đếm entities của user"""
         return self.count({"user_id": user_id})
     
     def close(self):
-        """Đóng connection"""
-        if self.client:
-            self.client.close()
+        """
+        Giải phóng repository
+        
+        Client được dùng chung cho cả process nên không đóng ở đây,
+        mongo_manager.close() sẽ đóng khi app shutdown.
+        """
+        pass
 
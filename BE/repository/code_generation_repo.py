@@ -2,15 +2,28 @@
 CodeGeneration Repository
 """
 from typing import List
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
 from BE.repository.base_repo import BaseRepository
+from BE.repository.indexes import IndexSpec, QueryShape
 from BE.entities.code_generation_entity import CodeGeneration
 
 
 class CodeGenerationRepository(BaseRepository[CodeGeneration]):
     """Repository cho CodeGeneration collection"""
     
+    COLLECTION_NAME = "code_generations"
+    INDEXES = (
+        IndexSpec((("request_id", ASCENDING), ("created_at", DESCENDING)), name="request_id_created_at"),
+        IndexSpec((("status", ASCENDING), ("created_at", DESCENDING)), name="status_created_at"),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_by_request", {"request_id": ObjectId()}, (("created_at", DESCENDING),)),
+        QueryShape("find_by_status", {"status": "success"}, (("created_at", DESCENDING),)),
+    )
+    
     def __init__(self):
-        super().__init__("code_generations", CodeGeneration)
+        super().__init__(self.COLLECTION_NAME, CodeGeneration)
     
     def find_by_request(self, request_id: str, skip: int = 0, limit: int = 100) -> List[CodeGeneration]:
         """Tìm code generations theo request_id"""
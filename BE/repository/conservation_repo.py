@@ -2,64 +2,252 @@
 Conservation Repository
 Lưu ý: Collection name là "conservations" (không phải "conversations")
 """
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING, TEXT, UpdateOne
+from pymongo.client_session import ClientSession
 from pymongo.errors import PyMongoError
 from BE.repository.base_repo import BaseRepository
+from BE.repository.indexes import IndexSpec, QueryShape
+from BE.repository.projection import build_projection, materialize
+from BE.repository.pagination import build_page, keyset_filter, keyset_sort, merge_filters
 from BE.entities.conservation_entity import Conservation
+from BE.entities.message_entity import Message
+from BE.utils.text_normalize import normalize_text
 
 
 class ConservationRepository(BaseRepository[Conservation]):
     """Repository cho Conservations collection"""
     
+    # Collection name chính xác trong MongoDB là "conservations"
+    COLLECTION_NAME = "conservations"
+    # Conservation đang được xóa nền (status "deleting") không còn hiển thị khi đọc
+    VISIBLE_FILTER = {"status": {"$ne": "deleting"}}
+    INDEXES = (
+        IndexSpec((("createdAt", DESCENDING), ("_id", DESCENDING)), name="createdAt_id_desc"),
+        # Text index trên bản chuẩn hóa (bỏ dấu) của title/goal/facts, title được ưu tiên khi xếp hạng
+        IndexSpec(
+            (("search.title", TEXT), ("search.goal", TEXT), ("search.facts", TEXT)),
+            name="search_text",
+            weights={"search.title": 10, "search.goal": 4, "search.facts": 1},
+            default_language="none"
+        ),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_recent", VISIBLE_FILTER, (("createdAt", DESCENDING),)),
+        QueryShape("find_page", VISIBLE_FILTER, (("createdAt", DESCENDING), ("_id", DESCENDING))),
+        QueryShape("search", {"$and": [{"$text": {"$search": "api"}}, VISIBLE_FILTER]}),
+    )
+    
     def __init__(self):
-        # Collection name chính xác trong MongoDB là "conservations"
-        super().__init__("conservations", Conservation)
+        super().__init__(self.COLLECTION_NAME, Conservation, sort_field="createdAt")
+    
+    @staticmethod
+    def build_search_filter(query: str) -> Optional[Dict[str, Any]]:
+        """Filter $text cho query (None nếu query không có từ nào sau khi chuẩn hóa)"""
+        normalized = normalize_text(query)
+        if not normalized:
+            return None
+        return {"$text": {"$search": normalized}}
+    
+    @classmethod
+    def visible(cls, filter_query: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Gộp filter với VISIBLE_FILTER (bỏ các conservation đang xóa)"""
+        return merge_filters(filter_query, cls.VISIBLE_FILTER)
     
-    def find_by_title(self, title: str, skip: int = 0, limit: int = 100) -> List[Conservation]:
-        """Tìm conservations theo title (partial match)"""
+    def search(
+        self,
+        query: str,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[Conservation]:
+        """
+        Full-text search trên title/goal/facts (không phân biệt dấu), xếp theo độ liên quan
+        
+        Dùng text index search_text nên không scan toàn bộ collection.
+        """
+        filter_query = self.build_search_filter(query)
+        if filter_query is None:
+            return []
+        
+        projection = build_projection(Conservation, fields, view)
+        score = {"score": {"$meta": "textScore"}}
         try:
-            import re
-            pattern = re.compile(re.escape(title), re.IGNORECASE)
-            return self.find_all(
-                skip=skip,
-                limit=limit,
-                filter_query={"title": pattern}
-            )
-        except:
+            cursor = self.collection.find(self.visible(filter_query), {**(projection or {}), **score})
+            cursor = cursor.sort([("score", {"$meta": "textScore"}), ("createdAt", DESCENDING)]).skip(skip).limit(limit)
+            return [materialize(Conservation, data, projection) for data in cursor]
+        except PyMongoError:
             return []
     
-    def find_recent(self, skip: int = 0, limit: int = 10) -> List[Conservation]:
+    def find_by_title(
+        self,
+        title: str,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[Conservation]:
+        """Tìm conservations theo title (dùng text search, xem search())"""
+        return self.search(title, skip=skip, limit=limit, fields=fields, view=view)
+    
+    def find_with_messages(
+        self,
+        conservation_id: str,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Optional[Tuple[Conservation, List[Message], Optional[str]]]:
+        """
+        Lấy conservation và một cửa sổ messages (mới nhất trước) trong một aggregation ($lookup)
+        
+        $lookup dùng localField/foreignField + pipeline nên sub-pipeline chạy trên
+        index messages(conversationId, createdAt, _id) và chỉ lấy limit + 1 messages.
+        
+        Args:
+            conservation_id: ID của conservation
+            limit: Số messages tối đa trong cửa sổ
+            cursor: next_cursor của cửa sổ trước (lấy messages cũ hơn)
+            
+        Returns:
+            (conservation, messages theo thứ tự thời gian, next_cursor) hoặc None nếu không tồn tại
+            
+        Raises:
+            ValueError: Nếu cursor không hợp lệ
+        """
+        message_window = [{"$sort": dict(keyset_sort("createdAt"))}, {"$limit": limit + 1}]
+        message_filter = keyset_filter("createdAt", cursor)
+        if message_filter:
+            message_window.insert(0, {"$match": message_filter})
+        
+        try:
+            pipeline = [
+                {"$match": self.visible({"_id": ObjectId(conservation_id)})},
+                {"$project": {"search": 0}},
+                {"$lookup": {
+                    "from": "messages",
+                    "localField": "_id",
+                    "foreignField": "conversationId",
+                    "pipeline": message_window,
+                    "as": "messages"
+                }}
+            ]
+            data = next(self.collection.aggregate(pipeline), None)
+        except (PyMongoError, InvalidId):
+            return None
+        if not data:
+            return None
+        
+        documents, next_cursor = build_page(data.pop("messages"), limit, "createdAt")
+        messages = [Message.from_dict(doc) for doc in reversed(documents)]
+        return Conservation.from_dict(data), messages, next_cursor
+    
+    def find_recent(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[Conservation]:
         """Lấy các conservations mới nhất"""
+        projection = build_projection(Conservation, fields, view)
         try:
-            cursor = self.collection.find().sort("createdAt", -1).skip(skip).limit(limit)
-            return [Conservation.from_dict(data) for data in cursor]
+            cursor = self.collection.find(self.VISIBLE_FILTER, projection).sort("createdAt", -1).skip(skip).limit(limit)
+            return [materialize(Conservation, data, projection) for data in cursor]
         except PyMongoError:
             return []
     
-    def increment_message_count(self, conservation_id: str) -> bool:
+    def increment_message_count(self, conservation_id: str, amount: int = 1,
+                                session: Optional[ClientSession] = None) -> bool:
         """
-        Tăng message count khi có message mới
+        Tăng message count khi có message mới (amount âm khi xóa message)
         
         Args:
             conservation_id: ID của conservation
+            amount: Số messages được thêm (batch insert tăng một lần)
+            session: Session của transaction (lỗi được raise để transaction abort)
             
         Returns:
             bool: True nếu thành công
         """
         try:
-            from bson import ObjectId
             obj_id = ObjectId(conservation_id)
             result = self.collection.update_one(
                 {"_id": obj_id},
                 {
-                    "$inc": {"messageCount": 1},
+                    "$inc": {"messageCount": amount},
                     "$set": {"updatedAt": datetime.utcnow()}
-                }
+                },
+                session=session
             )
             return result.modified_count > 0
-        except:
+        except (PyMongoError, InvalidId):
+            if session is not None:
+                raise
+            return False
+    
+    def mark_deleting(self, conservation_id: str) -> bool:
+        """Đánh dấu conservation đang được xóa (messages được xóa nền theo batch)"""
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(conservation_id)},
+                {"$set": {"status": "deleting", "updatedAt": datetime.utcnow()}}
+            )
+            return result.matched_count > 0
+        except (PyMongoError, InvalidId):
             return False
     
+    def reconcile_message_counts(self, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Tính lại messageCount từ messages collection và sửa các conservation bị lệch
+        
+        Duyệt conservations theo _id từng batch; mỗi batch đếm messages bằng một
+        aggregation $group (dùng index conversationId_createdAt_id) và ghi các giá trị
+        lệch bằng một bulk_write. Mỗi update chỉ khớp khi messageCount vẫn bằng giá trị
+        đã đọc: conservation có message được thêm/xóa trong lúc reconcile bị bỏ qua
+        (lần chạy sau sửa) thay vì bị ghi đè bằng count cũ.
+        
+        Returns:
+            Dict: {"checked": số đã kiểm tra, "fixed": số đã sửa, "skipped": số bị bỏ qua do thay đổi đồng thời}
+        """
+        checked = 0
+        fixed = 0
+        skipped = 0
+        last_id = None
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = list(
+                self.collection.find(query, {"messageCount": 1}).sort("_id", 1).limit(batch_size)
+            )
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            checked += len(batch)
+            
+            ids = [data["_id"] for data in batch]
+            counts = {
+                row["_id"]: row["count"]
+                for row in self.db["messages"].aggregate([
+                    {"$match": {"conversationId": {"$in": ids}}},
+                    {"$group": {"_id": "$conversationId", "count": {"$sum": 1}}}
+                ])
+            }
+            updates = [
+                UpdateOne(
+                    {"_id": data["_id"], "messageCount": data.get("messageCount")},
+                    {"$set": {"messageCount": counts.get(data["_id"], 0)}}
+                )
+                for data in batch
+                if data.get("messageCount") != counts.get(data["_id"], 0)
+            ]
+            if updates:
+                result = self.collection.bulk_write(updates, ordered=False)
+                fixed += result.matched_count
+                skipped += len(updates) - result.matched_count
+        return {"checked": checked, "fixed": fixed, "skipped": skipped}
+    
     def add_fact(self, conservation_id: str, fact: str) -> bool:
         """
         Thêm fact vào conservation
@@ -72,16 +260,41 @@ class ConservationRepository(BaseRepository[Conservation]):
             bool: True nếu thành công
         """
         try:
-            from bson import ObjectId
             obj_id = ObjectId(conservation_id)
+            # Pipeline update: append fact và cập nhật search.facts trong cùng một lần ghi
             result = self.collection.update_one(
                 {"_id": obj_id},
-                {
-                    "$push": {"facts": fact},
-                    "$set": {"updatedAt": datetime.utcnow()}
-                }
+                [{"$set": {
+                    "facts": {"$concatArrays": [{"$ifNull": ["$facts", []]}, [fact]]},
+                    "search.facts": {"$trim": {"input": {"$concat": [
+                        {"$ifNull": ["$search.facts", ""]}, " ", normalize_text(fact)
+                    ]}}},
+                    "updatedAt": datetime.utcnow()
+                }}]
             )
             return result.modified_count > 0
         except:
             return False
+    
+    def backfill_search_fields(self, batch_size: int = 500) -> int:
+        """
+        Tạo field search cho conservations cũ chưa có (cần cho text index)
+        
+        Returns:
+            int: Số conservations đã cập nhật
+        """
+        updated = 0
+        query = {"search": {"$exists": False}}
+        while True:
+            batch = list(self.collection.find(query, {"title": 1, "goal": 1, "facts": 1}).limit(batch_size))
+            if not batch:
+                break
+            for data in batch:
+                conservation = Conservation.from_dict(data)
+                self.collection.update_one(
+                    {"_id": data["_id"]},
+                    {"$set": {"search": conservation.build_search_fields()}}
+                )
+                updated += 1
+        return updated
 
@@ -3,40 +3,30 @@ Context Repository - CRUD operations cho Context collection
 """
 from typing import List, Optional
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
-import os
-from dotenv import load_dotenv
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.indexes import IndexSpec, QueryShape
 from BE.entities.context_entity import Context
 
-load_dotenv()
-
 
 class ContextRepository:
     """Repository để thao tác với Context collection trong MongoDB"""
     
+    COLLECTION_NAME = "contexts"
+    INDEXES = (
+        IndexSpec((("session_id", ASCENDING), ("created_at", DESCENDING)), name="session_id_created_at"),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_by_session_id", {"session_id": ""}, (("created_at", DESCENDING),)),
+    )
+    
     def __init__(self):
-        """Khởi tạo connection tới MongoDB"""
-        username = os.getenv("MONGO_USERNAME", "mongo")
-        password = os.getenv("MONGO_PASSWORD", "OtfagZQFKuslkxmpTCZTlvctRGsQBLnk")
-        host = os.getenv("MONGO_HOST", "shortline.proxy.rlwy.net")
-        port = int(os.getenv("MONGO_PORT", "21101"))
-        database = os.getenv("MONGO_DATABASE", "basic-hackathon")
-        
-        from urllib.parse import quote_plus
-        password_encoded = quote_plus(password)
-        
-        uri = f"mongodb://{username}:{password_encoded}@{host}:{port}/{database}?authSource=admin&directConnection=true"
-        
-        self.client = MongoClient(
-            uri,
-            directConnection=True,
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=10000
-        )
-        self.db = self.client[database]
-        self.collection: Collection = self.db["contexts"]
+        """Khởi tạo collection từ MongoDB client dùng chung"""
+        self.client = mongo_manager.get_client()
+        self.db = mongo_manager.get_database()
+        self.collection: Collection = self.db[self.COLLECTION_NAME]
     
     def create(self, context: Context) -> Context:
         """Lưu context mới"""
@@ -65,7 +55,6 @@ class ContextRepository:
             return []
     
     def close(self):
-        """Đóng connection"""
-        if self.client:
-            self.client.close()
+        """Client dùng chung được đóng bởi mongo_manager khi app shutdown"""
+        pass
 
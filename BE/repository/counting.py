@@ -0,0 +1,46 @@
+"""
+Count Strategy - Total cho pagination không phải count_documents mỗi lần
+
+- Không filter: estimated_document_count (đọc metadata collection, O(1))
+- Có filter: count_documents được cache ngắn hạn theo filter (mỗi collection một cache,
+  xóa khi collection có insert/delete qua repository)
+- Filter "nóng" có counter được maintain sẵn (vd messageCount của conservation)
+  do repository tự override
+"""
+import threading
+from typing import Any, Dict
+
+from bson import json_util
+
+from BE.utils.config import env
+from BE.utils.ttl_cache import TTLCache
+
+
+_count_caches: Dict[str, TTLCache] = {}
+_count_caches_lock = threading.Lock()
+
+
+def get_count_cache(collection_name: str) -> TTLCache:
+    """Lấy cache count của collection (tạo ở lần gọi đầu tiên)"""
+    with _count_caches_lock:
+        cache = _count_caches.get(collection_name)
+        if cache is None:
+            cache = TTLCache(
+                max_entries=env.COUNT_CACHE_MAX_ENTRIES,
+                ttl_seconds=env.COUNT_CACHE_TTL_SECONDS
+            )
+            _count_caches[collection_name] = cache
+        return cache
+
+
+def count_cache_key(filter_query: Dict[str, Any]) -> str:
+    """Key ổn định cho filter (hỗ trợ ObjectId, datetime, regex)"""
+    return json_util.dumps(filter_query, sort_keys=True)
+
+
+def invalidate_counts(collection_name: str):
+    """Xóa các count đã cache của collection"""
+    with _count_caches_lock:
+        cache = _count_caches.get(collection_name)
+    if cache is not None:
+        cache.clear()
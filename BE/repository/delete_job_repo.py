@@ -0,0 +1,128 @@
+"""
+DeleteJob Repository - Data access layer cho cascade delete jobs
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from BE.repository.base_repo import BaseRepository
+from BE.repository.counting import invalidate_counts
+from BE.repository.indexes import IndexSpec, QueryShape
+from BE.entities.delete_job_entity import DeleteJob, DeleteJobStatus
+
+
+ACTIVE_STATUSES = [DeleteJobStatus.PENDING.value, DeleteJobStatus.RUNNING.value, DeleteJobStatus.FAILED.value]
+
+
+class DeleteJobRepository(BaseRepository[DeleteJob]):
+    """Repository cho delete_jobs collection"""
+
+    COLLECTION_NAME = "delete_jobs"
+    INDEXES = (
+        IndexSpec((("conservationId", ASCENDING), ("status", ASCENDING)), name="conservationId_status"),
+        # Mỗi conservation có tối đa một job chưa hoàn thành ($in trong partial filter cần MongoDB 6.0+)
+        IndexSpec(
+            (("conservationId", ASCENDING),),
+            name="conservationId_active_unique",
+            unique=True,
+            partial_filter={"status": {"$in": ACTIVE_STATUSES}}
+        ),
+        IndexSpec((("status", ASCENDING), ("updatedAt", ASCENDING)), name="status_updatedAt"),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_active_by_conservation", {"conservationId": ObjectId(), "status": {"$in": ACTIVE_STATUSES}}),
+        QueryShape("find_resumable", {"$or": [
+            {"status": DeleteJobStatus.PENDING.value},
+            {"status": DeleteJobStatus.RUNNING.value, "updatedAt": {"$lt": datetime(2000, 1, 1)}}
+        ]}),
+    )
+
+    def __init__(self):
+        super().__init__(self.COLLECTION_NAME, DeleteJob, sort_field="createdAt")
+
+    def find_active_by_conservation(self, conservation_id: str) -> Optional[DeleteJob]:
+        """Job chưa hoàn thành của conservation (pending/running/failed)"""
+        try:
+            data = self.collection.find_one({
+                "conservationId": ObjectId(conservation_id),
+                "status": {"$in": ACTIVE_STATUSES}
+            })
+            return DeleteJob.from_dict(data) if data else None
+        except (PyMongoError, InvalidId):
+            return None
+
+    def create_active(self, job: DeleteJob) -> Optional[DeleteJob]:
+        """
+        Tạo job cho conservation; nếu đã có job chưa hoàn thành thì trả về job đó
+
+        Unique index conservationId_active_unique chặn hai request đồng thời cùng tạo job.
+
+        Returns:
+            Optional[DeleteJob]: Job đã tạo/đang có (None nếu job đang có vừa hoàn thành)
+        """
+        try:
+            result = self.collection.insert_one(job.to_dict(include_id=False))
+        except DuplicateKeyError:
+            return self.find_active_by_conservation(job.conservation_id)
+        except PyMongoError as e:
+            raise Exception(f"Error creating entity: {str(e)}")
+        job.id = str(result.inserted_id)
+        job.mark_clean()
+        invalidate_counts(self.collection.name)
+        return job
+
+    def find_resumable(self, stale_after_seconds: float, limit: int = 100) -> List[DeleteJob]:
+        """Jobs cần chạy tiếp: pending hoặc running nhưng không có heartbeat (process đã chết)"""
+        stale_before = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+        try:
+            cursor = self.collection.find({"$or": [
+                {"status": DeleteJobStatus.PENDING.value},
+                {"status": DeleteJobStatus.RUNNING.value, "updatedAt": {"$lt": stale_before}}
+            ]}).limit(limit)
+            return [DeleteJob.from_dict(data) for data in cursor]
+        except PyMongoError:
+            return []
+
+    def claim(self, job_id: str, stale_after_seconds: float) -> bool:
+        """
+        Nhận job để chạy (atomic) - chỉ một worker chạy một job tại một thời điểm
+
+        Job nhận được nếu đang pending/failed, hoặc running nhưng heartbeat đã quá hạn
+        """
+        stale_before = datetime.utcnow() - timedelta(seconds=stale_after_seconds)
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(job_id), "$or": [
+                    {"status": {"$in": [DeleteJobStatus.PENDING.value, DeleteJobStatus.FAILED.value]}},
+                    {"status": DeleteJobStatus.RUNNING.value, "updatedAt": {"$lt": stale_before}}
+                ]},
+                {"$set": {"status": DeleteJobStatus.RUNNING.value, "error": None, "updatedAt": datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except (PyMongoError, InvalidId):
+            return False
+
+    def add_progress(self, job_id: str, deleted: int) -> bool:
+        """Cộng số messages đã xóa và cập nhật heartbeat"""
+        try:
+            result = self.collection.update_one(
+                {"_id": ObjectId(job_id)},
+                {"$inc": {"deletedMessages": deleted}, "$set": {"updatedAt": datetime.utcnow()}}
+            )
+            return result.modified_count > 0
+        except (PyMongoError, InvalidId):
+            return False
+
+    def finish(self, job_id: str, status: DeleteJobStatus, error: Optional[str] = None) -> bool:
+        """Kết thúc job (completed/failed)"""
+        now = datetime.utcnow()
+        update = {"status": status.value, "error": error, "updatedAt": now}
+        if status == DeleteJobStatus.COMPLETED:
+            update["completedAt"] = now
+        try:
+            result = self.collection.update_one({"_id": ObjectId(job_id)}, {"$set": update})
+            return result.modified_count > 0
+        except (PyMongoError, InvalidId):
+            return False
@@ -1,6 +1,12 @@
-from typing import Optional
-from utils.gemini_client import gemini_ai
-from utils.config import env
+from typing import Any, Dict, Optional
+from BE.utils.gemini_client import gemini_ai
+from BE.utils.config import env
+from BE.utils.llm_cache import llm_cache
+
+
+def json_generation_config(response_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """generation_config cho structured JSON output"""
+    return {"response_mime_type": "application/json", "response_schema": response_schema}
 
 
 class GeminiRepository:
@@ -9,10 +15,21 @@ class GeminiRepository:
     def __init__(self):
         """Initialize Gemini API client using singleton"""
         self.gemini_client = gemini_ai
-        self.model = self.gemini_client.model
+        self.cache = llm_cache
     
-    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash") -> str:
+    @property
+    def model(self):
+        """Default model (genai được configure ở lần dùng đầu tiên)"""
+        return self.gemini_client.model
+    
+    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash", use_cache: bool = False) -> str:
         try:
+            cache_key = self.cache.make_key(model_name, prompt)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
             # Get specific model if requested or use default
             if model_name:
                 model = self.gemini_client.get_model(model_name)
@@ -28,14 +45,58 @@ class GeminiRepository:
             if not response.text:
                 raise Exception("Empty response from Gemini")
             
+            if use_cache:
+                self.cache.set(cache_key, response.text, model_name)
             return response.text
         except Exception as e:
             raise Exception(f"Error generating code: {str(e)}")
     
-    def review_code(self, code: str, language: str, review_type: str = "general", model_name: str = "gemini-2.5-flash") -> str:
+    def generate_json(self, prompt: str, response_schema: Dict[str, Any], model_name: str = "gemini-2.5-flash",
+                      use_cache: bool = True) -> str:
+        """Generate với structured output (response_mime_type JSON + response_schema)"""
+        try:
+            generation_config = json_generation_config(response_schema)
+            cache_key = self.cache.make_key(model_name, prompt, generation_config)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            model = self.gemini_client.get_model(model_name, generation_config=generation_config)
+            response = model.generate_content(prompt)
+            
+            if not response or not getattr(response, 'text', None):
+                raise Exception("Empty response from Gemini")
+            
+            self.cache.set(cache_key, response.text, model_name)
+            return response.text
+        except Exception as e:
+            raise Exception(f"Error generating JSON: {str(e)}")
+    
+    def review_code(self, code: str, language: str, review_type: str = "general", model_name: str = "gemini-2.5-flash",
+                    use_cache: bool = False) -> str:
 
         try:
-            prompt = f"""
+            prompt = self.build_review_prompt(code, language, review_type)
+            cache_key = self.cache.make_key(model_name, prompt)
+            if use_cache:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+            
+            # Get specific model if requested
+            model = self.gemini_client.get_model(model_name)
+            response = model.generate_content(prompt)
+            if use_cache:
+                self.cache.set(cache_key, response.text, model_name)
+            return response.text
+        except Exception as e:
+            raise Exception(f"Error reviewing code: {str(e)}")
+    
+    @staticmethod
+    def build_review_prompt(code: str, language: str, review_type: str = "general") -> str:
+        """Build code review prompt (shared with AsyncGeminiRepository)"""
+        return f"""
             Please review the following {language} code with focus on {review_type} aspects:
             
             ```{language}
@@ -48,13 +109,6 @@ class GeminiRepository:
             3. Specific suggestions for improvements
             4. Summary of code quality
             """
-            
-            # Get specific model if requested
-            model = self.gemini_client.get_model(model_name)
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e:
-            raise Exception(f"Error reviewing code: {str(e)}")
     
     def chat(self, prompt: str) -> str:
         try:
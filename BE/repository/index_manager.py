@@ -0,0 +1,114 @@
+"""
+Index Manager - Tạo index khi startup và kiểm tra query plan (explain) cho mọi query shape
+
+Index và query shape được khai báo trên từng repository (xem BE.repository.indexes).
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo.errors import PyMongoError
+
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.indexes import create_indexes
+from BE.repository.conservation_repo import ConservationRepository
+from BE.repository.message_repo import MessageRepository
+from BE.repository.code_generation_repo import CodeGenerationRepository
+from BE.repository.session_repo import SessionRepository
+from BE.repository.session_code_history_repo import SessionCodeHistoryRepository
+from BE.repository.context_repo import ContextRepository
+from BE.repository.llm_cache_repo import LLMCacheRepository
+from BE.repository.delete_job_repo import DeleteJobRepository
+from BE.repository.refinement_state_repo import RefinementStateRepository
+
+
+# Các repository có khai báo COLLECTION_NAME / INDEXES / QUERY_SHAPES
+REGISTERED_REPOSITORIES = (
+    ConservationRepository,
+    MessageRepository,
+    CodeGenerationRepository,
+    SessionRepository,
+    SessionCodeHistoryRepository,
+    ContextRepository,
+    LLMCacheRepository,
+    DeleteJobRepository,
+    RefinementStateRepository,
+)
+
+
+def _collect_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Duyệt cây plan (inputStage/inputStages/queryPlan) và trả về danh sách stage"""
+    stages = [plan]
+    children = []
+    if "queryPlan" in plan:
+        children.append(plan["queryPlan"])
+    if "inputStage" in plan:
+        children.append(plan["inputStage"])
+    children.extend(plan.get("inputStages", []))
+    for child in children:
+        stages.extend(_collect_stages(child))
+    return stages
+
+
+class IndexManager:
+    """Quản lý index của các repository đã đăng ký"""
+
+    def __init__(self, repositories: Iterable[type] = REGISTERED_REPOSITORIES):
+        self.repositories = tuple(repositories)
+
+    def ensure_indexes(self) -> Dict[str, List[str]]:
+        """
+        Tạo tất cả index đã khai báo (idempotent)
+
+        Returns:
+            Dict: collection -> tên các index
+        """
+        created: Dict[str, List[str]] = {}
+        for repo_class in self.repositories:
+            collection = mongo_manager.get_collection(repo_class.COLLECTION_NAME)
+            created[repo_class.COLLECTION_NAME] = create_indexes(collection, repo_class.INDEXES)
+        return created
+
+    def explain_query_shapes(self) -> List[Dict[str, Any]]:
+        """
+        Chạy explain() cho mọi query shape đã đăng ký
+
+        Returns:
+            List[Dict]: Mỗi phần tử gồm collection, query, stages, indexes,
+            collscan (full scan) và in_memory_sort (sort không dùng index)
+        """
+        reports = []
+        for repo_class in self.repositories:
+            collection = mongo_manager.get_collection(repo_class.COLLECTION_NAME)
+            for shape in repo_class.QUERY_SHAPES:
+                report: Dict[str, Any] = {
+                    "collection": repo_class.COLLECTION_NAME,
+                    "query": shape.name,
+                    "error": None
+                }
+                try:
+                    cursor = collection.find(shape.filter).limit(1)
+                    if shape.sort:
+                        cursor = cursor.sort(list(shape.sort))
+                    winning_plan = cursor.explain()["queryPlanner"]["winningPlan"]
+                except (PyMongoError, KeyError) as e:
+                    report.update({"error": str(e), "collscan": None, "in_memory_sort": None})
+                    reports.append(report)
+                    continue
+
+                stages = _collect_stages(winning_plan)
+                report.update({
+                    "stages": [stage.get("stage") for stage in stages],
+                    "indexes": [stage["indexName"] for stage in stages if "indexName" in stage],
+                    "collscan": any(stage.get("stage") == "COLLSCAN" for stage in stages),
+                    "in_memory_sort": any(stage.get("stage") == "SORT" for stage in stages)
+                })
+                reports.append(report)
+        return reports
+
+    def find_collscans(self, reports: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
+        """Lọc các query shape đang full scan"""
+        reports = reports if reports is not None else self.explain_query_shapes()
+        return [report for report in reports if report.get("collscan")]
+
+
+# Singleton instance
+index_manager = IndexManager()
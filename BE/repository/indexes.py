@@ -0,0 +1,66 @@
+"""
+Index declarations - Khai báo index và query shape cho từng repository
+
+Repository khai báo (class attributes):
+- COLLECTION_NAME: tên collection
+- INDEXES: các IndexSpec cần có
+- QUERY_SHAPES: các query (filter + sort) repository thực sự chạy, dùng để explain()
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pymongo import IndexModel
+from pymongo.collection import Collection
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Một index của collection (direction: 1/-1 hoặc "text")"""
+    keys: Tuple[Tuple[str, Union[int, str]], ...]
+    name: str
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    # Partial index: chỉ index các document khớp filter (vd unique trong một tập trạng thái)
+    partial_filter: Optional[Dict[str, Any]] = None
+    # Text index options
+    weights: Optional[Dict[str, int]] = None
+    default_language: Optional[str] = None
+
+    def to_index_model(self) -> IndexModel:
+        """Chuyển thành pymongo IndexModel"""
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter:
+            options["partialFilterExpression"] = dict(self.partial_filter)
+        if self.weights:
+            options["weights"] = dict(self.weights)
+        if self.default_language:
+            options["default_language"] = self.default_language
+        return IndexModel(list(self.keys), **options)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """
+    Một dạng query của repository
+
+    filter dùng giá trị mẫu (chỉ field/type quan trọng với query planner)
+    """
+    name: str
+    filter: Dict[str, Any] = field(default_factory=dict)
+    sort: Tuple[Tuple[str, int], ...] = ()
+
+
+def create_indexes(collection: Collection, specs: Sequence[IndexSpec]) -> List[str]:
+    """
+    Tạo các index (idempotent - index đã tồn tại với cùng spec được bỏ qua)
+
+    Returns:
+        List[str]: Tên các index
+    """
+    if not specs:
+        return []
+    return collection.create_indexes([spec.to_index_model() for spec in specs])
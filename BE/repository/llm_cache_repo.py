@@ -0,0 +1,78 @@
+"""
+LLM Cache Repository - Tầng cache MongoDB cho response của Gemini
+"""
+from typing import Optional
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.indexes import IndexSpec, QueryShape, create_indexes
+
+
+class LLMCacheRepository:
+    """Repository cho llm_cache collection (TTL index trên expires_at)"""
+
+    COLLECTION_NAME = "llm_cache"
+    INDEXES = (
+        IndexSpec((("key", ASCENDING),), name="key_unique", unique=True),
+        # TTL: MongoDB tự xóa entry hết hạn
+        IndexSpec((("expires_at", ASCENDING),), name="expires_at_ttl", expire_after_seconds=0),
+    )
+    QUERY_SHAPES = (
+        QueryShape("get", {"key": ""}),
+    )
+
+    def __init__(self):
+        """Khởi tạo collection từ MongoDB client dùng chung"""
+        self.collection: Collection = mongo_manager.get_collection(self.COLLECTION_NAME)
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Tạo index (idempotent): unique key + TTL để MongoDB tự xóa entry hết hạn"""
+        if self._indexes_ready:
+            return
+        try:
+            create_indexes(self.collection, self.INDEXES)
+            self._indexes_ready = True
+        except PyMongoError:
+            pass
+
+    def get(self, key: str) -> Optional[str]:
+        """Lấy response theo cache key (bỏ qua entry đã hết hạn nhưng chưa bị TTL monitor xóa)"""
+        try:
+            data = self.collection.find_one(
+                {"key": key, "expires_at": {"$gt": datetime.utcnow()}},
+                {"response": 1}
+            )
+            return data["response"] if data else None
+        except PyMongoError:
+            return None
+
+    def set(self, key: str, response: str, model: str, ttl_seconds: int) -> bool:
+        """Lưu response vào cache (upsert)"""
+        self.ensure_indexes()
+        try:
+            now = datetime.utcnow()
+            self.collection.update_one(
+                {"key": key},
+                {"$set": {
+                    "key": key,
+                    "response": response,
+                    "model": model,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=ttl_seconds)
+                }},
+                upsert=True
+            )
+            return True
+        except PyMongoError:
+            return False
+
+    def delete(self, key: str) -> bool:
+        """Xóa entry khỏi cache"""
+        try:
+            result = self.collection.delete_one({"key": key})
+            return result.deleted_count > 0
+        except PyMongoError:
+            return False
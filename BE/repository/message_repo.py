@@ -1,32 +1,90 @@
 """
-<<<<<<< HEAD
-Message Repository
+Message Repository - Data access layer cho Message
 """
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.client_session import ClientSession
+from pymongo.errors import BulkWriteError, PyMongoError
 from BE.repository.base_repo import BaseRepository
+from BE.repository.indexes import IndexSpec, QueryShape
+from BE.repository.counting import invalidate_counts
 from BE.entities.message_entity import Message
 
 
 class MessageRepository(BaseRepository[Message]):
     """Repository cho Messages collection"""
-=======
-Message Repository - Data access layer cho Message
-"""
-from typing import List, Optional
-from bson import ObjectId
-from BE.entities.message_entity import Message
-from BE.repository.base_repo import BaseRepository
-
-
-class MessageRepository(BaseRepository[Message]):
-    """Repository cho Message với các operations cụ thể"""
->>>>>>> 4de381ce979ed4ae2fe2d771c3b6737ec53733f5
+    
+    COLLECTION_NAME = "messages"
+    INDEXES = (
+        # _id trong index để keyset pagination (createdAt, _id) không phải sort trong memory
+        IndexSpec((("conversationId", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)), name="conversationId_createdAt_id"),
+        IndexSpec((("sender", ASCENDING), ("createdAt", DESCENDING)), name="sender_createdAt"),
+        IndexSpec((("chat_room_id", ASCENDING), ("created_at", ASCENDING)), name="chat_room_id_created_at"),
+        IndexSpec((("createdAt", DESCENDING), ("_id", DESCENDING)), name="createdAt_id_desc"),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_by_conversation", {"conversationId": ObjectId()}, (("createdAt", DESCENDING),)),
+        QueryShape("find_by_sender", {"sender": "user"}, (("createdAt", DESCENDING),)),
+        QueryShape("find_all", {}, (("createdAt", DESCENDING),)),
+        QueryShape("find_page", {"conversationId": ObjectId()}, (("createdAt", DESCENDING), ("_id", DESCENDING))),
+        QueryShape("delete_batch_by_conversation", {"conversationId": ObjectId()}),
+        QueryShape("get_messages_by_room", {"chat_room_id": ""}, (("created_at", ASCENDING),)),
+        QueryShape("get_last_message", {"chat_room_id": ""}, (("created_at", DESCENDING),)),
+    )
     
     def __init__(self):
-        super().__init__("messages", Message)
+        super().__init__(self.COLLECTION_NAME, Message, sort_field="createdAt")
+    
+    def create_many(self, messages: List[Message],
+                    session: Optional[ClientSession] = None) -> Tuple[List[Message], List[Dict[str, Any]]]:
+        """
+        Insert nhiều messages trong một round trip (insert_many, ordered=False)
+        
+        _id được tạo trước theo thứ tự messages nên cùng createdAt vẫn giữ đúng thứ tự
+        khi sort (createdAt, _id). Ngoài transaction, message lỗi không chặn các message
+        còn lại; trong transaction (session) mọi lỗi được raise để transaction abort.
+        
+        Returns:
+            (messages đã insert, lỗi [{index, error}] theo vị trí trong danh sách)
+        """
+        if not messages:
+            return [], []
+        
+        documents = []
+        for message in messages:
+            document = message.to_dict(include_id=False)
+            document["_id"] = ObjectId()
+            documents.append(document)
+        
+        failed: List[Dict[str, Any]] = []
+        try:
+            self.collection.insert_many(documents, ordered=False, session=session)
+        except BulkWriteError as e:
+            if session is not None:
+                raise
+            failed = [
+                {"index": error["index"], "error": error.get("errmsg", "Insert thất bại")}
+                for error in e.details.get("writeErrors", [])
+            ]
+        except PyMongoError as e:
+            if session is not None:
+                raise
+            raise Exception(f"Error creating messages: {str(e)}")
+        finally:
+            invalidate_counts(self.collection.name)
+        
+        failed_indexes = {error["index"] for error in failed}
+        inserted = []
+        for index, (message, document) in enumerate(zip(messages, documents)):
+            if index in failed_indexes:
+                continue
+            message.id = str(document["_id"])
+            message.mark_clean()
+            inserted.append(message)
+        return inserted, failed
     
-<<<<<<< HEAD
     def find_by_conversation(self, conversation_id: str, skip: int = 0, limit: int = 100) -> List[Message]:
         """
         Lấy tất cả messages của một conversation
@@ -61,7 +119,24 @@ class MessageRepository(BaseRepository[Message]):
         except:
             return 0
     
-    def delete_by_conversation(self, conversation_id: str) -> int:
+    def count_total(self, filter_query: dict = None, exact: bool = False) -> Tuple[int, bool]:
+        """
+        Đếm total, dùng messageCount được maintain trên conservation cho filter theo conversation
+        
+        Returns:
+            (total, is_exact)
+        """
+        conversation_id = (filter_query or {}).get("conversationId")
+        if not exact and isinstance(conversation_id, ObjectId) and len(filter_query) == 1:
+            try:
+                data = self.db["conservations"].find_one({"_id": conversation_id}, {"messageCount": 1})
+                if data and "messageCount" in data:
+                    return max(0, data["messageCount"]), False
+            except PyMongoError:
+                pass
+        return super().count_total(filter_query, exact)
+    
+    def delete_by_conversation(self, conversation_id: str, session: Optional[ClientSession] = None) -> int:
         """
         Xóa tất cả messages của một conversation
         
@@ -70,12 +145,38 @@ class MessageRepository(BaseRepository[Message]):
         """
         try:
             obj_id = ObjectId(conversation_id)
-            result = self.collection.delete_many({"conversationId": obj_id})
+            result = self.collection.delete_many({"conversationId": obj_id}, session=session)
+            invalidate_counts(self.collection.name)
             return result.deleted_count
-        except:
+        except (PyMongoError, InvalidId):
+            if session is not None:
+                raise
             return 0
-
-=======
+    
+    def delete_batch_by_conversation(self, conversation_id: str, batch_size: int = 1000) -> int:
+        """
+        Xóa tối đa batch_size messages của conversation (cascade delete theo từng batch)
+        
+        Lấy _id qua index conversationId (không đọc document) rồi delete_many theo _id,
+        để mỗi lần ghi có kích thước giới hạn thay vì một delete_many lớn.
+        
+        Returns:
+            int: Số messages đã xóa (0 = không còn message nào)
+        """
+        try:
+            obj_id = ObjectId(conversation_id)
+            ids = [
+                data["_id"]
+                for data in self.collection.find({"conversationId": obj_id}, {"_id": 1}).limit(batch_size)
+            ]
+            if not ids:
+                return 0
+            result = self.collection.delete_many({"_id": {"$in": ids}})
+            invalidate_counts(self.collection.name)
+            return result.deleted_count
+        except InvalidId:
+            return 0
+    
     def get_messages_by_room(
         self, 
         chat_room_id: str, 
@@ -141,4 +242,3 @@ class MessageRepository(BaseRepository[Message]):
         except Exception as e:
             print(f"Error counting messages: {e}")
             return 0
->>>>>>> 4de381ce979ed4ae2fe2d771c3b6737ec53733f5
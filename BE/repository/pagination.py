@@ -0,0 +1,84 @@
+"""
+Keyset Pagination - Phân trang theo (timestamp, _id) thay vì skip
+
+Trang sau được lấy bằng điều kiện "nhỏ hơn cursor" trên index (timestamp, _id),
+nên chi phí mỗi trang không phụ thuộc vào độ sâu. Cursor là token opaque
+(base64 của timestamp + _id của item cuối trang trước).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+
+def encode_cursor(timestamp: Optional[datetime], object_id: Any) -> str:
+    """Tạo cursor token từ item cuối cùng của trang"""
+    payload = {
+        "t": timestamp.isoformat() if isinstance(timestamp, datetime) else None,
+        "id": str(object_id)
+    }
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[datetime], ObjectId]:
+    """
+    Giải mã cursor token
+
+    Raises:
+        ValueError: Nếu token không hợp lệ
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        timestamp = datetime.fromisoformat(payload["t"]) if payload.get("t") else None
+        return timestamp, ObjectId(payload["id"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise ValueError("Cursor không hợp lệ")
+
+
+def keyset_filter(sort_field: str, cursor: Optional[str]) -> Dict[str, Any]:
+    """Điều kiện lấy các document đứng sau cursor theo sort (sort_field DESC, _id DESC)"""
+    if not cursor:
+        return {}
+    timestamp, object_id = decode_cursor(cursor)
+    if timestamp is None:
+        # Document cũ không có timestamp nằm cuối cùng khi sort DESC
+        return {sort_field: None, "_id": {"$lt": object_id}}
+    return {"$or": [
+        {sort_field: {"$lt": timestamp}},
+        {sort_field: timestamp, "_id": {"$lt": object_id}},
+        {sort_field: None}
+    ]}
+
+
+def keyset_sort(sort_field: str) -> List[Tuple[str, int]]:
+    """Sort ổn định cho keyset pagination"""
+    return [(sort_field, -1), ("_id", -1)]
+
+
+def merge_filters(*filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Gộp nhiều filter bằng $and (bỏ filter rỗng)"""
+    parts = [f for f in filters if f]
+    if not parts:
+        return {}
+    if len(parts) == 1:
+        return parts[0]
+    return {"$and": parts}
+
+
+def build_page(documents: List[Dict[str, Any]], limit: int, sort_field: str) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Cắt kết quả query (đã lấy limit + 1 documents) thành trang và next cursor
+
+    Returns:
+        (documents của trang, next_cursor hoặc None nếu là trang cuối)
+    """
+    if len(documents) <= limit:
+        return documents, None
+    page = documents[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.get(sort_field), last["_id"])
@@ -0,0 +1,57 @@
+"""
+Projection - Chọn field khi đọc MongoDB (explicit fields hoặc view đặt tên theo entity)
+
+Mỗi entity khai báo VIEWS: tên view -> tuple MongoDB field names (None = full document).
+Entity được load bằng projection sẽ được mark_partial() để update/response chỉ
+dùng các field đã load.
+"""
+from typing import Any, Dict, Iterable, Optional, Type
+
+
+def build_projection(
+    entity_class: Type,
+    fields: Optional[Iterable[str]] = None,
+    view: Optional[str] = None
+) -> Optional[Dict[str, int]]:
+    """
+    Tạo MongoDB projection cho entity
+
+    Args:
+        entity_class: Class của entity (có VIEWS)
+        fields: Danh sách MongoDB field names cần lấy (ưu tiên hơn view, [] = chỉ _id)
+        view: Tên view khai báo trong entity_class.VIEWS
+
+    Returns:
+        Dict projection, None nếu lấy full document
+
+    Raises:
+        ValueError: Nếu view không tồn tại
+    """
+    if fields is None:
+        if not view:
+            return None
+        views = getattr(entity_class, "VIEWS", {})
+        if view not in views:
+            raise ValueError(
+                f"View '{view}' không hợp lệ cho {entity_class.__name__}, chọn một trong: {', '.join(views)}"
+            )
+        fields = views[view]
+        if fields is None:
+            return None
+
+    return {field: 1 for field in fields}
+
+
+def materialize(entity_class: Type, data: Dict[str, Any], projection: Optional[Dict[str, int]]):
+    """Tạo entity từ document, đánh dấu partial nếu document được đọc bằng projection"""
+    entity = entity_class.from_dict(data)
+    if projection is not None:
+        entity.mark_partial(projection.keys())
+    return entity
+
+
+def parse_fields(raw: Optional[str]) -> Optional[list]:
+    """Parse query param dạng "title,goal" thành list field names"""
+    if raw is None:
+        return None
+    return [field.strip() for field in raw.split(",") if field.strip()]
@@ -0,0 +1,97 @@
+"""
+Refinement State Repository - Facts đang hỏi dở của IntentClassifierService (theo session_id)
+"""
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.indexes import IndexSpec, QueryShape, create_indexes
+
+
+class RefinementStateRepository:
+    """
+    Repository cho refinement_states collection (TTL index trên expires_at)
+
+    Mỗi document có version; save() chỉ ghi khi version trong DB khớp expected_version
+    (optimistic concurrency) - hai turn ghi đồng thời thì turn sau nhận conflict.
+    """
+
+    COLLECTION_NAME = "refinement_states"
+    INDEXES = (
+        IndexSpec((("session_id", ASCENDING),), name="session_id_unique", unique=True),
+        # TTL: MongoDB tự xóa state bị bỏ dở
+        IndexSpec((("expires_at", ASCENDING),), name="expires_at_ttl", expire_after_seconds=0),
+    )
+    QUERY_SHAPES = (
+        QueryShape("get", {"session_id": "", "expires_at": {"$gt": datetime(2000, 1, 1)}}),
+    )
+
+    def __init__(self):
+        """Khởi tạo collection từ MongoDB client dùng chung"""
+        self.collection: Collection = mongo_manager.get_collection(self.COLLECTION_NAME)
+        self._indexes_ready = False
+
+    def ensure_indexes(self):
+        """Tạo index (idempotent): unique session_id + TTL"""
+        if self._indexes_ready:
+            return
+        try:
+            create_indexes(self.collection, self.INDEXES)
+            self._indexes_ready = True
+        except PyMongoError:
+            pass
+
+    def get(self, session_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        """Lấy (facts, version) - bỏ qua state đã hết hạn nhưng chưa bị TTL monitor xóa"""
+        data = self.collection.find_one(
+            {"session_id": session_id, "expires_at": {"$gt": datetime.utcnow()}},
+            {"facts": 1, "version": 1}
+        )
+        return (data["facts"], data["version"]) if data else None
+
+    def save(self, session_id: str, facts: Dict[str, Any], expected_version: Optional[int],
+             ttl_seconds: float) -> Optional[int]:
+        """
+        Ghi facts nếu version khớp
+
+        Args:
+            expected_version: Version đã đọc; None = tạo state mới (chưa có state còn hạn)
+
+        Returns:
+            Optional[int]: Version mới, None nếu conflict
+        """
+        self.ensure_indexes()
+        now = datetime.utcnow()
+        new_version = (expected_version or 0) + 1
+        update = {"$set": {
+            "session_id": session_id,
+            "facts": facts,
+            "version": new_version,
+            "updated_at": now,
+            "expires_at": now + timedelta(seconds=ttl_seconds)
+        }}
+
+        if expected_version is None:
+            # State cũ đã hết hạn được thay thế; state còn hạn -> duplicate key (conflict)
+            try:
+                self.collection.update_one(
+                    {"session_id": session_id, "expires_at": {"$lte": now}},
+                    update,
+                    upsert=True
+                )
+                return new_version
+            except DuplicateKeyError:
+                return None
+
+        result = self.collection.update_one(
+            {"session_id": session_id, "version": expected_version, "expires_at": {"$gt": now}},
+            update
+        )
+        return new_version if result.modified_count > 0 else None
+
+    def delete(self, session_id: str) -> bool:
+        """Xóa state của session"""
+        result = self.collection.delete_one({"session_id": session_id})
+        return result.deleted_count > 0
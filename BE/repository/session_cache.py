@@ -0,0 +1,133 @@
+"""
+Session Cache - Read-through cache cho session documents
+
+- In-process LRU + TTL (TTLCache): chỉ khi chạy một worker (WEB_CONCURRENCY <= 1),
+  vì invalidate không xóa được memory của các worker khác
+- Backend dùng chung giữa các worker (Redis...), chỉ cần get/set/delete như
+  SessionCacheBackend - TTLCache cũng thỏa interface này. Khi có backend dùng chung,
+  tầng memory bị tắt để worker khác không đọc bản cũ sau khi session được ghi
+
+Cache lưu document (không lưu entity) để mỗi lần đọc tạo Session mới,
+caller sửa entity không làm hỏng cache. Repository xóa entry sau mọi lần ghi
+(update, update_step, add_code_history, apply_changes, delete).
+"""
+import copy
+import threading
+from typing import Any, Dict, Optional, Protocol
+
+from BE.utils.config import env
+from BE.utils.ttl_cache import TTLCache
+
+
+class SessionCacheBackend(Protocol):
+    """Interface của tầng cache dùng chung"""
+
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ...
+
+    def delete(self, key: str) -> bool:
+        ...
+
+
+class SessionCache:
+    """
+    Cache session document theo session_id
+
+    generation tăng sau mỗi lần invalidate: kết quả đọc từ MongoDB chỉ được lưu nếu
+    không có lần ghi session nào xảy ra trong lúc đọc (tránh đưa dữ liệu cũ vào lại cache).
+
+    shared được truyền -> chỉ dùng backend dùng chung (không có tầng memory).
+    """
+
+    def __init__(self, enabled: bool = True, ttl_seconds: float = 30, max_entries: int = 1024,
+                 shared: Optional[SessionCacheBackend] = None):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.shared = shared
+        self.memory: Optional[TTLCache] = (
+            TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds) if shared is None else None
+        )
+        self.shared_hits = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(session_id: str) -> str:
+        return f"session:{session_id}"
+
+    def generation(self) -> int:
+        """Generation hiện tại (lấy trước khi đọc MongoDB)"""
+        with self._lock:
+            return self._generation
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Lấy bản sao document (memory, hoặc backend dùng chung nếu có)"""
+        if not self.enabled:
+            return None
+
+        key = self._key(session_id)
+        if self.shared is None:
+            data = self.memory.get(key)
+        else:
+            data = self.shared.get(key)
+            if data is not None:
+                self.shared_hits += 1
+        return copy.deepcopy(data) if data is not None else None
+
+    def set(self, session_id: str, data: Dict[str, Any], generation: Optional[int] = None):
+        """
+        Lưu document đọc được từ MongoDB
+
+        Args:
+            generation: generation lấy trước khi đọc; bỏ qua nếu session đã bị ghi sau đó
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            if generation is not None and self._generation != generation:
+                return
+            key = self._key(session_id)
+            if self.shared is None:
+                self.memory.set(key, copy.deepcopy(data))
+        if self.shared is not None:
+            self.shared.set(key, copy.deepcopy(data), self.ttl_seconds)
+
+    def invalidate(self, session_id: str):
+        """Xóa session khỏi cache (gọi sau mỗi lần ghi)"""
+        if not self.enabled:
+            return
+
+        key = self._key(session_id)
+        with self._lock:
+            self._generation += 1
+            if self.memory is not None:
+                self.memory.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+    def clear(self):
+        """Xóa toàn bộ tầng memory"""
+        if self.memory is not None:
+            self.memory.clear()
+
+    def stats(self) -> dict:
+        """Cache counters (hits/misses/evictions của tầng memory)"""
+        return {
+            "enabled": self.enabled,
+            "shared_tier": self.shared is not None,
+            "memory": self.memory.stats() if self.memory is not None else None,
+            "shared_hits": self.shared_hits
+        }
+
+
+# Create and export singleton instance (dùng chung cho sync và async repository)
+# Chưa có backend dùng chung -> cache chỉ bật khi chạy một worker
+session_cache = SessionCache(
+    enabled=env.SESSION_CACHE_ENABLED and env.WEB_CONCURRENCY <= 1,
+    ttl_seconds=env.SESSION_CACHE_TTL_SECONDS,
+    max_entries=env.SESSION_CACHE_MAX_ENTRIES
+)
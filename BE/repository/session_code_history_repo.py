@@ -0,0 +1,145 @@
+"""
+Session Code History Repository - Lịch sử code của session lưu ở collection riêng
+"""
+from typing import Any, Dict, List
+from datetime import datetime
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+from BE.utils.mongo_client import mongo_manager
+from BE.repository.indexes import IndexSpec, QueryShape, create_indexes
+
+
+def to_history_document(session_id: str, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển entry code_history (timestamp ISO string) thành document trong collection"""
+    timestamp = entry.get("timestamp")
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            timestamp = None
+    return {
+        "session_id": session_id,
+        "code": entry.get("code"),
+        "language": entry.get("language"),
+        "description": entry.get("description", ""),
+        "timestamp": timestamp or datetime.utcnow()
+    }
+
+
+def to_history_entry(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển document trong collection về format entry của Session.code_history"""
+    timestamp = data.get("timestamp")
+    return {
+        "code": data.get("code"),
+        "language": data.get("language"),
+        "description": data.get("description", ""),
+        "timestamp": timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+    }
+
+
+class SessionCodeHistoryRepository:
+    """Repository cho session_code_history collection, index (session_id, timestamp)"""
+
+    COLLECTION_NAME = "session_code_history"
+    INDEXES = (
+        IndexSpec((("session_id", ASCENDING), ("timestamp", DESCENDING)), name="session_id_timestamp"),
+        # Entries migrate từ code_history embedded: vị trí trong array cũ, để migrate chạy lại không ghi trùng
+        IndexSpec(
+            (("session_id", ASCENDING), ("source_index", ASCENDING)),
+            name="session_id_source_index_unique",
+            unique=True,
+            partial_filter={"source_index": {"$exists": True}}
+        ),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_by_session", {"session_id": ""}, (("timestamp", ASCENDING),)),
+        QueryShape("find_latest", {"session_id": ""}, (("timestamp", DESCENDING),)),
+    )
+
+    def __init__(self):
+        """Khởi tạo collection từ MongoDB client dùng chung"""
+        self.collection: Collection = mongo_manager.get_collection(self.COLLECTION_NAME)
+
+    def ensure_indexes(self):
+        """Tạo index (idempotent)"""
+        create_indexes(self.collection, self.INDEXES)
+
+    def add(self, session_id: str, entry: Dict[str, Any]) -> bool:
+        """Thêm một entry vào history"""
+        return self.add_many(session_id, [entry]) > 0
+
+    def add_many(self, session_id: str, entries: List[Dict[str, Any]]) -> int:
+        """Thêm nhiều entries trong một lần ghi"""
+        if not entries:
+            return 0
+        try:
+            result = self.collection.insert_many(
+                [to_history_document(session_id, entry) for entry in entries],
+                ordered=True
+            )
+            return len(result.inserted_ids)
+        except PyMongoError:
+            return 0
+
+    def upsert_migrated(self, session_id: str, entries: List[Dict[str, Any]]) -> int:
+        """
+        Ghi entries của code_history embedded (format cũ), key (session_id, vị trí trong array)
+
+        Entry đã được ghi ở lần migrate trước (bị ngắt trước khi $unset) không bị ghi lại.
+
+        Returns:
+            int: Số entries đã có trong collection sau khi ghi (0 nếu lỗi)
+        """
+        if not entries:
+            return 0
+        operations = []
+        for index, entry in enumerate(entries):
+            document = to_history_document(session_id, entry)
+            document.pop("session_id")
+            operations.append(UpdateOne(
+                {"session_id": session_id, "source_index": index},
+                {"$setOnInsert": document},
+                upsert=True
+            ))
+        try:
+            result = self.collection.bulk_write(operations, ordered=True)
+            return result.upserted_count + result.matched_count
+        except PyMongoError:
+            return 0
+
+    def find_by_session(self, session_id: str, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lấy history của session theo trang (cũ nhất trước, giống thứ tự array cũ)"""
+        try:
+            cursor = self.collection.find(
+                {"session_id": session_id},
+                {"_id": 0, "session_id": 0}
+            ).sort("timestamp", ASCENDING).skip(skip).limit(limit)
+            return [to_history_entry(data) for data in cursor]
+        except PyMongoError:
+            return []
+
+    def find_latest(self, session_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """Lấy N entries mới nhất (trả về theo thứ tự cũ -> mới)"""
+        try:
+            cursor = self.collection.find(
+                {"session_id": session_id},
+                {"_id": 0, "session_id": 0}
+            ).sort("timestamp", DESCENDING).limit(limit)
+            return [to_history_entry(data) for data in cursor][::-1]
+        except PyMongoError:
+            return []
+
+    def count_by_session(self, session_id: str) -> int:
+        """Đếm số entries của session"""
+        try:
+            return self.collection.count_documents({"session_id": session_id})
+        except PyMongoError:
+            return 0
+
+    def delete_by_session(self, session_id: str) -> int:
+        """Xóa toàn bộ history của session"""
+        try:
+            return self.collection.delete_many({"session_id": session_id}).deleted_count
+        except PyMongoError:
+            return 0
@@ -1,43 +1,68 @@
 """
 Session Repository - CRUD operations cho Session collection
 """
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 from datetime import datetime
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo import ASCENDING, DESCENDING
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
-import os
-from dotenv import load_dotenv
+from BE.utils.mongo_client import mongo_manager
 from BE.entities.session_entity import Session, WorkflowStep
+from BE.repository.session_unit_of_work import SessionUnitOfWork
+from BE.repository.session_code_history_repo import SessionCodeHistoryRepository
+from BE.repository.projection import build_projection
+from BE.repository.indexes import IndexSpec, QueryShape
+from BE.repository.pagination import build_page, keyset_filter, keyset_sort, merge_filters
+from BE.repository.session_cache import session_cache
 
-load_dotenv()
+# code_history cũ (embedded) không bao giờ được đọc cùng session document
+SESSION_PROJECTION = {"code_history": 0}
+
+
+def session_projection(fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Dict[str, int]:
+    """Projection cho sessions: luôn bỏ code_history embedded, luôn lấy user_id (bắt buộc)"""
+    projection = build_projection(Session, fields, view)
+    if projection is None:
+        return SESSION_PROJECTION
+    projection.pop("code_history", None)
+    projection["user_id"] = 1
+    return projection
+
+
+def project_cached(data: Dict[str, Any], projection: Dict[str, int]) -> Dict[str, Any]:
+    """Áp dụng projection (inclusion) lên document full lấy từ cache"""
+    if projection is SESSION_PROJECTION:
+        return data
+    return {key: value for key, value in data.items() if key == "_id" or key in projection}
 
 
 class SessionRepository:
     """Repository để thao tác với Session collection trong MongoDB"""
     
+    COLLECTION_NAME = "sessions"
+    INDEXES = (
+        IndexSpec((("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)), name="user_id_created_at_id"),
+    )
+    QUERY_SHAPES = (
+        QueryShape("find_by_user_id", {"user_id": ""}, (("created_at", DESCENDING),)),
+        QueryShape("find_page_by_user", {"user_id": ""}, (("created_at", DESCENDING), ("_id", DESCENDING))),
+    )
+    
     def __init__(self):
-        """Khởi tạo connection tới MongoDB"""
-        username = os.getenv("MONGO_USERNAME", "mongo")
-        password = os.getenv("MONGO_PASSWORD", "OtfagZQFKuslkxmpTCZTlvctRGsQBLnk")
-        host = os.getenv("MONGO_HOST", "shortline.proxy.rlwy.net")
-        port = int(os.getenv("MONGO_PORT", "21101"))
-        database = os.getenv("MONGO_DATABASE", "basic-hackathon")
-        
-        from urllib.parse import quote_plus
-        password_encoded = quote_plus(password)
-        
-        uri = f"mongodb://{username}:{password_encoded}@{host}:{port}/{database}?authSource=admin&directConnection=true"
-        
-        self.client = MongoClient(
-            uri,
-            directConnection=True,
-            serverSelectionTimeoutMS=10000,
-            connectTimeoutMS=10000
-        )
-        self.db = self.client[database]
-        self.collection: Collection = self.db["sessions"]
+        """Khởi tạo collection từ MongoDB client dùng chung"""
+        self.client = mongo_manager.get_client()
+        self.db = mongo_manager.get_database()
+        self.collection: Collection = self.db[self.COLLECTION_NAME]
+        self.history_repo = SessionCodeHistoryRepository()
+    
+    def _to_entity(self, data: dict, projection: Dict[str, int] = SESSION_PROJECTION) -> Session:
+        """Tạo Session từ document và gắn lazy loader cho code history"""
+        session = Session.from_dict(data)
+        if projection is not SESSION_PROJECTION:
+            session.mark_partial(projection.keys())
+        session.attach_history_loader(self.history_repo.find_by_session)
+        return session
     
     def create(self, session: Session) -> Session:
         """Tạo session mới"""
@@ -50,41 +75,94 @@ class SessionRepository:
         session_data = session.to_dict(include_id=False)
         result = self.collection.insert_one(session_data)
         session.id = str(result.inserted_id)
+        self.history_repo.add_many(session.id, session.pop_pending_code_entries())
+        session.mark_clean()
+        session.attach_history_loader(self.history_repo.find_by_session)
         return session
     
-    def find_by_id(self, session_id: str) -> Optional[Session]:
-        """Tìm session theo ID"""
+    def find_by_id(self, session_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[Session]:
+        """Tìm session theo ID (fields/view: chỉ lấy một phần document)"""
+        projection = session_projection(fields, view)
+        cached = session_cache.get(session_id)
+        if cached is not None:
+            return self._to_entity(project_cached(cached, projection), projection)
+        
         try:
             object_id = ObjectId(session_id)
-            data = self.collection.find_one({"_id": object_id})
-            return Session.from_dict(data) if data else None
+            generation = session_cache.generation()
+            data = self.collection.find_one({"_id": object_id}, projection)
+            if data and projection is SESSION_PROJECTION:
+                session_cache.set(session_id, data, generation)
+            return self._to_entity(data, projection) if data else None
         except (PyMongoError, ValueError):
             return None
     
-    def find_by_user_id(self, user_id: str, limit: int = 10) -> List[Session]:
+    def find_by_user_id(
+        self,
+        user_id: str,
+        limit: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> List[Session]:
         """Lấy danh sách sessions của user"""
+        projection = session_projection(fields, view)
         try:
-            cursor = self.collection.find({"user_id": user_id}).sort("created_at", -1).limit(limit)
-            return [Session.from_dict(data) for data in cursor]
+            cursor = self.collection.find({"user_id": user_id}, projection).sort("created_at", -1).limit(limit)
+            return [self._to_entity(data, projection) for data in cursor]
         except PyMongoError:
             return []
     
+    def find_page_by_user(
+        self,
+        user_id: str,
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        view: Optional[str] = None
+    ) -> Tuple[List[Session], Optional[str]]:
+        """
+        Keyset pagination sessions của user theo (created_at, _id) giảm dần
+        
+        Raises:
+            ValueError: Nếu cursor hoặc view không hợp lệ
+        """
+        projection = session_projection(view=view)
+        if projection is not SESSION_PROJECTION:
+            projection["created_at"] = 1
+        query = merge_filters({"user_id": user_id}, keyset_filter("created_at", cursor))
+        try:
+            documents = list(self.collection.find(query, projection).sort(keyset_sort("created_at")).limit(limit + 1))
+            page, next_cursor = build_page(documents, limit, "created_at")
+            return [self._to_entity(data, projection) for data in page], next_cursor
+        except PyMongoError:
+            return [], None
+    
     def update(self, session: Session) -> Optional[Session]:
-        """Update session"""
+        """Update session (code mới chỉ được ghi khi session còn tồn tại)"""
         if not session.id:
             return None
         
         try:
             object_id = ObjectId(session.id)
-            update_data = session.to_dict(include_id=False)
+            
+            # Chỉ gửi các field đã thay đổi
+            code_entries = session.pop_pending_code_entries()
+            update_doc = session.build_update()
+            if not update_doc and not code_entries:
+                return session
             
             result = self.collection.find_one_and_update(
                 {"_id": object_id},
-                {"$set": update_data},
+                update_doc or {"$set": {"updated_at": datetime.utcnow()}},
+                projection=SESSION_PROJECTION,
                 return_document=True
             )
+            session_cache.invalidate(session.id)
+            if not result:
+                return None
             
-            return Session.from_dict(result) if result else None
+            # Code mới được ghi vào session_code_history, không nằm trong session document
+            self.history_repo.add_many(session.id, code_entries)
+            return self._to_entity(result)
         except (PyMongoError, ValueError):
             return None
     
@@ -93,42 +171,119 @@ class SessionRepository:
         try:
             object_id = ObjectId(session_id)
             result = self.collection.delete_one({"_id": object_id})
+            session_cache.invalidate(session_id)
             return result.deleted_count > 0
         except (PyMongoError, ValueError):
             return False
     
-    def update_step(self, session_id: str, new_step: WorkflowStep) -> bool:
-        """Cập nhật step của session"""
+    def update_step(self, session_id: str, new_step: WorkflowStep, session: Optional[Session] = None) -> bool:
+        """
+        Cập nhật step của session
+        
+        session: entity đang được giữ trong memory -> step được cập nhật cả trên entity
+        (snapshot), để update(session) sau đó chỉ ghi step khi entity đổi step tiếp
+        """
         try:
             object_id = ObjectId(session_id)
+            updated_at = datetime.utcnow()
             result = self.collection.update_one(
                 {"_id": object_id},
                 {"$set": {
                     "current_step": new_step.value,
-                    "updated_at": datetime.utcnow()
+                    "updated_at": updated_at
                 }}
             )
+            session_cache.invalidate(session_id)
+            if session is not None and result.matched_count > 0:
+                session.current_step = new_step
+                session.updated_at = updated_at
+                session.mark_fields_clean(("current_step", "updated_at"))
             return result.modified_count > 0
         except (PyMongoError, ValueError):
             return False
     
-    def add_code_history(self, session_id: str, code_entry: dict) -> bool:
-        """Thêm code vào history"""
+    def apply_changes(self, session_id: str, set_fields: Optional[Dict[str, Any]] = None,
+                      push_fields: Optional[Dict[str, List[Any]]] = None) -> bool:
+        """
+        Ghi nhiều thay đổi của session trong một update_one duy nhất
+        
+        Code entries (push_fields["code_history"]) chỉ được ghi vào
+        session_code_history sau khi update khớp với session.
+        
+        Args:
+            session_id: ID của session
+            set_fields: Các field cần $set
+            push_fields: field -> danh sách item cần $push (dùng $each)
+        
+        Returns:
+            bool: False nếu session không tồn tại
+        """
+        push_fields = dict(push_fields or {})
+        code_entries = push_fields.pop("code_history", None)
+        
+        update: Dict[str, Any] = {"$set": {**(set_fields or {}), "updated_at": datetime.utcnow()}}
+        if push_fields:
+            update["$push"] = {field: {"$each": items} for field, items in push_fields.items()}
+        
         try:
             object_id = ObjectId(session_id)
-            result = self.collection.update_one(
-                {"_id": object_id},
-                {
-                    "$push": {"code_history": code_entry},
-                    "$set": {"updated_at": datetime.utcnow()}
-                }
-            )
-            return result.modified_count > 0
+            result = self.collection.update_one({"_id": object_id}, update)
+            session_cache.invalidate(session_id)
         except (PyMongoError, ValueError):
             return False
+        
+        if result.matched_count == 0:
+            return False
+        if code_entries:
+            return self.history_repo.add_many(session_id, code_entries) == len(code_entries)
+        return True
+    
+    def unit_of_work(self, session_id: str, write_through_steps: bool = False) -> SessionUnitOfWork:
+        """Tạo unit of work để gom các thay đổi của session thành một lần ghi"""
+        return SessionUnitOfWork(self, session_id, write_through_steps=write_through_steps)
+    
+    def add_code_history(self, session_id: str, code_entry: dict) -> bool:
+        """Thêm code vào history (collection session_code_history), False nếu session không tồn tại"""
+        return self.apply_changes(session_id, push_fields={"code_history": [code_entry]})
+    
+    def find_code_history(self, session_id: str, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
+        """Lấy code history của session theo trang"""
+        return self.history_repo.find_by_session(session_id, skip=skip, limit=limit)
+    
+    def find_latest_code(self, session_id: str, limit: int = 1) -> List[Dict[str, Any]]:
+        """Lấy N code entries mới nhất của session"""
+        return self.history_repo.find_latest(session_id, limit=limit)
+    
+    def migrate_embedded_code_history(self, batch_size: int = 100) -> int:
+        """
+        Chuyển code_history embedded (format cũ) sang session_code_history
+        
+        Có thể chạy lại: session đã migrate không còn field code_history; session bị
+        ngắt giữa lúc ghi history và $unset được ghi lại bằng upsert (không trùng entries).
+        
+        Returns:
+            int: Số sessions đã migrate
+        """
+        self.history_repo.ensure_indexes()
+        migrated = 0
+        query = {"code_history": {"$exists": True}}
+        
+        while True:
+            batch = list(self.collection.find(query, {"code_history": 1}).limit(batch_size))
+            if not batch:
+                break
+            
+            for data in batch:
+                session_id = str(data["_id"])
+                entries = data.get("code_history") or []
+                if entries and self.history_repo.upsert_migrated(session_id, entries) != len(entries):
+                    raise Exception(f"Failed to migrate code history of session {session_id}")
+                self.collection.update_one({"_id": data["_id"]}, {"$unset": {"code_history": ""}})
+                migrated += 1
+        
+        return migrated
     
     def close(self):
-        """Đóng connection"""
-        if self.client:
-            self.client.close()
+        """Client dùng chung được đóng bởi mongo_manager khi app shutdown"""
+        pass
 
@@ -0,0 +1,55 @@
+"""
+Session Unit of Work - Gom step transitions và field changes của session
+rồi ghi một lần bằng update_one ($set/$push)
+"""
+from typing import Any, Dict, List
+from BE.entities.session_entity import WorkflowStep
+
+
+class SessionUnitOfWork:
+    """
+    Buffer các thay đổi của một session trong memory
+
+    - set_step / set / push chỉ ghi vào buffer
+    - flush() ghi tất cả trong một round trip (và cập nhật updated_at một lần)
+    - write_through_steps=True: step transitions được ghi ngay (để client polling
+      thấy tiến trình), các field khác vẫn được gom lại
+    """
+
+    def __init__(self, repository, session_id: str, write_through_steps: bool = False):
+        self.repository = repository
+        self.session_id = session_id
+        self.write_through_steps = write_through_steps
+        self._set: Dict[str, Any] = {}
+        self._push: Dict[str, List[Any]] = {}
+
+    @property
+    def has_changes(self) -> bool:
+        """Có thay đổi chưa được flush không"""
+        return bool(self._set or self._push)
+
+    def set_step(self, step: WorkflowStep):
+        """Chuyển step của workflow"""
+        if self.write_through_steps:
+            self.repository.update_step(self.session_id, step)
+            self._set.pop("current_step", None)
+        else:
+            self._set["current_step"] = step.value
+
+    def set(self, field: str, value: Any):
+        """Đánh dấu field cần $set"""
+        self._set[field] = value
+
+    def push(self, field: str, item: Any):
+        """Đánh dấu item cần $push vào array field"""
+        self._push.setdefault(field, []).append(item)
+
+    def flush(self) -> bool:
+        """Ghi tất cả thay đổi đã buffer trong một update_one"""
+        if not self.has_changes:
+            return True
+
+        success = self.repository.apply_changes(self.session_id, self._set, self._push)
+        self._set = {}
+        self._push = {}
+        return success
@@ -0,0 +1,30 @@
+"""
+Transactions - Chạy nhiều write (nhiều collection) trong một multi-document transaction
+
+Server không hỗ trợ transaction (standalone) thì callback chạy với session=None,
+các write được thực hiện lần lượt như trước và counter được sửa lại bởi job
+reconcile (ConservationRepository.reconcile_message_counts).
+"""
+from typing import Callable, Optional, TypeVar
+
+from pymongo.client_session import ClientSession
+
+from BE.utils.mongo_client import mongo_manager
+
+R = TypeVar("R")
+
+
+def run_in_transaction(callback: Callable[[Optional[ClientSession]], R]) -> R:
+    """
+    Chạy callback(session) trong transaction nếu có thể
+
+    Callback có thể được gọi lại khi transaction gặp lỗi tạm thời
+    (TransientTransactionError), nên chỉ nên chứa các write của transaction.
+    Write trong callback phải truyền session cho pymongo; với session=None
+    chúng chạy như write thường.
+    """
+    if not mongo_manager.supports_transactions():
+        return callback(None)
+
+    with mongo_manager.get_client().start_session() as session:
+        return session.with_transaction(callback)
@@ -1,26 +1,38 @@
 """
 Agent Orchestration Service - Điều phối các luồng công việc
 """
-from typing import Optional
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import datetime
 
 from BE.repository.session_repo import SessionRepository
 from BE.repository.context_repo import ContextRepository
+from BE.repository.async_session_repo import AsyncSessionRepository
 from BE.repository.gemini_repo import GeminiRepository
+from BE.repository.async_gemini_repo import AsyncGeminiRepository
 from BE.entities.session_entity import Session, WorkflowStep
 from BE.service.context_parsing_service import ContextParsingService
 from BE.service.ai_service import CodeGenerationService
+from BE.service.local_intent_classifier import local_intent_classifier
 from BE.model.orchestration_models import (
     AgentRequest,
     AgentResponse,
     SessionCreateRequest,
     SessionResponse,
+    SessionListResponse,
     IntentClassifyRequest,
     IntentClassifyResponse,
     IntentType,
     ContextParseRequest
 )
-from BE.model.ai_models import CodeGenerationRequest
+from BE.model.ai_models import CodeGenerationRequest, CodeGenerationResponse
+from BE.utils.config import env
+from BE.utils.step_dag import StepDAG
+
+# Nhánh xử lý prompt sau khi biết intent (cũng là tên step trong StepDAG)
+PROMPT_ROUTE_GENERATE = "generate"
+PROMPT_ROUTE_MODIFY = "modify"
+PROMPT_ROUTE_ANALYZE = "analyze"
 
 
 class AgentOrchestrationService:
@@ -34,10 +46,15 @@ class AgentOrchestrationService:
     - Luồng F3: Analyze code
     """
     
+    # Số code entries mới nhất trả về trong SessionResponse
+    SESSION_HISTORY_LIMIT = 20
+    
     def __init__(self):
         self.session_repo = SessionRepository()
+        self.async_session_repo = AsyncSessionRepository()
         self.context_repo = ContextRepository()
         self.gemini_repo = GeminiRepository()
+        self.async_gemini_repo = AsyncGeminiRepository()
         self.context_parsing_service = ContextParsingService()
         self.code_gen_service = CodeGenerationService()
     
@@ -69,31 +86,81 @@ class AgentOrchestrationService:
         except Exception as e:
             raise Exception(f"Failed to create session: {str(e)}")
     
-    def get_session(self, session_id: str) -> Optional[SessionResponse]:
-        """Lấy thông tin session"""
-        session = self.session_repo.find_by_id(session_id)
+    def get_session(self, session_id: str, view: str = "full") -> Optional[SessionResponse]:
+        """
+        Lấy thông tin session
+        
+        Args:
+            view: "full" (kèm context_json + code history) hoặc "summary" (chỉ state)
+        """
+        session = self.session_repo.find_by_id(session_id, view=view)
         if not session:
             return None
         
+        code_history = []
+        if not session.is_partial:
+            code_history = self.session_repo.find_latest_code(session_id, limit=self.SESSION_HISTORY_LIMIT)
+        return self._to_session_response(session, code_history)
+    
+    async def get_session_async(self, session_id: str, view: str = "full") -> Optional[SessionResponse]:
+        """Lấy thông tin session (async - không block event loop)"""
+        session = await self.async_session_repo.find_by_id(session_id, view=view)
+        if not session:
+            return None
+        
+        code_history = []
+        if not session.is_partial:
+            code_history = await self.async_session_repo.find_latest_code(session_id, limit=self.SESSION_HISTORY_LIMIT)
+        return self._to_session_response(session, code_history)
+    
+    def list_sessions(self, user_id: str, cursor: Optional[str] = None, page_size: int = 10,
+                      view: str = "summary") -> SessionListResponse:
+        """
+        Lấy sessions của user (mới nhất trước) với keyset pagination
+        
+        Raises:
+            ValueError: Nếu cursor hoặc view không hợp lệ
+        """
+        page_size = max(1, min(100, page_size))
+        sessions, next_cursor = self.session_repo.find_page_by_user(
+            user_id, limit=page_size, cursor=cursor, view=view
+        )
+        return SessionListResponse(
+            items=[self._to_session_response(session, []) for session in sessions],
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None,
+            page_size=page_size
+        )
+    
+    def _to_session_response(self, session: Session, code_history: List[Dict[str, Any]]) -> SessionResponse:
+        """Chuyển Session entity thành SessionResponse (kèm N code entries mới nhất)"""
         return SessionResponse(
             session_id=session.id,
             user_id=session.user_id,
             current_step=session.current_step.value,
             context_json=session.context_json,
-            code_history=session.code_history,
+            code_history=code_history,
             created_at=session.created_at,
             updated_at=session.updated_at
         )
     
     # ==================== FLOW 1: PARSE CONTEXT ====================
     
-    def process_context(self, session_id: str, context_text: str, model: str = "gemini-2.5-flash") -> AgentResponse:
+    def process_context(self, session_id: str, context_text: str,
+                        model: str = "gemini-2.5-flash") -> Optional[AgentResponse]:
         """
         Luồng F1: Nhận context và parse thành JSON
+        
+        Các thay đổi của session (step, context_json, code_history) được gom
+        trong SessionUnitOfWork và ghi bằng một update_one khi kết thúc.
+        
+        Returns:
+            Optional[AgentResponse]: None nếu session không tồn tại
         """
+        uow = self.session_repo.unit_of_work(session_id, write_through_steps=env.SESSION_STEP_WRITE_THROUGH)
         try:
             # Update session step
-            self.session_repo.update_step(session_id, WorkflowStep.PARSING_CONTEXT)
+            uow.set_step(WorkflowStep.PARSING_CONTEXT)
             
             # Parse context using ContextParsingService.extract_one_shot
             # NOTE: ContextParsingService provides `extract_one_shot(user_context, model_name)` which
@@ -101,7 +168,9 @@ class AgentOrchestrationService:
             ok, parsed_ctx, err = self.context_parsing_service.extract_one_shot(context_text, model_name=model)
 
             if not ok:
-                self.session_repo.update_step(session_id, WorkflowStep.ERROR)
+                uow.set_step(WorkflowStep.ERROR)
+                if not uow.flush():
+                    return None
                 return AgentResponse(
                     session_id=session_id,
                     current_step=WorkflowStep.ERROR.value,
@@ -115,15 +184,12 @@ class AgentOrchestrationService:
             parsed_json = parsed_ctx.dict() if hasattr(parsed_ctx, "dict") else parsed_ctx
 
             # Update session with parsed context
-            session = self.session_repo.find_by_id(session_id)
-            if session:
-                session.context_json = parsed_json
-                self.session_repo.update(session)
+            uow.set("context_json", parsed_json)
 
             # Immediately orchestrate to code generation if the parsed goal is to generate code
             try:
                 # Update step
-                self.session_repo.update_step(session_id, WorkflowStep.GENERATING_CODE)
+                uow.set_step(WorkflowStep.GENERATING_CODE)
 
                 # Build a CodeGenerationRequest from parsed context
                 # For function generation, include purpose, inputs, core_logic, outputs
@@ -159,14 +225,16 @@ class AgentOrchestrationService:
                 code_request = CodeGenerationRequest(
                     prompt=prompt,
                     language="python",
-                    additional_context=str(session.context_json) if session and session.context_json else None,
+                    additional_context=str(parsed_json) if parsed_json else None,
                     model=model
                 )
 
                 code_response = self.code_gen_service.generate_code(code_request)
 
                 if not code_response.success:
-                    self.session_repo.update_step(session_id, WorkflowStep.ERROR)
+                    uow.set_step(WorkflowStep.ERROR)
+                    if not uow.flush():
+                        return None
                     return AgentResponse(
                         session_id=session_id,
                         current_step=WorkflowStep.ERROR.value,
@@ -177,26 +245,28 @@ class AgentOrchestrationService:
                     )
 
                 # Save generated code to session history
-                if session:
-                    session.add_code_to_history(
-                        code=code_response.generated_code,
-                        language=code_response.language,
-                        description=purpose
-                    )
-                    session.current_step = WorkflowStep.COMPLETED
-                    self.session_repo.update(session)
+                uow.push("code_history", Session.build_code_entry(
+                    code=code_response.generated_code,
+                    language=code_response.language,
+                    description=purpose
+                ))
+                uow.set_step(WorkflowStep.COMPLETED)
+                if not uow.flush():
+                    return None
 
                 return AgentResponse(
                     session_id=session_id,
                     current_step=WorkflowStep.COMPLETED.value,
                     generated_code=code_response.generated_code,
-                    context_json=session.context_json if session else parsed_json,
+                    context_json=parsed_json,
                     success=True,
                     message="Context parsed and code generated successfully",
                     timestamp=datetime.now()
                 )
             except Exception as e:
-                self.session_repo.update_step(session_id, WorkflowStep.ERROR)
+                uow.set_step(WorkflowStep.ERROR)
+                if not uow.flush():
+                    return None
                 return AgentResponse(
                     session_id=session_id,
                     current_step=WorkflowStep.ERROR.value,
@@ -207,7 +277,9 @@ class AgentOrchestrationService:
                 )
             
         except Exception as e:
-            self.session_repo.update_step(session_id, WorkflowStep.ERROR)
+            uow.set_step(WorkflowStep.ERROR)
+            if not uow.flush():
+                return None
             return AgentResponse(
                 session_id=session_id,
                 current_step=WorkflowStep.ERROR.value,
@@ -219,12 +291,146 @@ class AgentOrchestrationService:
     
     # ==================== FLOW 2: CLASSIFY INTENT + GENERATE CODE ====================
     
-    def process_prompt(self, request: AgentRequest) -> AgentResponse:
+    def _code_request(self, request: AgentRequest, session: Session,
+                      existing_code: Optional[Dict[str, Any]] = None) -> CodeGenerationRequest:
+        """CodeGenerationRequest cho prompt (kèm code hiện có khi sửa code)"""
+        context_parts = [str(session.context_json)] if session.context_json else []
+        if existing_code:
+            context_parts.append(
+                f"Existing code to modify ({existing_code.get('language', 'python')}):\n{existing_code.get('code', '')}"
+            )
+        return CodeGenerationRequest(
+            prompt=request.prompt,
+            language="python",
+            additional_context="\n\n".join(context_parts) or None,
+            model=request.model
+        )
+    
+    @staticmethod
+    def _route_intent(intent_response: IntentClassifyResponse, latest_code: List[Dict[str, Any]]) -> str:
+        """
+        Chọn nhánh xử lý theo intent: "generate" | "modify" | "analyze"
+        
+        Chỉ re-route khi session đã có code; không có code thì generate như CREATE_NEW
+        """
+        if not latest_code:
+            return PROMPT_ROUTE_GENERATE
+        if intent_response.intent == IntentType.ANALYZE:
+            return PROMPT_ROUTE_ANALYZE
+        if intent_response.intent == IntentType.MODIFY_EXISTING:
+            return PROMPT_ROUTE_MODIFY
+        return PROMPT_ROUTE_GENERATE
+    
+    def _build_prompt_dag(self, request: AgentRequest, session: Session,
+                          run_code: Optional[Callable[[str, CodeGenerationRequest], Awaitable[Any]]] = None,
+                          on_route: Optional[Callable[[str], None]] = None) -> StepDAG:
+        """
+        DAG của luồng F2 (dùng chung cho process_prompt_async và process_prompt_stream)
+        
+        intent, latest_code và generate (đoán là CREATE_NEW) chạy song song; khi có
+        intent + latest_code, bước route hủy generate và chạy analyze/modify nếu cần.
+        
+        Args:
+            run_code: (tên bước, CodeGenerationRequest) -> kết quả của bước generate/modify
+                (default: generate_code_async, trả về CodeGenerationResponse)
+            on_route: Được gọi với nhánh đã chọn ngay khi route xong
+        """
+        intent_request = IntentClassifyRequest(prompt=request.prompt, context_json=session.context_json)
+        
+        async def generate_code(_: str, code_request: CodeGenerationRequest):
+            return await self.code_gen_service.generate_code_async(code_request)
+        
+        run_code = run_code or generate_code
+        
+        async def route(results: Dict[str, Any]) -> str:
+            return self._route_intent(results["intent"], results["latest_code"])
+        
+        async def analyze(results: Dict[str, Any]) -> str:
+            prompt = self._build_analysis_prompt(results["latest_code"][-1])
+            return await self.async_gemini_repo.generate_code(prompt, model_name="gemini-2.5-flash")
+        
+        async def modify(results: Dict[str, Any]):
+            code_request = self._code_request(request, session, existing_code=results["latest_code"][-1])
+            return await run_code(PROMPT_ROUTE_MODIFY, code_request)
+        
+        def reroute(chosen: str, dag: StepDAG):
+            if chosen != PROMPT_ROUTE_GENERATE:
+                dag.cancel(PROMPT_ROUTE_GENERATE)
+                dag.add(chosen, analyze if chosen == PROMPT_ROUTE_ANALYZE else modify, depends_on=("latest_code",))
+            if on_route is not None:
+                on_route(chosen)
+        
+        dag = StepDAG()
+        dag.add("intent", lambda _: self.classify_intent_async(intent_request))
+        dag.add("latest_code", lambda _: self.async_session_repo.find_latest_code(request.session_id, limit=1))
+        dag.add(PROMPT_ROUTE_GENERATE, lambda _: run_code(PROMPT_ROUTE_GENERATE, self._code_request(request, session)))
+        dag.add("route", route, depends_on=("intent", "latest_code"), on_done=reroute)
+        return dag
+    
+    def _apply_prompt_result(self, session: Session, request: AgentRequest,
+                             intent_response: IntentClassifyResponse, route: str, result: Any) -> AgentResponse:
+        """
+        Ghi kết quả của nhánh đã chọn vào session (chưa lưu DB) và tạo response
+        
+        result: analysis text (analyze) hoặc CodeGenerationResponse (generate/modify)
+        """
+        session.last_intent = intent_response.intent.value
+        session.last_prompt = request.prompt
+        
+        if route == PROMPT_ROUTE_ANALYZE:
+            session.current_step = WorkflowStep.COMPLETED
+            return AgentResponse(
+                session_id=request.session_id,
+                current_step=WorkflowStep.COMPLETED.value,
+                intent=intent_response.intent.value,
+                code_analysis=result,
+                context_json=session.context_json,
+                success=True,
+                message="Code analysis completed",
+                timestamp=datetime.now()
+            )
+        
+        if not result.success:
+            session.current_step = WorkflowStep.ERROR
+            return AgentResponse(
+                session_id=request.session_id,
+                current_step=WorkflowStep.ERROR.value,
+                intent=intent_response.intent.value,
+                success=False,
+                message="Code generation failed",
+                error_message=result.error_message,
+                timestamp=datetime.now()
+            )
+        
+        # Save to history
+        session.add_code_to_history(
+            code=result.generated_code,
+            language=result.language,
+            description=request.prompt
+        )
+        session.current_step = WorkflowStep.COMPLETED
+        return AgentResponse(
+            session_id=request.session_id,
+            current_step=WorkflowStep.COMPLETED.value,
+            intent=intent_response.intent.value,
+            generated_code=result.generated_code,
+            context_json=session.context_json,
+            success=True,
+            message="Code modified successfully" if route == PROMPT_ROUTE_MODIFY else "Code generated successfully",
+            timestamp=datetime.now()
+        )
+    
+    async def process_prompt_async(self, request: AgentRequest) -> AgentResponse:
         """
         Luồng F2: Nhận prompt, classify intent, generate code
+        
+        Các bước chạy theo StepDAG (xem _build_prompt_dag), không block event loop
+        khi chờ Gemini và MongoDB. Bị hủy (client ngắt kết nối) -> step được trả lại
+        như trước khi chạy F2 rồi CancelledError được raise tiếp
         """
+        previous_step: Optional[WorkflowStep] = None
         try:
-            session = self.session_repo.find_by_id(request.session_id)
+            session = await self.async_session_repo.find_by_id(request.session_id)
             if not session:
                 return AgentResponse(
                     session_id=request.session_id,
@@ -234,61 +440,22 @@ class AgentOrchestrationService:
                     timestamp=datetime.now()
                 )
             
-            # Step 1: Classify intent
-            self.session_repo.update_step(request.session_id, WorkflowStep.CLASSIFYING_INTENT)
+            previous_step = session.current_step
+            await self.async_session_repo.update_step(request.session_id, WorkflowStep.GENERATING_CODE, session)
             
-            intent_request = IntentClassifyRequest(
-                prompt=request.prompt,
-                context_json=session.context_json
-            )
-            intent_response = self.classify_intent(intent_request)
+            results = await self._build_prompt_dag(request, session).run()
+            route = results["route"]
             
-            # Step 2: Generate code based on intent
-            self.session_repo.update_step(request.session_id, WorkflowStep.GENERATING_CODE)
-            
-            code_request = CodeGenerationRequest(
-                prompt=request.prompt,
-                language="python",
-                additional_context=str(session.context_json) if session.context_json else None,
-                model=request.model
-            )
-            code_response = self.code_gen_service.generate_code(code_request)
-            
-            if not code_response.success:
-                self.session_repo.update_step(request.session_id, WorkflowStep.ERROR)
-                return AgentResponse(
-                    session_id=request.session_id,
-                    current_step=WorkflowStep.ERROR.value,
-                    success=False,
-                    message="Code generation failed",
-                    error_message=code_response.error_message,
-                    timestamp=datetime.now()
-                )
-            
-            # Save to history
-            session.add_code_to_history(
-                code=code_response.generated_code,
-                language=code_response.language,
-                description=request.prompt
-            )
-            session.last_intent = intent_response.intent.value
-            session.last_prompt = request.prompt
-            session.current_step = WorkflowStep.COMPLETED
-            self.session_repo.update(session)
-            
-            return AgentResponse(
-                session_id=request.session_id,
-                current_step=WorkflowStep.COMPLETED.value,
-                intent=intent_response.intent.value,
-                generated_code=code_response.generated_code,
-                context_json=session.context_json,
-                success=True,
-                message="Code generated successfully",
-                timestamp=datetime.now()
-            )
+            response = self._apply_prompt_result(session, request, results["intent"], route, results[route])
+            await self.async_session_repo.update(session)
+            return response
             
+        except asyncio.CancelledError:
+            if previous_step is not None:
+                await self._restore_step(request.session_id, previous_step)
+            raise
         except Exception as e:
-            self.session_repo.update_step(request.session_id, WorkflowStep.ERROR)
+            await self.async_session_repo.update_step(request.session_id, WorkflowStep.ERROR)
             return AgentResponse(
                 session_id=request.session_id,
                 current_step=WorkflowStep.ERROR.value,
@@ -298,10 +465,147 @@ class AgentOrchestrationService:
                 timestamp=datetime.now()
             )
     
+    async def _restore_step(self, session_id: str, step: WorkflowStep):
+        """Trả step khi F2 bị hủy giữa chừng (shield: lần ghi không bị hủy theo request)"""
+        await asyncio.shield(self.async_session_repo.update_step(session_id, step))
+    
+    @staticmethod
+    async def _pump_events(events: AsyncIterator[Tuple[str, dict]], queue: asyncio.Queue):
+        """Đọc stream vào queue (None = hết stream)"""
+        try:
+            async for item in events:
+                await queue.put(item)
+        finally:
+            queue.put_nowait(None)
+    
+    @staticmethod
+    async def _drain_events(queue: asyncio.Queue) -> AsyncIterator[Tuple[str, dict]]:
+        """Đọc lại các events đã được pump vào queue"""
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            yield item
+    
+    async def process_prompt_stream(self, request: AgentRequest) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Luồng F2 (streaming): cùng StepDAG với process_prompt_async; relay code/explanation
+        events từ Gemini ngay khi có, lưu kết quả vào session khi stream hoàn tất và kết thúc
+        bằng event ``done``
+        
+        Events của bước generate (chạy cùng lúc với classify intent) được giữ trong queue
+        cho tới khi route xong, rồi được relay (CREATE_NEW) hoặc bỏ đi khi re-route.
+        
+        Client ngắt kết nối giữa chừng (CancelledError/GeneratorExit) -> step được trả lại
+        như trước khi chạy F2.
+        """
+        dag_task: Optional[asyncio.Future] = None
+        interrupted_step: Optional[WorkflowStep] = None  # Step cần trả lại nếu stream bị ngắt
+        try:
+            session = await self.async_session_repo.find_by_id(request.session_id)
+            if not session:
+                yield "error", {"message": "Session not found", "session_id": request.session_id}
+                return
+            
+            interrupted_step = session.current_step
+            await self.async_session_repo.update_step(request.session_id, WorkflowStep.GENERATING_CODE, session)
+            
+            queues = {PROMPT_ROUTE_GENERATE: asyncio.Queue(), PROMPT_ROUTE_MODIFY: asyncio.Queue()}
+            routed: asyncio.Future = asyncio.get_running_loop().create_future()
+            
+            def stream_code(step: str, code_request: CodeGenerationRequest) -> Awaitable[None]:
+                return self._pump_events(self.code_gen_service.stream_code(code_request), queues[step])
+            
+            dag = self._build_prompt_dag(request, session, run_code=stream_code, on_route=routed.set_result)
+            dag_task = asyncio.ensure_future(dag.run())
+            await asyncio.wait({routed, dag_task}, return_when=asyncio.FIRST_COMPLETED)
+            if not routed.done():
+                # intent/latest_code lỗi trước khi route
+                dag_task.result()
+            route = routed.result()
+            intent_response = dag.results["intent"]
+            yield "intent", {"intent": intent_response.intent.value, "confidence": intent_response.confidence}
+            
+            if route == PROMPT_ROUTE_ANALYZE:
+                result = (await dag_task)[route]
+            else:
+                code_result = None
+                async for event, data in self._drain_events(queues[route]):
+                    if event == "done":
+                        code_result = data
+                    elif event == "error":
+                        raise Exception(data.get("error_message"))
+                    else:
+                        yield event, data
+                await dag_task
+                if code_result is None:
+                    raise Exception("Code stream ended without result")
+                result = CodeGenerationResponse(**code_result)
+            
+            # Lưu kết quả (code history) khi stream hoàn tất
+            response = self._apply_prompt_result(session, request, intent_response, route, result)
+            await self.async_session_repo.update(session)
+            interrupted_step = None
+            yield "done", response.model_dump(mode="json")
+            
+        except Exception as e:
+            interrupted_step = None
+            await self.async_session_repo.update_step(request.session_id, WorkflowStep.ERROR)
+            yield "error", {"message": "Error processing prompt", "error_message": str(e)}
+        finally:
+            if dag_task is not None and not dag_task.done():
+                dag_task.cancel()
+            if interrupted_step is not None:
+                await self._restore_step(request.session_id, interrupted_step)
+    
     def classify_intent(self, request: IntentClassifyRequest) -> IntentClassifyResponse:
-        """Classify user intent: create_new, modify_existing, analyze"""
+        """
+        Classify user intent: create_new, modify_existing, analyze
+        
+        Prompt rõ ràng được phân loại tại chỗ (local_intent_classifier); chỉ prompt
+        mơ hồ mới gọi Gemini
+        """
+        local = local_intent_classifier.classify(request.prompt)
+        if local is not None:
+            return local
+        
+        try:
+            prompt = self._build_intent_prompt(request)
+            # Phân loại intent là deterministic -> dùng LLM cache
+            response_text = self.gemini_repo.generate_code(prompt, model_name="gemini-2.5-flash", use_cache=True)
+            return self._parse_intent_response(response_text)
+            
+        except Exception as e:
+            return IntentClassifyResponse(
+                intent=IntentType.UNKNOWN,
+                confidence=0.0,
+                reasoning=str(e),
+                success=False
+            )
+    
+    async def classify_intent_async(self, request: IntentClassifyRequest) -> IntentClassifyResponse:
+        """Classify user intent (async - không block event loop)"""
+        local = local_intent_classifier.classify(request.prompt)
+        if local is not None:
+            return local
+        
         try:
-            prompt = f"""
+            prompt = self._build_intent_prompt(request)
+            # Phân loại intent là deterministic -> dùng LLM cache
+            response_text = await self.async_gemini_repo.generate_code(prompt, model_name="gemini-2.5-flash", use_cache=True)
+            return self._parse_intent_response(response_text)
+            
+        except Exception as e:
+            return IntentClassifyResponse(
+                intent=IntentType.UNKNOWN,
+                confidence=0.0,
+                reasoning=str(e),
+                success=False
+            )
+    
+    def _build_intent_prompt(self, request: IntentClassifyRequest) -> str:
+        """Build prompt phân loại intent"""
+        return f"""
 Phân loại ý định của user dựa trên prompt sau:
 "{request.prompt}"
 
@@ -318,48 +622,55 @@ INTENT: <CREATE_NEW|MODIFY_EXISTING|ANALYZE|UNKNOWN>
 CONFIDENCE: <0.0-1.0>
 REASONING: <lý do>
 """
-            
-            response_text = self.gemini_repo.generate_code(prompt, model_name="gemini-2.5-flash")
-            
-            # Parse response
-            intent_str = "UNKNOWN"
-            confidence = 0.5
-            reasoning = response_text
-            
-            if "CREATE_NEW" in response_text.upper():
-                intent_str = "CREATE_NEW"
-                confidence = 0.9
-            elif "MODIFY" in response_text.upper():
-                intent_str = "MODIFY_EXISTING"
-                confidence = 0.85
-            elif "ANALYZE" in response_text.upper():
-                intent_str = "ANALYZE"
-                confidence = 0.8
-            
-            return IntentClassifyResponse(
-                intent=IntentType(intent_str.lower()),
-                confidence=confidence,
-                reasoning=reasoning,
-                success=True
-            )
-            
-        except Exception as e:
-            return IntentClassifyResponse(
-                intent=IntentType.UNKNOWN,
-                confidence=0.0,
-                reasoning=str(e),
-                success=False
-            )
+    
+    def _parse_intent_response(self, response_text: str) -> IntentClassifyResponse:
+        """Parse response phân loại intent từ Gemini"""
+        intent_str = "UNKNOWN"
+        confidence = 0.5
+        reasoning = response_text
+        
+        if "CREATE_NEW" in response_text.upper():
+            intent_str = "CREATE_NEW"
+            confidence = 0.9
+        elif "MODIFY" in response_text.upper():
+            intent_str = "MODIFY_EXISTING"
+            confidence = 0.85
+        elif "ANALYZE" in response_text.upper():
+            intent_str = "ANALYZE"
+            confidence = 0.8
+        
+        return IntentClassifyResponse(
+            intent=IntentType(intent_str.lower()),
+            confidence=confidence,
+            reasoning=reasoning,
+            success=True
+        )
     
     # ==================== FLOW 3: ANALYZE CODE ====================
     
+    def _build_analysis_prompt(self, code_entry: Dict[str, Any]) -> str:
+        """Build prompt phân tích một code entry"""
+        return f"""
+Phân tích code sau và tạo summary ngắn gọn:
+
+```{code_entry['language']}
+{code_entry['code']}
+```
+
+Hãy cung cấp:
+1. Mô tả chức năng chính
+2. Điểm mạnh
+3. Điểm cần cải thiện (nếu có)
+4. Complexity estimate
+"""
+    
     def analyze_code(self, session_id: str) -> AgentResponse:
         """
         Luồng F3: Phân tích code vừa generate và tạo summary
         """
         try:
-            session = self.session_repo.find_by_id(session_id)
-            if not session or not session.code_history:
+            latest = self.session_repo.find_latest_code(session_id, limit=1)
+            if not latest:
                 return AgentResponse(
                     session_id=session_id,
                     current_step=WorkflowStep.ERROR.value,
@@ -370,28 +681,11 @@ REASONING: <lý do>
             
             self.session_repo.update_step(session_id, WorkflowStep.ANALYZING_CODE)
             
-            # Get latest code
-            latest_code = session.code_history[-1]
-            
-            # Analyze with Gemini
-            analysis_prompt = f"""
-Phân tích code sau và tạo summary ngắn gọn:
-
-```{latest_code['language']}
-{latest_code['code']}
-```
-
-Hãy cung cấp:
-1. Mô tả chức năng chính
-2. Điểm mạnh
-3. Điểm cần cải thiện (nếu có)
-4. Complexity estimate
-"""
-            
+            # Analyze latest code with Gemini
+            analysis_prompt = self._build_analysis_prompt(latest[-1])
             analysis = self.gemini_repo.generate_code(analysis_prompt, model_name="gemini-2.5-flash")
             
-            session.current_step = WorkflowStep.COMPLETED
-            self.session_repo.update(session)
+            self.session_repo.update_step(session_id, WorkflowStep.COMPLETED)
             
             return AgentResponse(
                 session_id=session_id,
@@ -412,4 +706,44 @@ Hãy cung cấp:
                 error_message=str(e),
                 timestamp=datetime.now()
             )
+    
+    async def analyze_code_async(self, session_id: str) -> AgentResponse:
+        """Luồng F3 (async): giống analyze_code nhưng không block event loop"""
+        try:
+            latest = await self.async_session_repo.find_latest_code(session_id, limit=1)
+            if not latest:
+                return AgentResponse(
+                    session_id=session_id,
+                    current_step=WorkflowStep.ERROR.value,
+                    success=False,
+                    message="No code to analyze",
+                    timestamp=datetime.now()
+                )
+            
+            await self.async_session_repo.update_step(session_id, WorkflowStep.ANALYZING_CODE)
+            
+            analysis_prompt = self._build_analysis_prompt(latest[-1])
+            analysis = await self.async_gemini_repo.generate_code(analysis_prompt, model_name="gemini-2.5-flash")
+            
+            await self.async_session_repo.update_step(session_id, WorkflowStep.COMPLETED)
+            
+            return AgentResponse(
+                session_id=session_id,
+                current_step=WorkflowStep.COMPLETED.value,
+                code_analysis=analysis,
+                success=True,
+                message="Code analysis completed",
+                timestamp=datetime.now()
+            )
+            
+        except Exception as e:
+            await self.async_session_repo.update_step(session_id, WorkflowStep.ERROR)
+            return AgentResponse(
+                session_id=session_id,
+                current_step=WorkflowStep.ERROR.value,
+                success=False,
+                message="Error analyzing code",
+                error_message=str(e),
+                timestamp=datetime.now()
+            )
 
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Optional, Tuple
 import json
 import re
 
@@ -11,19 +11,24 @@ from BE.model.ai_models import (
     ReviewIssue
 )
 from BE.repository.gemini_repo import GeminiRepository
+from BE.repository.async_gemini_repo import AsyncGeminiRepository
+from BE.utils.stream_parser import CodeFenceStreamParser
 
 
 class CodeGenerationService:
     """Service for code generation using AI"""
     
-    def __init__(self, gemini_repo: Optional[GeminiRepository] = None):
+    def __init__(self, gemini_repo: Optional[GeminiRepository] = None,
+                 async_gemini_repo: Optional[AsyncGeminiRepository] = None):
         """
         Initialize code generation service
         
         Args:
             gemini_repo: Optional GeminiRepository instance
+            async_gemini_repo: Optional AsyncGeminiRepository instance
         """
         self.gemini_repo = gemini_repo or GeminiRepository()
+        self.async_gemini_repo = async_gemini_repo or AsyncGeminiRepository()
     
     def generate_code(self, request: CodeGenerationRequest) -> CodeGenerationResponse:
         """
@@ -40,7 +45,7 @@ class CodeGenerationService:
             prompt = self._build_generation_prompt(request)
             
             # Call Gemini API with specified model
-            response_text = self.gemini_repo.generate_code(prompt, model_name=request.model)
+            response_text = self.gemini_repo.generate_code(prompt, model_name=request.model, use_cache=request.use_cache)
             
             # Parse response
             generated_code, explanation = self._parse_generation_response(response_text)
@@ -62,6 +67,82 @@ class CodeGenerationService:
                 error_message=str(e)
             )
     
+    async def generate_code_async(self, request: CodeGenerationRequest) -> CodeGenerationResponse:
+        """
+        Generate code without blocking the event loop
+        
+        Args:
+            request: CodeGenerationRequest object
+            
+        Returns:
+            CodeGenerationResponse object
+        """
+        try:
+            prompt = self._build_generation_prompt(request)
+            response_text = await self.async_gemini_repo.generate_code(
+                prompt, model_name=request.model, use_cache=request.use_cache
+            )
+            generated_code, explanation = self._parse_generation_response(response_text)
+            
+            return CodeGenerationResponse(
+                generated_code=generated_code,
+                explanation=explanation,
+                language=request.language,
+                timestamp=datetime.now(),
+                success=True
+            )
+        except Exception as e:
+            return CodeGenerationResponse(
+                generated_code="",
+                explanation="",
+                language=request.language,
+                timestamp=datetime.now(),
+                success=False,
+                error_message=str(e)
+            )
+    
+    async def stream_code(self, request: CodeGenerationRequest) -> AsyncIterator[Tuple[str, dict]]:
+        """
+        Stream code generation as (event, data) tuples
+        
+        Emits ``code``/``explanation`` events while Gemini is still generating,
+        then a final ``done`` event carrying the full CodeGenerationResponse
+        (or an ``error`` event).
+        
+        Args:
+            request: CodeGenerationRequest object
+        """
+        parser = CodeFenceStreamParser()
+        parts = []
+        
+        try:
+            prompt = self._build_generation_prompt(request)
+            async for chunk in self.async_gemini_repo.stream_code(
+                prompt, model_name=request.model, use_cache=request.use_cache
+            ):
+                parts.append(chunk)
+                for event, text in parser.feed(chunk):
+                    yield event, {"text": text}
+            
+            for event, text in parser.finish():
+                yield event, {"text": text}
+            
+            response_text = "".join(parts)
+            if not response_text:
+                raise Exception("Empty response from Gemini")
+            
+            generated_code, explanation = self._parse_generation_response(response_text)
+            response = CodeGenerationResponse(
+                generated_code=generated_code,
+                explanation=explanation,
+                language=request.language,
+                timestamp=datetime.now(),
+                success=True
+            )
+            yield "done", response.model_dump(mode="json")
+        except Exception as e:
+            yield "error", {"error_message": str(e)}
+    
     def _build_generation_prompt(self, request: CodeGenerationRequest) -> str:
         """Build prompt for code generation"""
         prompt = f"Generate {request.language} code for the following requirement:\n\n"
@@ -100,8 +181,10 @@ class CodeGenerationService:
 class CodeReviewService:
     """Service for code review using AI"""
     
-    def __init__(self, gemini_repo: Optional[GeminiRepository] = None):
+    def __init__(self, gemini_repo: Optional[GeminiRepository] = None,
+                 async_gemini_repo: Optional[AsyncGeminiRepository] = None):
         self.gemini_repo = gemini_repo or GeminiRepository()
+        self.async_gemini_repo = async_gemini_repo or AsyncGeminiRepository()
     
     def review_code(self, request: CodeReviewRequest) -> CodeReviewResponse:
         try:
@@ -110,30 +193,52 @@ class CodeReviewService:
                 code=request.code,
                 language=request.language,
                 review_type=request.review_type,
-                model_name=request.model
-            )
-            
-            # Parse review response
-            score, issues, summary, improvements = self._parse_review_response(response_text)
-            
-            return CodeReviewResponse(
-                overall_score=score,
-                issues=issues,
-                summary=summary,
-                improvements=improvements,
-                timestamp=datetime.now(),
-                success=True
+                model_name=request.model,
+                use_cache=request.use_cache
             )
+            return self._build_review_response(response_text)
         except Exception as e:
-            return CodeReviewResponse(
-                overall_score=0.0,
-                issues=[],
-                summary="",
-                improvements=[],
-                timestamp=datetime.now(),
-                success=False,
-                error_message=str(e)
+            return self._review_error(e)
+    
+    async def review_code_async(self, request: CodeReviewRequest) -> CodeReviewResponse:
+        """Review code without blocking the event loop"""
+        try:
+            response_text = await self.async_gemini_repo.review_code(
+                code=request.code,
+                language=request.language,
+                review_type=request.review_type,
+                model_name=request.model,
+                use_cache=request.use_cache
             )
+            return self._build_review_response(response_text)
+        except Exception as e:
+            return self._review_error(e)
+    
+    def _build_review_response(self, response_text: str) -> CodeReviewResponse:
+        """Parse review text into a successful CodeReviewResponse"""
+        score, issues, summary, improvements = self._parse_review_response(response_text)
+        
+        return CodeReviewResponse(
+            overall_score=score,
+            issues=issues,
+            summary=summary,
+            improvements=improvements,
+            timestamp=datetime.now(),
+            success=True
+        )
+    
+    @staticmethod
+    def _review_error(error: Exception) -> CodeReviewResponse:
+        """Failed CodeReviewResponse"""
+        return CodeReviewResponse(
+            overall_score=0.0,
+            issues=[],
+            summary="",
+            improvements=[],
+            timestamp=datetime.now(),
+            success=False,
+            error_message=str(error)
+        )
     
     def _parse_review_response(self, response_text: str) -> tuple[float, list, str, list]:
         """Parse review response from Gemini"""
@@ -1,8 +1,9 @@
 """
 Base Service - Reusable service logic
 """
-from typing import List, Optional, Dict, TypeVar, Generic, Type
+from typing import Iterable, List, Optional, Dict, TypeVar, Generic, Type
 from BE.repository.base_repo import BaseRepository
+from BE.repository.async_base_repo import AsyncBaseRepository
 
 T = TypeVar('T')
 
@@ -10,46 +11,164 @@ T = TypeVar('T')
 class BaseService(Generic[T]):
     """Base service với common operations"""
     
-    def __init__(self, repository: BaseRepository[T]):
+    def __init__(self, repository: BaseRepository[T], async_repository: Optional[AsyncBaseRepository[T]] = None):
         self.repo = repository
+        self.async_repo = async_repository
+    
+    def visible_filter(self, filter_query: Optional[dict] = None) -> Optional[dict]:
+        """Filter áp dụng cho các truy vấn danh sách (subclass override để ẩn một số entities)"""
+        return filter_query
+    
+    def count_filter(self, filter_query: Optional[dict] = None, exact: bool = False) -> Optional[dict]:
+        """Filter dùng để đếm total của get_all (mặc định giống visible_filter)"""
+        return self.visible_filter(filter_query)
     
     def create(self, entity: T) -> T:
         """Tạo entity mới"""
         return self.repo.create(entity)
     
-    def get_by_id(self, entity_id: str) -> Optional[T]:
-        """Lấy entity theo ID"""
-        return self.repo.find_by_id(entity_id)
+    def get_by_id(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[T]:
+        """Lấy entity theo ID (fields/view: chỉ lấy một phần document)"""
+        return self.repo.find_by_id(entity_id, fields=fields, view=view)
     
-    def get_all(self, page: int = 1, page_size: int = 10, filter_query: dict = None) -> Dict:
-        """Lấy danh sách entities với pagination"""
+    def get_all(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Dict:
+        """
+        Lấy danh sách entities với pagination
+        
+        total mặc định là ước lượng/cache (xem count_total), exact_total=True để đếm chính xác
+        """
+        count_filter = self.count_filter(filter_query, exact=exact_total)
+        filter_query = self.visible_filter(filter_query)
         page = max(1, page)
         page_size = max(1, min(100, page_size))
         skip = (page - 1) * page_size
         
-        entities = self.repo.find_all(skip=skip, limit=page_size, filter_query=filter_query)
-        total = self.repo.count(filter_query)
+        entities = self.repo.find_all(skip=skip, limit=page_size, filter_query=filter_query, fields=fields, view=view)
+        total, total_exact = self.repo.count_total(count_filter, exact=exact_total)
         
         return {
             "items": entities,
             "total": total,
+            "total_exact": total_exact,
             "page": page,
             "page_size": page_size,
             "total_pages": (total + page_size - 1) // page_size
         }
     
-    def get_by_user(self, user_id: str, page: int = 1, page_size: int = 10) -> Dict:
+    def get_page(
+        self,
+        cursor: Optional[str] = None,
+        page_size: int = 10,
+        filter_query: dict = None,
+        include_total: bool = False,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> Dict:
+        """
+        Lấy danh sách entities với keyset pagination (cursor)
+        
+        Chi phí mỗi trang như nhau bất kể độ sâu; total chỉ được đếm khi include_total=True
+        """
+        filter_query = self.visible_filter(filter_query)
+        page_size = max(1, min(100, page_size))
+        entities, next_cursor = self.repo.find_page(
+            limit=page_size, cursor=cursor, filter_query=filter_query, fields=fields, view=view
+        )
+        total = self.repo.count(filter_query) if include_total else None
+        return self._cursor_page(entities, next_cursor, page_size, total)
+    
+    async def get_by_id_async(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[T]:
+        """Lấy entity theo ID (async - không block event loop)"""
+        return await self.async_repo.find_by_id(entity_id, fields=fields, view=view)
+    
+    async def get_all_async(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        filter_query: dict = None,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Dict:
+        """Lấy danh sách entities với pagination (async - không block event loop)"""
+        count_filter = self.count_filter(filter_query, exact=exact_total)
+        filter_query = self.visible_filter(filter_query)
+        page = max(1, page)
+        page_size = max(1, min(100, page_size))
+        skip = (page - 1) * page_size
+        
+        entities = await self.async_repo.find_all(skip=skip, limit=page_size, filter_query=filter_query, fields=fields, view=view)
+        total, total_exact = await self.async_repo.count_total(count_filter, exact=exact_total)
+        
+        return {
+            "items": entities,
+            "total": total,
+            "total_exact": total_exact,
+            "page": page,
+            "page_size": page_size,
+            "total_pages": (total + page_size - 1) // page_size
+        }
+    
+    async def get_page_async(
+        self,
+        cursor: Optional[str] = None,
+        page_size: int = 10,
+        filter_query: dict = None,
+        include_total: bool = False,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None
+    ) -> Dict:
+        """Lấy danh sách entities với keyset pagination (async - không block event loop)"""
+        filter_query = self.visible_filter(filter_query)
+        page_size = max(1, min(100, page_size))
+        entities, next_cursor = await self.async_repo.find_page(
+            limit=page_size, cursor=cursor, filter_query=filter_query, fields=fields, view=view
+        )
+        total = await self.async_repo.count(filter_query) if include_total else None
+        return self._cursor_page(entities, next_cursor, page_size, total)
+    
+    @staticmethod
+    def _cursor_page(entities: List[T], next_cursor: Optional[str], page_size: int, total: Optional[int]) -> Dict:
+        """Kết quả keyset pagination"""
+        result = {
+            "items": entities,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None,
+            "page_size": page_size
+        }
+        if total is not None:
+            result["total"] = total
+        return result
+    
+    def get_by_user(
+        self,
+        user_id: str,
+        page: int = 1,
+        page_size: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Dict:
         """Lấy entities của user"""
         page = max(1, page)
         page_size = max(1, min(100, page_size))
         skip = (page - 1) * page_size
         
-        entities = self.repo.find_by_user(user_id, skip=skip, limit=page_size)
-        total = self.repo.count_by_user(user_id)
+        entities = self.repo.find_by_user(user_id, skip=skip, limit=page_size, fields=fields, view=view)
+        total, total_exact = self.repo.count_total({"user_id": user_id}, exact=exact_total)
         
         return {
             "items": entities,
             "total": total,
+            "total_exact": total_exact,
             "page": page,
             "page_size": page_size,
             "total_pages": (total + page_size - 1) // page_size
@@ -60,7 +179,8 @@ class BaseService(Generic[T]):
         if not entity.id:
             raise ValueError("Entity ID is required for update")
         
-        existing = self.repo.find_by_id(entity.id)
+        # Chỉ kiểm tra tồn tại -> chỉ lấy _id
+        existing = self.repo.find_by_id(entity.id, fields=[])
         if not existing:
             raise ValueError(f"Entity với ID '{entity.id}' không tồn tại")
         
@@ -68,7 +188,7 @@ class BaseService(Generic[T]):
     
     def delete(self, entity_id: str) -> bool:
         """Xóa entity"""
-        existing = self.repo.find_by_id(entity_id)
+        existing = self.repo.find_by_id(entity_id, fields=[])
         if not existing:
             raise ValueError(f"Entity với ID '{entity_id}' không tồn tại")
         
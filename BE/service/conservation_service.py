@@ -1,20 +1,30 @@
 """
 Conservation Service
 """
-from typing import Dict, List, Optional
+import time
+from typing import AsyncIterator, Dict, Iterable, List, Optional
 from datetime import datetime
+from bson import ObjectId
 from BE.service.base_service import BaseService
 from BE.repository.conservation_repo import ConservationRepository
+from BE.repository.async_base_repo import AsyncBaseRepository
 from BE.repository.message_repo import MessageRepository
+from BE.repository.delete_job_repo import DeleteJobRepository
 from BE.entities.conservation_entity import Conservation
+from BE.entities.message_entity import Message
+from BE.entities.delete_job_entity import DeleteJob, DeleteJobStatus
+from BE.utils.config import env
+from BE.utils.json_stream import stream_json_object
 
 
 class ConservationService(BaseService[Conservation]):
     """Service cho Conservation với business logic"""
     
     def __init__(self):
-        super().__init__(ConservationRepository())
+        super().__init__(ConservationRepository(), AsyncBaseRepository("conservations", Conservation, sort_field="createdAt"))
         self.message_repo = MessageRepository()
+        self.async_message_repo = AsyncBaseRepository("messages", Message, sort_field="createdAt")
+        self.delete_job_repo = DeleteJobRepository()
     
     def create_conservation(self, title: str, goal: str, facts: List[str] = None) -> Conservation:
         """
@@ -45,39 +55,87 @@ class ConservationService(BaseService[Conservation]):
         
         return self.repo.create(conservation)
     
-    def get_recent(self, page: int = 1, page_size: int = 10) -> Dict:
-        """Lấy conservations mới nhất"""
+    # ==================== READ (bỏ các conservation đang xóa) ====================
+    
+    def get_by_id(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[Conservation]:
+        """Lấy conservation theo ID (None nếu không tồn tại hoặc đang được xóa)"""
+        if not ObjectId.is_valid(entity_id):
+            return None
+        items = self.repo.find_all(limit=1, filter_query=self.visible_filter({"_id": ObjectId(entity_id)}), fields=fields, view=view)
+        return items[0] if items else None
+    
+    async def get_by_id_async(self, entity_id: str, fields: Optional[Iterable[str]] = None, view: Optional[str] = None) -> Optional[Conservation]:
+        """Lấy conservation theo ID (async, None nếu không tồn tại hoặc đang được xóa)"""
+        if not ObjectId.is_valid(entity_id):
+            return None
+        items = await self.async_repo.find_all(limit=1, filter_query=self.visible_filter({"_id": ObjectId(entity_id)}), fields=fields, view=view)
+        return items[0] if items else None
+    
+    def visible_filter(self, filter_query: Optional[dict] = None) -> Optional[dict]:
+        """get_all/get_page (sync + async) bỏ các conservation đang xóa"""
+        return self.repo.visible(filter_query)
+    
+    def count_filter(self, filter_query: Optional[dict] = None, exact: bool = False) -> Optional[dict]:
+        """
+        Total ước lượng/cache không lọc status "deleting" (trạng thái tạm thời của job xóa nền):
+        list không filter vẫn dùng được estimated_document_count. exact=True mới bỏ chúng ra.
+        """
+        return self.visible_filter(filter_query) if exact else filter_query
+    
+    def get_recent(
+        self,
+        page: int = 1,
+        page_size: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Dict:
+        """Lấy conservations mới nhất (fields/view: chỉ lấy một phần document)"""
         page = max(1, page)
         page_size = max(1, min(100, page_size))
         skip = (page - 1) * page_size
         
-        items = self.repo.find_recent(skip=skip, limit=page_size)
-        total = self.repo.count()
+        items = self.repo.find_recent(skip=skip, limit=page_size, fields=fields, view=view)
+        total, total_exact = self.repo.count_total(self.count_filter(exact=exact_total), exact=exact_total)
         
         return {
             "items": items,
             "total": total,
+            "total_exact": total_exact,
             "page": page,
             "page_size": page_size,
             "total_pages": (total + page_size - 1) // page_size
         }
     
-    def search_by_title(self, title: str, page: int = 1, page_size: int = 10) -> Dict:
-        """Search conservations theo title"""
+    def search_by_title(
+        self,
+        title: str,
+        page: int = 1,
+        page_size: int = 10,
+        fields: Optional[Iterable[str]] = None,
+        view: Optional[str] = None,
+        exact_total: bool = False
+    ) -> Dict:
+        """
+        Search conservations theo title/goal/facts (text index, không phân biệt dấu)
+        
+        Kết quả xếp theo độ liên quan, title khớp được ưu tiên
+        """
         page = max(1, page)
         page_size = max(1, min(100, page_size))
         skip = (page - 1) * page_size
         
-        items = self.repo.find_by_title(title, skip=skip, limit=page_size)
-        
-        # Count bằng query tương tự
-        import re
-        pattern = re.compile(re.escape(title), re.IGNORECASE)
-        total = self.repo.count({"title": pattern})
+        filter_query = self.repo.build_search_filter(title)
+        if filter_query is None:
+            items, total, total_exact = [], 0, True
+        else:
+            items = self.repo.search(title, skip=skip, limit=page_size, fields=fields, view=view)
+            total, total_exact = self.repo.count_total(self.count_filter(filter_query, exact=exact_total), exact=exact_total)
         
         return {
             "items": items,
             "total": total,
+            "total_exact": total_exact,
             "page": page,
             "page_size": page_size,
             "total_pages": (total + page_size - 1) // page_size
@@ -86,7 +144,8 @@ class ConservationService(BaseService[Conservation]):
     def update_conservation(self, conservation_id: str, title: Optional[str] = None, 
                            goal: Optional[str] = None) -> Optional[Conservation]:
         """Update conservation"""
-        existing = self.repo.find_by_id(conservation_id)
+        # Chỉ load các field được sửa -> update chỉ $set các field này
+        existing = self.get_by_id(conservation_id, fields=["title", "goal", "facts", "search", "updatedAt"])
         if not existing:
             raise ValueError(f"Conservation với ID '{conservation_id}' không tồn tại")
         
@@ -109,7 +168,7 @@ class ConservationService(BaseService[Conservation]):
         if not fact or not fact.strip():
             raise ValueError("Fact không được để trống")
         
-        conservation = self.repo.find_by_id(conservation_id)
+        conservation = self.get_by_id(conservation_id, fields=[])
         if not conservation:
             raise ValueError(f"Conservation với ID '{conservation_id}' không tồn tại")
         
@@ -119,6 +178,9 @@ class ConservationService(BaseService[Conservation]):
         """
         Xóa conservation và optionally xóa tất cả messages
         
+        Xóa messages chạy đồng bộ theo batch (dùng cho scripts); API dùng
+        start_cascade_delete + run_cascade_delete để chạy nền.
+        
         Args:
             conservation_id: ID của conservation
             delete_messages: Có xóa messages không (default: True)
@@ -126,38 +188,153 @@ class ConservationService(BaseService[Conservation]):
         Returns:
             bool: True nếu xóa thành công
         """
-        conservation = self.repo.find_by_id(conservation_id)
+        if delete_messages:
+            job = self.start_cascade_delete(conservation_id)
+            job = self.run_cascade_delete(job.id)
+            return job is not None and job.status == DeleteJobStatus.COMPLETED.value
+        
+        conservation = self.repo.find_by_id(conservation_id, fields=[])
         if not conservation:
             raise ValueError(f"Conservation với ID '{conservation_id}' không tồn tại")
         
-        # Xóa messages nếu cần
-        if delete_messages:
-            self.message_repo.delete_by_conversation(conservation_id)
-        
         return self.repo.delete(conservation_id)
     
-    def get_with_messages(self, conservation_id: str) -> Optional[Dict]:
+    def start_cascade_delete(self, conservation_id: str) -> DeleteJob:
         """
-        Lấy conservation cùng với messages
+        Đánh dấu conservation là "deleting" và tạo job xóa nền (chưa chạy)
+        
+        Gọi lại khi đã có job chưa hoàn thành thì trả về job đó.
         
         Returns:
-            Dict: {conservation: {...}, messages: [...]}
+            DeleteJob: Job đã tạo/đang có
+            
+        Raises:
+            ValueError: Nếu conservation không tồn tại
         """
-        conservation = self.repo.find_by_id(conservation_id)
+        conservation = self.repo.find_by_id(conservation_id, fields=["messageCount"])
         if not conservation:
-            return None
+            raise ValueError(f"Conservation với ID '{conservation_id}' không tồn tại")
+        
+        self.repo.mark_deleting(conservation_id)
+        now = datetime.utcnow()
+        # Request đồng thời: unique index chỉ cho một job active, request còn lại nhận job đó
+        job = self.delete_job_repo.create_active(DeleteJob(
+            conservation_id=conservation_id,
+            total_messages=max(0, conservation.message_count),
+            created_at=now,
+            updated_at=now
+        ))
+        if not job:
+            # Job đang có vừa xóa xong conservation
+            raise ValueError(f"Conservation với ID '{conservation_id}' không tồn tại")
+        return job
+    
+    def run_cascade_delete(self, job_id: str) -> Optional[DeleteJob]:
+        """
+        Chạy delete job: xóa messages theo batch (CASCADE_DELETE_BATCH_SIZE) rồi xóa conservation
+        
+        Mỗi batch cập nhật progress (cũng là heartbeat). Job được claim atomic nên
+        chạy lại an toàn: job đang chạy ở worker khác sẽ bị bỏ qua, job bị gián đoạn
+        tiếp tục xóa phần messages còn lại.
+        
+        Returns:
+            Optional[DeleteJob]: Job sau khi chạy (None nếu không tồn tại)
+        """
+        job = self.delete_job_repo.find_by_id(job_id)
+        if not job or not self.delete_job_repo.claim(job_id, env.CASCADE_DELETE_STALE_SECONDS):
+            return job
+        
+        try:
+            while True:
+                deleted = self.message_repo.delete_batch_by_conversation(
+                    job.conservation_id, batch_size=env.CASCADE_DELETE_BATCH_SIZE
+                )
+                if not deleted:
+                    break
+                self.delete_job_repo.add_progress(job_id, deleted)
+                # Giãn cách các batch để không dồn tải lên DB
+                time.sleep(env.CASCADE_DELETE_BATCH_DELAY_SECONDS)
+            
+            self.repo.delete(job.conservation_id)
+            self.delete_job_repo.finish(job_id, DeleteJobStatus.COMPLETED)
+        except Exception as e:
+            self.delete_job_repo.finish(job_id, DeleteJobStatus.FAILED, error=str(e))
         
-        # Lấy tất cả messages của conservation
-        messages = self.message_repo.find_by_conversation(conservation_id, skip=0, limit=1000)
+        return self.delete_job_repo.find_by_id(job_id)
+    
+    def resume_cascade_deletes(self) -> int:
+        """
+        Chạy tiếp các delete job bị gián đoạn (pending hoặc running không còn heartbeat)
         
+        Returns:
+            int: Số jobs đã chạy
+        """
+        jobs = self.delete_job_repo.find_resumable(env.CASCADE_DELETE_STALE_SECONDS)
+        for job in jobs:
+            self.run_cascade_delete(job.id)
+        return len(jobs)
+    
+    def get_delete_job(self, job_id: str) -> Optional[DeleteJob]:
+        """Lấy delete job (progress)"""
+        return self.delete_job_repo.find_by_id(job_id)
+    
+    def get_with_messages(self, conservation_id: str, limit: int = 50, cursor: Optional[str] = None) -> Optional[Dict]:
+        """
+        Lấy conservation cùng với cửa sổ messages mới nhất (một aggregation $lookup)
+        
+        Args:
+            conservation_id: ID của conservation
+            limit: Số messages mỗi cửa sổ (max 200)
+            cursor: next_cursor để lấy messages cũ hơn
+        
+        Returns:
+            Dict: {conservation, messages (theo thứ tự thời gian), total_messages, next_cursor, has_more}
+        """
+        limit = max(1, min(200, limit))
+        result = self.repo.find_with_messages(conservation_id, limit=limit, cursor=cursor)
+        if not result:
+            return None
+        
+        conservation, messages, next_cursor = result
         return {
             "conservation": conservation,
             "messages": messages,
-            "total_messages": len(messages)
+            # Counter được maintain trên conservation, không bị giới hạn bởi cửa sổ
+            "total_messages": conservation.message_count,
+            "next_cursor": next_cursor,
+            "has_more": next_cursor is not None
         }
     
+    async def stream_with_messages(self, conservation_id: str, batch_size: int = 200) -> Optional[AsyncIterator[str]]:
+        """
+        Stream conservation cùng toàn bộ messages dưới dạng JSON (cho conversation dài)
+        
+        Messages được đọc theo batch từ cursor và ghi ra ngay, không giữ cả danh sách trong memory.
+        
+        Returns:
+            AsyncIterator[str] các chunk JSON, None nếu conservation không tồn tại
+        """
+        conservation = await self.get_by_id_async(conservation_id)
+        if not conservation:
+            return None
+        
+        async def messages():
+            cursor = self.async_message_repo.collection.find(
+                {"conversationId": ObjectId(conservation.id)}
+            ).sort([("createdAt", 1), ("_id", 1)]).batch_size(batch_size)
+            async for doc in cursor:
+                yield Message.from_dict(doc).to_response()
+        
+        return stream_json_object(
+            {"conservation": conservation.to_response()},
+            "messages",
+            messages(),
+            {"totalMessages": conservation.message_count}
+        )
+    
     def close(self):
         """Đóng connections"""
         super().close()
         self.message_repo.close()
+        self.delete_job_repo.close()
 
@@ -4,25 +4,87 @@ Context Parsing Service (Service 1)
 
 import json
 import logging
-from typing import Optional, Dict, Any
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Tuple
 
-from BE.model.intent_models import ParsedContextV2, GoalType
+from pydantic import ValidationError
+
+from BE.model.intent_models import (
+    ParsedContextV2,
+    GoalType,
+    FunctionDetails,
+    MultipleFunctionsDetails,
+    LayoutDetails
+)
 from BE.repository.gemini_repo import GeminiRepository
+from BE.repository.async_gemini_repo import AsyncGeminiRepository
+from BE.utils.config import env
+from BE.utils.structured_output import gemini_schema, json_parse_metrics, loads_lenient
+
+
+# Model validate details theo goal_type (mọi field đều optional nên validate được từng field)
+DETAILS_MODELS = {
+    GoalType.GENERATE_FUNCTION: FunctionDetails,
+    GoalType.GENERATE_MULTIPLE_FUNCTIONS: MultipleFunctionsDetails,
+    GoalType.GENERATE_LAYOUT: LayoutDetails,
+}
+
+# Mô tả JSON của từng field - refinement prompt chỉ gửi các field còn thiếu
+REFINEMENT_FIELD_HINTS = {
+    GoalType.GENERATE_FUNCTION: {
+        "function_name": '"ten_ham"',
+        "purpose": '"Mo ta muc dich chinh"',
+        "inputs": '[{"name": "ten", "type": "kieu", "description": "mo ta"}]',
+        "core_logic": '["Buoc 1", "Buoc 2"]',
+        "outputs": '{"type": "kieu", "description": "mo ta"}',
+    },
+    GoalType.GENERATE_MULTIPLE_FUNCTIONS: {
+        "group_name": '"Ten nhom function"',
+        "shared_context": '"Context chung (model, field...)"',
+        "functions": '[{"function_name": "ten", "purpose": "mo ta", "core_logic": ["Buoc 1"]}]',
+    },
+    GoalType.GENERATE_LAYOUT: {
+        "page_name": '"Ten trang"',
+        "components": '[{"type": "title|input|button|text", "text": "...", "placeholder": "...", "identifier": "..."}]',
+        "layout": '{"alignment": "...", "structure": "..."}',
+        "style": '{"colors": "...", "font": "...", "other": []}',
+    },
+}
+
+# Tên trong get_missing_fields() khác tên field trong details
+MISSING_FIELD_ALIASES = {"function_details": "functions"}
+
+# Field của extract_one_shot (khớp CAU TRUC JSON MUC TIEU trong prompt)
+EXTRACTION_FIELDS = ("function_name", "purpose", "inputs", "core_logic", "outputs")
+
+
+@lru_cache(maxsize=1)
+def _extraction_schema() -> Dict[str, Any]:
+    """response_schema cho extract_one_shot"""
+    return gemini_schema(FunctionDetails, fields=EXTRACTION_FIELDS, required=EXTRACTION_FIELDS)
+
+
+@lru_cache(maxsize=64)
+def _refinement_schema(goal_type: GoalType, fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """response_schema cho JSON patch của refine (chỉ các field còn thiếu)"""
+    return gemini_schema(DETAILS_MODELS[goal_type], fields=fields)
 
 
 class ContextParsingService:
-    """Service trích xuất context một lần từ user message"""
+    """Service trích xuất context từ user message (một lần hoặc refine từng turn)"""
 
-    def __init__(self, gemini_repo: Optional[GeminiRepository] = None):
+    def __init__(self, gemini_repo: Optional[GeminiRepository] = None,
+                 async_gemini_repo: Optional[AsyncGeminiRepository] = None):
         self.gemini_repo = gemini_repo or GeminiRepository()
+        self.async_gemini_repo = async_gemini_repo or AsyncGeminiRepository()
         self.logger = logging.getLogger(__name__)
 
     def extract_one_shot(self, user_context: str, model_name: Optional[str] = None):
         """Trích xuất context một lần từ user message"""
         try:
             prompt = self._build_extraction_prompt(user_context)
-            response_text = self.gemini_repo.generate_code(prompt, model_name=model_name)
-            extracted_data = self._parse_json_response(response_text)
+            response_text, structured = self._request_json(prompt, _extraction_schema(), model_name)
+            extracted_data = self._parse_json_response(response_text, structured)
 
             if not extracted_data:
                 return False, None, "Failed to parse JSON response from Gemini"
@@ -33,6 +95,153 @@ class ContextParsingService:
             self.logger.error(f"Error in extract_one_shot: {str(e)}")
             return False, None, str(e)
 
+    async def extract_one_shot_async(self, user_context: str, model_name: Optional[str] = None):
+        """Trích xuất context một lần (async - không block event loop)"""
+        try:
+            prompt = self._build_extraction_prompt(user_context)
+            response_text, structured = await self._request_json_async(prompt, _extraction_schema(), model_name)
+            extracted_data = self._parse_json_response(response_text, structured)
+
+            if not extracted_data:
+                return False, None, "Failed to parse JSON response from Gemini"
+
+            return True, self._convert_to_parsed_context(extracted_data), None
+
+        except Exception as e:
+            self.logger.error(f"Error in extract_one_shot_async: {str(e)}")
+            return False, None, str(e)
+
+    def refine(self, facts: ParsedContextV2, user_reply: str,
+               model_name: Optional[str] = None) -> Tuple[bool, Optional[ParsedContextV2], Optional[str]]:
+        """
+        Cập nhật facts từ câu trả lời mới của user (không trích xuất lại từ đầu)
+
+        Model chỉ nhận câu trả lời + các field còn thiếu và trả JSON patch; patch được
+        validate và merge tại chỗ. Facts đã đủ field thì không gọi Gemini.
+
+        Returns:
+            Tuple: (ok, facts đã merge, error)
+        """
+        fields = self._refinement_fields(facts)
+        if not fields:
+            return True, facts, None
+
+        try:
+            prompt = self._build_refinement_prompt(facts, fields, user_reply)
+            schema = _refinement_schema(facts.goal_type, tuple(fields))
+            response_text, structured = self._request_json(prompt, schema, model_name)
+            patch = self._extract_json_object(response_text, structured)
+
+            if patch is None:
+                return False, None, "Failed to parse JSON patch from Gemini"
+
+            return True, self._merge_patch(facts, patch, fields), None
+
+        except Exception as e:
+            self.logger.error(f"Error in refine: {str(e)}")
+            return False, None, str(e)
+
+    async def refine_async(self, facts: ParsedContextV2, user_reply: str,
+                           model_name: Optional[str] = None) -> Tuple[bool, Optional[ParsedContextV2], Optional[str]]:
+        """refine() cho async callers"""
+        fields = self._refinement_fields(facts)
+        if not fields:
+            return True, facts, None
+
+        try:
+            prompt = self._build_refinement_prompt(facts, fields, user_reply)
+            schema = _refinement_schema(facts.goal_type, tuple(fields))
+            response_text, structured = await self._request_json_async(prompt, schema, model_name)
+            patch = self._extract_json_object(response_text, structured)
+
+            if patch is None:
+                return False, None, "Failed to parse JSON patch from Gemini"
+
+            return True, self._merge_patch(facts, patch, fields), None
+
+        except Exception as e:
+            self.logger.error(f"Error in refine_async: {str(e)}")
+            return False, None, str(e)
+
+    def _request_json(self, prompt: str, schema: Dict[str, Any], model_name: Optional[str]) -> Tuple[str, bool]:
+        """
+        Gọi Gemini ở structured output mode (JSON theo schema)
+
+        Lỗi ở mode này (model/SDK không hỗ trợ schema...) -> gọi thường, response
+        được parse bằng parser dễ dãi.
+
+        Returns:
+            Tuple: (response text, có phải structured output không)
+        """
+        if env.GEMINI_STRUCTURED_OUTPUT:
+            try:
+                return self.gemini_repo.generate_json(prompt, schema, model_name=model_name or "gemini-2.5-flash"), True
+            except Exception as e:
+                self.logger.warning(f"Structured output failed, falling back to plain text: {e}")
+        return self.gemini_repo.generate_code(prompt, model_name=model_name, use_cache=True), False
+
+    async def _request_json_async(self, prompt: str, schema: Dict[str, Any],
+                                  model_name: Optional[str]) -> Tuple[str, bool]:
+        """_request_json() cho async callers"""
+        if env.GEMINI_STRUCTURED_OUTPUT:
+            try:
+                response_text = await self.async_gemini_repo.generate_json(
+                    prompt, schema, model_name=model_name or "gemini-2.5-flash"
+                )
+                return response_text, True
+            except Exception as e:
+                self.logger.warning(f"Structured output failed, falling back to plain text: {e}")
+        return await self.async_gemini_repo.generate_code(prompt, model_name=model_name, use_cache=True), False
+
+    def _refinement_fields(self, facts: ParsedContextV2) -> List[str]:
+        """Các field (tên trong details) còn thiếu và có thể refine"""
+        hints = REFINEMENT_FIELD_HINTS.get(facts.goal_type, {})
+        fields = [MISSING_FIELD_ALIASES.get(name, name) for name in facts.get_missing_fields()]
+        return [name for name in dict.fromkeys(fields) if name in hints]
+
+    def _build_refinement_prompt(self, facts: ParsedContextV2, fields: List[str], user_reply: str) -> str:
+        """Build prompt refinement: mục tiêu hiện tại + câu trả lời mới + schema của các field còn thiếu"""
+        hints = REFINEMENT_FIELD_HINTS[facts.goal_type]
+        goal = facts.details.get("purpose") or facts.details.get("description") or facts.goal_type.value
+        patch_schema = ",\n".join(f'  "{name}": {hints[name]}' for name in fields)
+
+        return f"""Ban la mot Ky su Cau noi AI chuyen nghiep.
+
+MUC TIEU HIEN TAI
+{goal}
+
+CAU TRA LOI MOI CUA USER
+{user_reply}
+
+JSON PATCH (chi cac field con thieu)
+{{
+{patch_schema}
+}}
+
+QUY TAC:
+- CHI TRA VE JSON, khong giai thich
+- Chi dung cac field o tren
+- Bo qua field khong duoc nhac toi trong cau tra loi"""
+
+    def _merge_patch(self, facts: ParsedContextV2, patch: Dict[str, Any], fields: List[str]) -> ParsedContextV2:
+        """Merge patch vào facts - chỉ nhận field được yêu cầu và hợp lệ theo details model"""
+        details_model = DETAILS_MODELS[facts.goal_type]
+        details = dict(facts.details)
+
+        for name, value in patch.items():
+            if name not in fields or value in (None, "", [], {}):
+                continue
+            if name == "inputs" and isinstance(value, list):
+                value = self._normalize_inputs(value)
+            try:
+                validated = details_model(**{name: value})
+            except ValidationError as e:
+                self.logger.warning(f"Ignore invalid refinement field '{name}': {e}")
+                continue
+            details[name] = validated.model_dump(mode="json")[name]
+
+        return ParsedContextV2(goal_type=facts.goal_type, details=details)
+
     def _build_extraction_prompt(self, user_context: str) -> str:
         """Build prompt theo template"""
         template = """Ban la mot Ky su Cau noi AI chuyen nghiep.
@@ -56,45 +265,49 @@ QUY TAC:
         
         return template.format(user_context=user_context)
 
-    def _parse_json_response(self, response_text: str) -> Optional[Dict[str, Any]]:
+    def _parse_json_response(self, response_text: str, structured: bool = False) -> Optional[Dict[str, Any]]:
         """Parse JSON from response"""
-        try:
-            if not response_text:
-                self.logger.error("Response text is None or empty")
-                return None
-            
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
+        data = self._extract_json_object(response_text, structured)
+        if data is None:
+            return None
 
-            if json_start == -1 or json_end == 0:
-                self.logger.warning(f"No JSON found in response: {response_text[:200] if response_text else 'None'}")
-                return None
+        required_keys = ['function_name', 'purpose', 'inputs', 'core_logic', 'outputs']
+        if not all(key in data for key in required_keys):
+            return None
 
-            json_str = response_text[json_start:json_end]
-            data = json.loads(json_str)
+        return data
 
-            required_keys = ['function_name', 'purpose', 'inputs', 'core_logic', 'outputs']
-            if not all(key in data for key in required_keys):
-                return None
+    def _extract_json_object(self, response_text: str, structured: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Lấy JSON object trong response
 
-            return data
+        json.loads trực tiếp trước; không được thì sửa bằng loads_lenient (code fence,
+        text thừa, trailing comma...). Kết quả được đếm trong json_parse_metrics.
+        """
+        if not response_text:
+            self.logger.error("Response text is None or empty")
+            json_parse_metrics.record("failed")
+            return None
 
-        except Exception as e:
-            self.logger.error(f"Parse error: {e}")
+        try:
+            data = json.loads(response_text)
+            path = "structured" if structured else "strict"
+        except ValueError:
+            data = loads_lenient(response_text)
+            path = "repaired"
+
+        if not isinstance(data, dict):
+            self.logger.warning(f"No JSON object found in response: {response_text[:200]}")
+            json_parse_metrics.record("failed")
             return None
 
+        json_parse_metrics.record(path)
+        return data
+
     def _convert_to_parsed_context(self, extracted_data: Dict[str, Any]) -> ParsedContextV2:
         """Convert to ParsedContextV2"""
         try:
-            inputs = []
-            if extracted_data.get('inputs'):
-                for item in extracted_data['inputs']:
-                    if isinstance(item, dict):
-                        inputs.append({
-                            "name": item.get("name", ""),
-                            "type": item.get("type", "str"),
-                            "description": item.get("description", "")
-                        })
+            inputs = self._normalize_inputs(extracted_data.get('inputs') or [])
 
             core_logic = extracted_data.get('core_logic', [])
             if not isinstance(core_logic, list):
@@ -124,3 +337,15 @@ QUY TAC:
         except Exception as e:
             self.logger.error(f"Convert error: {e}")
             return None
+
+    @staticmethod
+    def _normalize_inputs(items: List[Any]) -> List[Dict[str, str]]:
+        """Chuẩn hóa danh sách inputs (điền type/description mặc định)"""
+        return [
+            {
+                "name": item.get("name", ""),
+                "type": item.get("type", "str"),
+                "description": item.get("description", "")
+            }
+            for item in items if isinstance(item, dict)
+        ]
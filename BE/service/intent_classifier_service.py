@@ -12,6 +12,13 @@ from BE.model.intent_models import (
     IntentClassifierResponse,
     ParsedContextV2
 )
+from BE.model.orchestration_models import IntentType as PromptIntentType
+from BE.service.local_intent_classifier import local_intent_classifier
+from BE.service.state_management_service import (
+    StateConflictError,
+    StateManagementService,
+    state_management_service as default_state_management_service
+)
 
 
 class IntentClassifierService:
@@ -20,12 +27,22 @@ class IntentClassifierService:
     Nhận user_message và session_id, quyết định intent và data
     """
 
-    def __init__(self):
+    # Số lần chạy lại turn khi state bị turn khác (cùng session) ghi đồng thời
+    STATE_CONFLICT_RETRIES = 1
+
+    def __init__(self, state_management_service: Optional[StateManagementService] = None,
+                 context_parsing_service=None):
         """Khởi tạo service với các dependencies"""
-        # TODO: Inject these services when they exist
-        self.context_parsing_service = None  # ContextParsingService()
-        self.context_refinement_service = None  # ContextRefinementService()
-        self.state_management_service = None  # StateManagementService()
+        self._context_parsing_service = context_parsing_service
+        self.state_management_service = state_management_service or default_state_management_service
+
+    @property
+    def context_parsing_service(self):
+        """ContextParsingService (tạo ở lần refine đầu tiên - tránh tạo Gemini repos khi không cần)"""
+        if self._context_parsing_service is None:
+            from BE.service.context_parsing_service import ContextParsingService
+            self._context_parsing_service = ContextParsingService()
+        return self._context_parsing_service
 
     def classify_intent(self, request: IntentClassifierRequest) -> IntentClassifierResponse:
         """
@@ -40,39 +57,43 @@ class IntentClassifierService:
         user_message = request.user_message.strip()
         session_id = request.session_id
 
-        # Tải facts từ StateManagementService
-        facts = self._load_facts(session_id)
+        for attempt in range(self.STATE_CONFLICT_RETRIES + 1):
+            try:
+                # Tải facts từ StateManagementService
+                state = self._load_facts(session_id)
 
-        # Luồng A: Đang hỏi dở dang (state tồn tại)
-        if facts:
-            return self._handle_ongoing_refinement(user_message, facts, session_id)
+                # Luồng A: Đang hỏi dở dang (state tồn tại)
+                if state:
+                    facts, version = state
+                    return self._handle_ongoing_refinement(user_message, facts, session_id, version)
 
-        # Luồng B: Yêu cầu mới (state không tồn tại)
-        else:
-            return self._handle_new_request(user_message, session_id)
+                # Luồng B: Yêu cầu mới (state không tồn tại)
+                else:
+                    return self._handle_new_request(user_message, session_id)
 
-    def _load_facts(self, session_id: str) -> Optional[ParsedContextV2]:
-        """
-        Tải facts từ StateManagementService
-        TODO: Implement khi StateManagementService có sẵn
-        """
-        # Placeholder - tạm thời return None
-        return None
+            except StateConflictError:
+                # Turn khác đã ghi state -> đọc lại và xử lý theo state mới
+                if attempt == self.STATE_CONFLICT_RETRIES:
+                    raise
+
+    def _load_facts(self, session_id: str) -> Optional[Tuple[ParsedContextV2, int]]:
+        """Tải (facts, version) từ StateManagementService"""
+        return self.state_management_service.load_facts(session_id)
 
     def _handle_ongoing_refinement(
         self,
         user_message: str,
         facts: ParsedContextV2,
-        session_id: str
+        session_id: str,
+        version: int
     ) -> IntentClassifierResponse:
         """
         Xử lý luồng A: Đang hỏi dở dang
         """
-        # Gọi ContextRefinementService.handle_reply()
-        # TODO: Implement khi ContextRefinementService có sẵn
+        # Merge câu trả lời vào facts đã lưu (chỉ các field còn thiếu, không trích xuất lại)
+        if not self._is_facts_complete(facts):
+            facts = self._refine_facts(facts, user_message)
 
-        # Placeholder logic
-        # Giả sử facts đã đủ
         if self._is_facts_complete(facts):
             # Trả về (INTENT_GENERATE_CODE, completed_json)
             self._delete_state(session_id)  # Xóa state
@@ -85,7 +106,7 @@ class IntentClassifierService:
         else:
             # Trả về (INTENT_REFINE_CONTEXT, next_question)
             next_question = self._get_next_question(facts)
-            self._update_state(session_id, facts)  # Cập nhật state
+            self._update_state(session_id, facts, version)  # Cập nhật state
             return IntentClassifierResponse(
                 intent=IntentType.REFINE_CONTEXT,
                 data={"next_question": next_question},
@@ -147,14 +168,13 @@ class IntentClassifierService:
     # ============ Helper Methods ============
 
     def _is_modify_code_request(self, user_message: str) -> bool:
-        """Kiểm tra nhanh xem có phải yêu cầu sửa code không"""
-        modify_keywords = [
-            "sửa", "fix", "chỉnh sửa", "thay đổi", "cập nhật",
-            "modify", "update", "change", "correct", "improve"
-        ]
+        """Kiểm tra nhanh xem có phải yêu cầu sửa code không (dùng chung rules với local classifier)"""
+        return PromptIntentType.MODIFY_EXISTING in local_intent_classifier.matched_rules(user_message)
 
-        message_lower = user_message.lower()
-        return any(keyword in message_lower for keyword in modify_keywords)
+    def _refine_facts(self, facts: ParsedContextV2, user_message: str) -> ParsedContextV2:
+        """Cập nhật facts từ câu trả lời; lỗi refine -> giữ facts cũ (hỏi lại câu tiếp theo)"""
+        ok, refined, _ = self.context_parsing_service.refine(facts, user_message)
+        return refined if ok and refined else facts
 
     def _mock_extract_context(self, user_message: str) -> Optional[ParsedContextV2]:
         """Mock extraction - TODO: Replace with real ContextParsingService"""
@@ -204,17 +224,14 @@ class IntentClassifierService:
             return self._get_next_question(context)
         return "Bạn có thể cho thêm chi tiết không?"
 
-    def _save_facts(self, session_id: str, facts: ParsedContextV2):
-        """Lưu facts vào StateManagementService"""
-        # TODO: Implement khi StateManagementService có sẵn
-        pass
+    def _save_facts(self, session_id: str, facts: ParsedContextV2, expected_version: Optional[int] = None) -> int:
+        """Lưu facts vào StateManagementService (raise StateConflictError nếu version không khớp)"""
+        return self.state_management_service.save_facts(session_id, facts, expected_version)
 
-    def _update_state(self, session_id: str, facts: ParsedContextV2):
-        """Cập nhật state"""
-        # TODO: Implement khi StateManagementService có sẵn
-        self._save_facts(session_id, facts)
+    def _update_state(self, session_id: str, facts: ParsedContextV2, version: int) -> int:
+        """Cập nhật state đã đọc ở version"""
+        return self._save_facts(session_id, facts, expected_version=version)
 
     def _delete_state(self, session_id: str):
         """Xóa state"""
-        # TODO: Implement khi StateManagementService có sẵn
-        pass
\ No newline at end of file
+        self.state_management_service.delete_state(session_id)
\ No newline at end of file
@@ -0,0 +1,220 @@
+"""
+Local Intent Classifier - Phân loại intent tại chỗ trước khi gọi Gemini
+
+Hai tầng, đều chạy trên text đã chuẩn hóa (bỏ dấu, lowercase) nên dùng chung
+cho tiếng Việt có/không dấu và tiếng Anh:
+- Rules: regex keyword đã compile cho từng intent
+- Model: Naive Bayes trên unigram + bigram, train lúc import từ TRAINING_EXAMPLES
+
+classify() chỉ trả kết quả khi chắc chắn (rule được model xác nhận, hoặc model
+đủ confidence); còn lại trả None để caller hỏi Gemini.
+"""
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from BE.model.orchestration_models import IntentClassifyResponse, IntentType
+from BE.utils.config import env
+from BE.utils.text_normalize import normalize_text
+
+
+# Rules trên text đã chuẩn hóa (không dấu)
+INTENT_RULES: Dict[IntentType, re.Pattern] = {
+    IntentType.CREATE_NEW: re.compile(
+        r"\b((?<!vua )(?<!da )tao|viet(?! lai)|xay dung|lam (mot|1) (ham|class|api|chuong trinh)"
+        r"|create|write|implement|build|generate|make a|new (function|class|script|api))\b"
+    ),
+    IntentType.MODIFY_EXISTING: re.compile(
+        r"\b(sua|chinh sua|thay doi|cap nhat|doi ten|toi uu|viet lai|bo sung|them (vao|tham so|xu ly|validation|logging)"
+        r"|fix|correct|modify|update|change|refactor|rename|rewrite|optimi[sz]e|improve|add (a )?(parameter|param|validation|logging))\b"
+    ),
+    IntentType.ANALYZE: re.compile(
+        r"\b(phan tich|giai thich|danh gia|review|do phuc tap|nhan xet|code nay lam gi"
+        r"|analy[sz]e|explain|evaluate|complexity|what does (this|the) code)\b"
+    ),
+}
+
+# Dữ liệu train cho model (ship cùng package; thêm ví dụ khi gặp prompt bị escalate nhiều)
+TRAINING_EXAMPLES: List[Tuple[str, IntentType]] = [
+    ("Tạo hàm tính tổng hai số", IntentType.CREATE_NEW),
+    ("Viết hàm kiểm tra số nguyên tố", IntentType.CREATE_NEW),
+    ("Xây dựng API đăng nhập với JWT", IntentType.CREATE_NEW),
+    ("Tạo class quản lý sinh viên", IntentType.CREATE_NEW),
+    ("Viết chương trình đọc file csv và tính trung bình", IntentType.CREATE_NEW),
+    ("Cho tôi một hàm sắp xếp danh sách", IntentType.CREATE_NEW),
+    ("Tôi cần một script crawl dữ liệu từ website", IntentType.CREATE_NEW),
+    ("Làm một hàm chuyển đổi nhiệt độ", IntentType.CREATE_NEW),
+    ("Create a function that reverses a string", IntentType.CREATE_NEW),
+    ("Write a python script to parse json files", IntentType.CREATE_NEW),
+    ("Implement binary search", IntentType.CREATE_NEW),
+    ("Build a REST API for todo items", IntentType.CREATE_NEW),
+    ("Generate a class for bank accounts", IntentType.CREATE_NEW),
+    ("I need a function to validate email addresses", IntentType.CREATE_NEW),
+    ("Sửa lỗi trong hàm vừa tạo", IntentType.MODIFY_EXISTING),
+    ("Chỉnh sửa code để xử lý số âm", IntentType.MODIFY_EXISTING),
+    ("Thêm tham số timeout vào hàm", IntentType.MODIFY_EXISTING),
+    ("Đổi tên biến cho dễ hiểu hơn", IntentType.MODIFY_EXISTING),
+    ("Tối ưu đoạn code trên", IntentType.MODIFY_EXISTING),
+    ("Viết lại hàm bằng đệ quy", IntentType.MODIFY_EXISTING),
+    ("Cập nhật code để dùng async", IntentType.MODIFY_EXISTING),
+    ("Bổ sung xử lý ngoại lệ cho hàm", IntentType.MODIFY_EXISTING),
+    ("Fix the bug in the previous code", IntentType.MODIFY_EXISTING),
+    ("Refactor this function to be more readable", IntentType.MODIFY_EXISTING),
+    ("Add error handling to the code", IntentType.MODIFY_EXISTING),
+    ("Change the return type to a list", IntentType.MODIFY_EXISTING),
+    ("Make it faster", IntentType.MODIFY_EXISTING),
+    ("Rename the variables and add type hints", IntentType.MODIFY_EXISTING),
+    ("Phân tích đoạn code vừa tạo", IntentType.ANALYZE),
+    ("Giải thích code này làm gì", IntentType.ANALYZE),
+    ("Đánh giá độ phức tạp của thuật toán", IntentType.ANALYZE),
+    ("Review code giúp tôi", IntentType.ANALYZE),
+    ("Code trên có vấn đề gì không", IntentType.ANALYZE),
+    ("Nhận xét về chất lượng code", IntentType.ANALYZE),
+    ("Hàm này chạy như thế nào", IntentType.ANALYZE),
+    ("Explain what this code does", IntentType.ANALYZE),
+    ("Analyze the time complexity", IntentType.ANALYZE),
+    ("Review the generated code", IntentType.ANALYZE),
+    ("What are the weaknesses of this implementation", IntentType.ANALYZE),
+    ("How does this function work", IntentType.ANALYZE),
+]
+
+RULE_CONFIDENCE = 0.9
+
+
+def _features(normalized: str) -> List[str]:
+    """Unigram + bigram của text đã chuẩn hóa"""
+    words = normalized.split()
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesIntentModel:
+    """Multinomial Naive Bayes (Laplace smoothing) - đủ nhỏ để train lúc import"""
+
+    def __init__(self, examples: List[Tuple[str, IntentType]]):
+        self.word_counts: Dict[IntentType, Counter] = {}
+        self.totals: Dict[IntentType, int] = {}
+        label_counts = Counter(label for _, label in examples)
+        for text, label in examples:
+            self.word_counts.setdefault(label, Counter()).update(_features(normalize_text(text)))
+        self.vocabulary = set().union(*self.word_counts.values()) if self.word_counts else set()
+        self.totals = {label: sum(counts.values()) for label, counts in self.word_counts.items()}
+        self.log_priors = {
+            label: math.log(count / len(examples)) for label, count in label_counts.items()
+        }
+
+    def predict_proba(self, normalized: str) -> Dict[IntentType, float]:
+        """Xác suất từng intent; {} nếu text không có feature nào model đã gặp"""
+        features = [feature for feature in _features(normalized) if feature in self.vocabulary]
+        if not features:
+            return {}
+
+        vocab_size = len(self.vocabulary)
+        scores = {}
+        for label, counts in self.word_counts.items():
+            denominator = self.totals[label] + vocab_size
+            scores[label] = self.log_priors[label] + sum(
+                math.log((counts[feature] + 1) / denominator) for feature in features
+            )
+
+        best = max(scores.values())
+        exp_scores = {label: math.exp(score - best) for label, score in scores.items()}
+        total = sum(exp_scores.values())
+        return {label: value / total for label, value in exp_scores.items()}
+
+
+class LocalIntentClassifier:
+    """Classifier tại chỗ: trả IntentClassifyResponse khi chắc chắn, None khi cần Gemini"""
+
+    def __init__(self, enabled: bool = True, min_confidence: float = 0.85):
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.model = NaiveBayesIntentModel(TRAINING_EXAMPLES)
+        self.local_hits = 0
+        self.escalations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _match_rules(normalized: str) -> List[IntentType]:
+        return [intent for intent, pattern in INTENT_RULES.items() if pattern.search(normalized)]
+
+    def matched_rules(self, prompt: str) -> List[IntentType]:
+        """Các intent có rule khớp với prompt"""
+        return self._match_rules(normalize_text(prompt))
+
+    def classify(self, prompt: str) -> Optional[IntentClassifyResponse]:
+        """
+        Phân loại prompt tại chỗ
+
+        Returns:
+            IntentClassifyResponse nếu chắc chắn, None nếu cần hỏi Gemini
+        """
+        if not self.enabled:
+            return None
+
+        result = self._classify(normalize_text(prompt))
+        with self._lock:
+            if result is None:
+                self.escalations += 1
+            else:
+                self.local_hits += 1
+        return result
+
+    def _classify(self, normalized: str) -> Optional[IntentClassifyResponse]:
+        if not normalized:
+            return None
+
+        rules = self._match_rules(normalized)
+        proba = self.model.predict_proba(normalized)
+        model_intent, model_confidence = max(proba.items(), key=lambda item: item[1]) if proba else (None, 0.0)
+
+        # Nhiều rule khớp (vd "tạo hàm update user"): chỉ nhận nếu model chắc chắn chọn một trong số đó
+        if len(rules) > 1:
+            if model_intent in rules and model_confidence >= self.min_confidence:
+                return IntentClassifyResponse(
+                    intent=model_intent,
+                    confidence=round(model_confidence, 4),
+                    reasoning="local: keyword rules + bag-of-words model",
+                    success=True
+                )
+            return None
+
+        # Một rule khớp: chỉ nhận khi model cũng chọn intent đó (keyword có thể nằm trong
+        # tên định danh, vd "create_user" -> "create user"); model không có ý kiến -> Gemini
+        if len(rules) == 1:
+            rule_intent = rules[0]
+            if model_intent != rule_intent:
+                return None
+            return IntentClassifyResponse(
+                intent=rule_intent,
+                confidence=round(max(RULE_CONFIDENCE, proba.get(rule_intent, 0.0)), 4),
+                reasoning="local: keyword rule",
+                success=True
+            )
+
+        if model_intent is not None and model_confidence >= self.min_confidence:
+            return IntentClassifyResponse(
+                intent=model_intent,
+                confidence=round(model_confidence, 4),
+                reasoning="local: bag-of-words model",
+                success=True
+            )
+        return None
+
+    def stats(self) -> dict:
+        """Số prompt được phân loại tại chỗ / phải gọi Gemini"""
+        total = self.local_hits + self.escalations
+        return {
+            "enabled": self.enabled,
+            "local_hits": self.local_hits,
+            "escalations": self.escalations,
+            "local_ratio": round(self.local_hits / total, 4) if total else 0.0
+        }
+
+
+# Create and export singleton instance
+local_intent_classifier = LocalIntentClassifier(
+    enabled=env.LOCAL_INTENT_ENABLED,
+    min_confidence=env.LOCAL_INTENT_MIN_CONFIDENCE
+)
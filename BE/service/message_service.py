@@ -1,17 +1,24 @@
 
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo.errors import BulkWriteError
 from BE.service.base_service import BaseService
 from BE.repository.message_repo import MessageRepository
 from BE.repository.conservation_repo import ConservationRepository
+from BE.repository.async_base_repo import AsyncBaseRepository
+from BE.repository.transactions import run_in_transaction
 from BE.entities.message_entity import Message
 
 
 class MessageService(BaseService[Message]):
     """Service cho Message với business logic"""
     
+    BATCH_MAX_SIZE = 1000
+    
     def __init__(self):
-        super().__init__(MessageRepository())
+        super().__init__(MessageRepository(), AsyncBaseRepository("messages", Message, sort_field="createdAt"))
         self.conservation_repo = ConservationRepository()
     
     def create_message(self, conversation_id: str, sender: str, text: str, message_type: str = "text") -> Message:
@@ -38,8 +45,8 @@ class MessageService(BaseService[Message]):
             raise ValueError("Sender phải là 'system' hoặc 'user'")
         
         # Kiểm tra conservation tồn tại
-        conservation = self.conservation_repo.find_by_id(conversation_id)
-        if not conservation:
+        conservation = self.conservation_repo.find_by_id(conversation_id, fields=["status"])
+        if not conservation or conservation.status == "deleting":
             raise ValueError(f"Conservation với ID '{conversation_id}' không tồn tại")
         
         # Tạo message
@@ -52,14 +59,93 @@ class MessageService(BaseService[Message]):
             updated_at=datetime.utcnow()
         )
         
-        created_message = self.repo.create(message)
+        # Insert message và update conservation message count trong cùng transaction
+        def write(session):
+            created = self.repo.create(message, session=session)
+            self.conservation_repo.increment_message_count(conversation_id, session=session)
+            return created
+        
+        return run_in_transaction(write)
+    
+    def create_messages_batch(self, conversation_id: str, items: List[Dict[str, Any]]) -> Dict:
+        """
+        Tạo nhiều messages cho một conservation (import transcript, replay agent)
+        
+        Kiểm tra conservation một lần, insert_many một lần và tăng messageCount một lần
+        theo số messages thực sự được insert. Item không hợp lệ hoặc insert lỗi
+        được báo trong "failed", không làm hỏng cả batch.
+        
+        Args:
+            conversation_id: ID của conversation
+            items: Danh sách {sender, text, type}
+            
+        Returns:
+            Dict: {items, inserted_count, failed: [{index, error}], failed_count}
+            
+        Raises:
+            ValueError: Nếu conservation không tồn tại hoặc batch rỗng/quá lớn
+        """
+        if not items:
+            raise ValueError("Batch không được rỗng")
+        if len(items) > self.BATCH_MAX_SIZE:
+            raise ValueError(f"Batch tối đa {self.BATCH_MAX_SIZE} messages")
+        
+        conservation = self.conservation_repo.find_by_id(conversation_id, fields=["status"])
+        if not conservation or conservation.status == "deleting":
+            raise ValueError(f"Conservation với ID '{conversation_id}' không tồn tại")
         
-        # Update conservation message count
-        self.conservation_repo.increment_message_count(conversation_id)
+        now = datetime.utcnow()
+        messages: List[Message] = []
+        positions: List[int] = []  # index trong items của từng message hợp lệ
+        failed: List[Dict[str, Any]] = []
+        for index, item in enumerate(items):
+            text = (item.get("text") or "").strip()
+            sender = item.get("sender")
+            if not text:
+                failed.append({"index": index, "error": "Text không được để trống"})
+                continue
+            if sender not in ["system", "user"]:
+                failed.append({"index": index, "error": "Sender phải là 'system' hoặc 'user'"})
+                continue
+            messages.append(Message(
+                conversation_id=conversation_id,
+                sender=sender,
+                text=text,
+                type=item.get("type") or "text",
+                created_at=now,
+                updated_at=now
+            ))
+            positions.append(index)
         
-        return created_message
+        def write(session):
+            written, errors = self.repo.create_many(messages, session=session)
+            if written:
+                self.conservation_repo.increment_message_count(
+                    conversation_id, amount=len(written), session=session
+                )
+            return written, errors
+        
+        try:
+            inserted, insert_failed = run_in_transaction(write)
+        except BulkWriteError:
+            # Write error làm transaction abort cả batch: ghi lại không dùng transaction
+            # để các message hợp lệ vẫn được insert và lỗi được báo theo từng message
+            inserted, insert_failed = write(None)
+        failed.extend(
+            {"index": positions[error["index"]], "error": error["error"]}
+            for error in insert_failed
+        )
+        failed.sort(key=lambda error: error["index"])
+        
+        return {
+            "items": inserted,
+            "inserted_count": len(inserted),
+            "failed": failed,
+            "failed_count": len(failed)
+        }
     
-    def get_by_conversation(self, conversation_id: str, page: int = 1, page_size: int = 50) -> Dict:
+    def get_by_conversation(self, conversation_id: str, page: int = 1, page_size: int = 50,
+                            exact_total: bool = False) -> Dict:
         """
         Lấy tất cả messages của một conversation với pagination
         
@@ -67,6 +153,7 @@ class MessageService(BaseService[Message]):
             conversation_id: ID của conversation
             page: Trang hiện tại
             page_size: Số messages mỗi trang (default 50 vì messages thường nhiều)
+            exact_total: Đếm chính xác thay vì dùng messageCount của conservation
             
         Returns:
             Dict: Pagination result
@@ -76,17 +163,54 @@ class MessageService(BaseService[Message]):
         skip = (page - 1) * page_size
         
         messages = self.repo.find_by_conversation(conversation_id, skip=skip, limit=page_size)
-        total = self.repo.count_by_conversation(conversation_id)
+        try:
+            total, total_exact = self.repo.count_total({"conversationId": ObjectId(conversation_id)}, exact=exact_total)
+        except InvalidId:
+            total, total_exact = 0, True
         
         return {
             "items": messages,
             "total": total,
+            "total_exact": total_exact,
             "page": page,
             "page_size": page_size,
             "total_pages": (total + page_size - 1) // page_size,
             "conversation_id": conversation_id
         }
     
+    def get_page_by_conversation(
+        self,
+        conversation_id: str,
+        cursor: Optional[str] = None,
+        page_size: int = 50,
+        include_total: bool = False
+    ) -> Dict:
+        """
+        Lấy messages của conversation với keyset pagination (mới nhất trước)
+        
+        Args:
+            conversation_id: ID của conversation
+            cursor: next_cursor của trang trước (None = trang đầu)
+            page_size: Số messages mỗi trang (max 200)
+            include_total: Có đếm tổng số messages không
+            
+        Returns:
+            Dict: {items, next_cursor, has_more, page_size, conversation_id[, total]}
+        """
+        page_size = max(1, min(200, page_size))
+        try:
+            filter_query = {"conversationId": ObjectId(conversation_id)}
+        except InvalidId:
+            raise ValueError(f"Conversation ID '{conversation_id}' không hợp lệ")
+        
+        messages, next_cursor = self.repo.find_page(limit=page_size, cursor=cursor, filter_query=filter_query)
+        # messageCount của conservation (được giữ đúng bởi transaction + reconcile) thay vì count_documents
+        total = self.repo.count_total(filter_query)[0] if include_total else None
+        
+        result = self._cursor_page(messages, next_cursor, page_size, total)
+        result["conversation_id"] = conversation_id
+        return result
+    
     def update_message(self, message_id: str, text: Optional[str] = None) -> Optional[Message]:
         """
         Update message text
@@ -125,25 +249,16 @@ class MessageService(BaseService[Message]):
         if not message:
             raise ValueError(f"Message với ID '{message_id}' không tồn tại")
         
-        success = self.repo.delete(message_id)
-        
-        # Update conservation message count nếu cần
-        if success and update_count:
-            # Decrement count
-            try:
-                from bson import ObjectId
-                obj_id = ObjectId(message.conversation_id)
-                self.conservation_repo.collection.update_one(
-                    {"_id": obj_id},
-                    {
-                        "$inc": {"messageCount": -1},
-                        "$set": {"updatedAt": datetime.utcnow()}
-                    }
+        # Xóa message và giảm conservation message count trong cùng transaction
+        def write(session):
+            deleted = self.repo.delete(message_id, session=session)
+            if deleted and update_count:
+                self.conservation_repo.increment_message_count(
+                    message.conversation_id, amount=-1, session=session
                 )
-            except:
-                pass  # Không fail nếu update count lỗi
+            return deleted
         
-        return success
+        return run_in_transaction(write)
     
     def close(self):
         """Đóng connections"""
@@ -0,0 +1,145 @@
+"""
+State Management Service - Lưu facts (ParsedContextV2) đang hỏi dở theo session_id
+
+IntentClassifierService dùng state để turn tiếp theo của cuộc hội thoại refinement
+không phải trích xuất lại context từ đầu.
+
+Backend:
+- memory: TTLCache in-process (default, 1 worker)
+- mongo: refinement_states collection với TTL index (dùng chung giữa các worker)
+
+Backend đều sync (mongo: pymongo blocking) -> chỉ gọi từ code chạy trong threadpool,
+không gọi trực tiếp trong endpoint async def.
+"""
+import copy
+import threading
+from typing import Any, Dict, Optional, Protocol, Tuple
+
+from BE.model.intent_models import ParsedContextV2
+from BE.utils.config import env
+from BE.utils.ttl_cache import TTLCache
+
+
+class StateConflictError(ValueError):
+    """State đã bị turn khác ghi sau lần đọc (version không khớp)"""
+
+
+class StateBackend(Protocol):
+    """Interface của nơi lưu state: (facts dict, version) theo session_id"""
+
+    def get(self, session_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        ...
+
+    def save(self, session_id: str, facts: Dict[str, Any], expected_version: Optional[int]) -> Optional[int]:
+        ...
+
+    def delete(self, session_id: str) -> bool:
+        ...
+
+
+class MemoryStateBackend:
+    """State trong TTLCache; compare-and-set dưới lock"""
+
+    def __init__(self, ttl_seconds: float = 1800, max_entries: int = 4096):
+        self.cache = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        stored = self.cache.get(session_id)
+        return copy.deepcopy(stored) if stored is not None else None
+
+    def save(self, session_id: str, facts: Dict[str, Any], expected_version: Optional[int]) -> Optional[int]:
+        with self._lock:
+            current = self.cache.get(session_id)
+            current_version = current[1] if current else None
+            if current_version != expected_version:
+                return None
+            new_version = (expected_version or 0) + 1
+            self.cache.set(session_id, (copy.deepcopy(facts), new_version))
+            return new_version
+
+    def delete(self, session_id: str) -> bool:
+        return self.cache.delete(session_id)
+
+
+class MongoStateBackend:
+    """State trong MongoDB (RefinementStateRepository tạo lazy, lần dùng đầu tiên)"""
+
+    def __init__(self, ttl_seconds: float = 1800):
+        self.ttl_seconds = ttl_seconds
+        self._repo = None
+
+    @property
+    def repo(self):
+        if self._repo is None:
+            from BE.repository.refinement_state_repo import RefinementStateRepository
+            self._repo = RefinementStateRepository()
+        return self._repo
+
+    def get(self, session_id: str) -> Optional[Tuple[Dict[str, Any], int]]:
+        return self.repo.get(session_id)
+
+    def save(self, session_id: str, facts: Dict[str, Any], expected_version: Optional[int]) -> Optional[int]:
+        return self.repo.save(session_id, facts, expected_version, self.ttl_seconds)
+
+    def delete(self, session_id: str) -> bool:
+        return self.repo.delete(session_id)
+
+
+def create_backend(name: str, ttl_seconds: float, max_entries: int) -> StateBackend:
+    """Tạo backend theo tên (REFINEMENT_STATE_BACKEND)"""
+    if name == "memory":
+        return MemoryStateBackend(ttl_seconds=ttl_seconds, max_entries=max_entries)
+    if name == "mongo":
+        return MongoStateBackend(ttl_seconds=ttl_seconds)
+    raise ValueError(f"Unknown refinement state backend: {name}")
+
+
+class StateManagementService:
+    """Đọc/ghi facts theo session_id với optimistic concurrency (version)"""
+
+    def __init__(self, backend: Optional[StateBackend] = None):
+        self.backend = backend or create_backend(
+            env.REFINEMENT_STATE_BACKEND,
+            env.REFINEMENT_STATE_TTL_SECONDS,
+            env.REFINEMENT_STATE_MAX_ENTRIES
+        )
+
+    def load_facts(self, session_id: str) -> Optional[Tuple[ParsedContextV2, int]]:
+        """
+        Lấy facts đang hỏi dở
+
+        Returns:
+            Optional[Tuple]: (facts, version), None nếu session không có state
+        """
+        stored = self.backend.get(session_id)
+        if stored is None:
+            return None
+        facts, version = stored
+        return ParsedContextV2(**facts), version
+
+    def save_facts(self, session_id: str, facts: ParsedContextV2, expected_version: Optional[int] = None) -> int:
+        """
+        Lưu facts
+
+        Args:
+            expected_version: Version từ load_facts; None khi bắt đầu state mới
+
+        Returns:
+            int: Version mới
+
+        Raises:
+            StateConflictError: Nếu state đã bị ghi sau lần đọc
+        """
+        new_version = self.backend.save(session_id, facts.model_dump(mode="json"), expected_version)
+        if new_version is None:
+            raise StateConflictError(f"Refinement state of session {session_id} was modified concurrently")
+        return new_version
+
+    def delete_state(self, session_id: str) -> bool:
+        """Xóa state (refinement đã xong)"""
+        return self.backend.delete(session_id)
+
+
+# Create and export singleton instance (memory backend phải dùng chung giữa các service)
+state_management_service = StateManagementService()
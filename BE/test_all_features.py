@@ -20,6 +20,7 @@ from BE.service.ai_service import CodeGenerationService
 from BE.service.agent_orchestration_service import AgentOrchestrationService
 from BE.entities.session_entity import Session, WorkflowStep
 from BE.model.ai_models import CodeGenerationRequest
+from BE.repository.session_unit_of_work import SessionUnitOfWork
 
 
 # --- Fake Gemini repository ---
@@ -27,7 +28,7 @@ class FakeGeminiRepo:
     def __init__(self):
         pass
 
-    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash") -> str:
+    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash", use_cache: bool = False) -> str:
         # If prompt looks like extraction prompt, return JSON expected by ContextParsingService
         if 'CONTEXT DAU VAO' in prompt or prompt.strip().startswith('Ban la mot Ky su'):
             # Minimal valid JSON for parsing
@@ -36,7 +37,8 @@ class FakeGeminiRepo:
         # Otherwise respond with a code block
         return '```python\ndef factorial(n: int) -> int:\n    """Compute factorial"""\n    if n <= 1:\n        return 1\n    result = 1\n    for i in range(2, n+1):\n        result *= i\n    return result\n```'
 
-    def review_code(self, code: str, language: str, review_type: str = "general", model_name: str = "gemini-2.5-flash") -> str:
+    def review_code(self, code: str, language: str, review_type: str = "general", model_name: str = "gemini-2.5-flash",
+                    use_cache: bool = False) -> str:
         return "Overall score: 8. Suggestions: none."
 
 
@@ -82,6 +84,24 @@ class FakeSessionRepository:
         s.updated_at = datetime.utcnow()
         return True
 
+    def find_latest_code(self, session_id: str, limit: int = 1):
+        s = self.store.get(session_id)
+        return s.code_history[-limit:] if s else []
+
+    def apply_changes(self, session_id: str, set_fields=None, push_fields=None) -> bool:
+        s = self.store.get(session_id)
+        if not s:
+            return False
+        for field, value in (set_fields or {}).items():
+            setattr(s, field, WorkflowStep(value) if field == "current_step" else value)
+        for field, items in (push_fields or {}).items():
+            getattr(s, field).extend(items)
+        s.updated_at = datetime.utcnow()
+        return True
+
+    def unit_of_work(self, session_id: str, write_through_steps: bool = False) -> SessionUnitOfWork:
+        return SessionUnitOfWork(self, session_id, write_through_steps=write_through_steps)
+
 
 # --- Tests ---
 
@@ -133,11 +153,27 @@ def test_orchestration_flow():
     resp = agent.process_context(saved.id, "Tạo hàm tính giai thừa", model="gemini-2.5-flash")
     assert resp.success, f"Orchestration failed: {resp.message} {resp.error_message}"
     assert resp.generated_code is not None
+    assert saved.current_step == WorkflowStep.COMPLETED
+    assert saved.code_history[-1]["code"] == resp.generated_code
     print("test_orchestration_flow: PASSED")
 
 
+def test_process_context_missing_session():
+    fake_gem = FakeGeminiRepo()
+    agent = AgentOrchestrationService()
+    agent.session_repo = FakeSessionRepository()
+    agent.context_parsing_service = ContextParsingService(gemini_repo=fake_gem)
+    agent.code_gen_service = CodeGenerationService(gemini_repo=fake_gem)
+
+    # Session không tồn tại -> None (controller trả 404), không báo thành công
+    resp = agent.process_context("missing", "Tạo hàm tính giai thừa", model="gemini-2.5-flash")
+    assert resp is None
+    print("test_process_context_missing_session: PASSED")
+
+
 if __name__ == "__main__":
     test_context_parsing()
     test_code_generation_service()
     test_orchestration_flow()
+    test_process_context_missing_session()
     print("ALL TESTS PASSED")
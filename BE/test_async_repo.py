@@ -0,0 +1,166 @@
+"""
+Test AsyncBaseRepository (motor) cho cùng kết quả với BaseRepository trên cùng dữ liệu
+(collection in-memory, không cần MongoDB)
+"""
+import sys
+import os
+import asyncio
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.entities.conservation_entity import Conservation
+from BE.repository.async_base_repo import AsyncBaseRepository
+from BE.repository.base_repo import BaseRepository
+from BE.repository.counting import invalidate_counts
+
+
+def _matches(document: dict, query: dict) -> bool:
+    """Matcher tối giản: equality, $lt, $and, $or"""
+    for field, condition in query.items():
+        if field in ("$and", "$or"):
+            results = [_matches(document, part) for part in condition]
+            if not (all(results) if field == "$and" else any(results)):
+                return False
+            continue
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if value is None or not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    """Cursor hỗ trợ cả iterate sync (pymongo) và async/to_list (motor)"""
+
+    def __init__(self, documents: list):
+        self.documents = documents
+
+    def sort(self, *args):
+        self.documents = sorted(self.documents, key=lambda d: (d["createdAt"], d["_id"]), reverse=True)
+        return self
+
+    def skip(self, count: int):
+        self.documents = self.documents[count:]
+        return self
+
+    def limit(self, count: int):
+        self.documents = self.documents[:count]
+        return self
+
+    def __iter__(self):
+        return iter(self.documents)
+
+    def __aiter__(self):
+        async def iterate():
+            for document in self.documents:
+                yield document
+        return iterate()
+
+    async def to_list(self, length=None):
+        return self.documents[:length]
+
+
+class FakeCollection:
+    """Collection in-memory; async_mode=True -> các method trả coroutine như motor"""
+
+    name = "async_repo_test"
+
+    def __init__(self, documents: list, async_mode: bool):
+        self.documents = documents
+        self.async_mode = async_mode
+
+    def _result(self, value):
+        if not self.async_mode:
+            return value
+
+        async def result():
+            return value
+        return result()
+
+    def find(self, query: dict, projection=None):
+        return FakeCursor([dict(d) for d in self.documents if _matches(d, query)])
+
+    def find_one(self, query: dict, projection=None):
+        found = [dict(d) for d in self.documents if _matches(d, query)]
+        return self._result(found[0] if found else None)
+
+    def count_documents(self, query: dict):
+        return self._result(len([d for d in self.documents if _matches(d, query)]))
+
+    def estimated_document_count(self):
+        return self._result(len(self.documents))
+
+
+def _repositories():
+    base = datetime(2024, 1, 1)
+    documents = [
+        {"_id": ObjectId(), "title": f"t{index % 2}", "goal": "g", "createdAt": base + timedelta(seconds=index // 2)}
+        for index in range(9)
+    ]
+    sync_repo = BaseRepository.__new__(BaseRepository)
+    async_repo = AsyncBaseRepository.__new__(AsyncBaseRepository)
+    for repo, async_mode in ((sync_repo, False), (async_repo, True)):
+        repo.collection = FakeCollection(documents, async_mode)
+        repo.entity_class = Conservation
+        repo.sort_field = "createdAt"
+    invalidate_counts(FakeCollection.name)
+    return sync_repo, async_repo, documents
+
+
+def _ids(entities: list) -> list:
+    return [entity.id for entity in entities]
+
+
+def test_reads_match_sync_repository():
+    """find_by_id / find_all / find_page / count_total: async == sync"""
+    print("=== Test 1: Async và sync cho cùng kết quả ===")
+
+    sync_repo, async_repo, documents = _repositories()
+    target = str(documents[3]["_id"])
+
+    async def run():
+        assert (await async_repo.find_by_id(target)).id == sync_repo.find_by_id(target).id
+
+        partial = await async_repo.find_by_id(target, view="summary")
+        assert partial.is_partial and set(partial.to_response()) == set(sync_repo.find_by_id(target, view="summary").to_response())
+
+        for filter_query in (None, {"title": "t1"}):
+            assert _ids(await async_repo.find_all(skip=2, limit=3, filter_query=filter_query)) == \
+                _ids(sync_repo.find_all(skip=2, limit=3, filter_query=filter_query))
+            assert await async_repo.count_total(filter_query, exact=True) == sync_repo.count_total(filter_query, exact=True)
+
+        async_cursor = sync_cursor = None
+        while True:
+            async_page, async_cursor = await async_repo.find_page(limit=4, cursor=async_cursor)
+            sync_page, sync_cursor = sync_repo.find_page(limit=4, cursor=sync_cursor)
+            assert _ids(async_page) == _ids(sync_page) and async_cursor == sync_cursor
+            if async_cursor is None:
+                break
+
+    asyncio.run(run())
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 ASYNC REPOSITORY - TESTS\n")
+
+    try:
+        test_reads_match_sync_repository()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Test ConservationService: tạo delete job đồng thời (unique index), ẩn
+conservation đang xóa khỏi các API đọc và cửa sổ messages của get_with_messages,
+với collection in-memory
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+from BE.entities.conservation_entity import Conservation
+from BE.service.conservation_service import ConservationService
+from BE.repository.conservation_repo import ConservationRepository
+from BE.repository.delete_job_repo import ACTIVE_STATUSES, DeleteJobRepository
+from BE.repository.counting import invalidate_counts
+
+
+def _matches(document: dict, query: dict) -> bool:
+    """Matcher tối giản: equality, $ne, $in, $lt, $and, $or"""
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(_matches(document, part) for part in condition):
+                return False
+            continue
+        if field == "$or":
+            if not any(_matches(document, part) for part in condition):
+                return False
+            continue
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lt" in condition and not (value is not None and value < condition["$lt"]):
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor(list):
+    def sort(self, *args, **kwargs):
+        return FakeCursor(sorted(self, key=lambda document: (document["createdAt"], document["_id"]), reverse=True))
+
+    def skip(self, count):
+        return FakeCursor(self[count:])
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+
+class FakeCollection:
+    """Collection in-memory (find/count/aggregate $match)"""
+
+    def __init__(self, name: str, unique_active_job: bool = False):
+        self.name = name
+        self.documents = []
+        self.unique_active_job = unique_active_job
+        self.joined = []  # Documents của collection được $lookup
+        self.pipelines = []
+        self.exact_counts = 0
+
+    def insert_one(self, document: dict):
+        if self.unique_active_job and document["status"] in ACTIVE_STATUSES and any(
+            existing["conservationId"] == document["conservationId"] and existing["status"] in ACTIVE_STATUSES
+            for existing in self.documents
+        ):
+            # Giống unique partial index conservationId_active_unique
+            raise DuplicateKeyError("E11000 duplicate key error")
+        document = {**document, "_id": ObjectId()}
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def find(self, query: dict, projection=None):
+        return FakeCursor(dict(document) for document in self.documents if _matches(document, query))
+
+    def find_one(self, query: dict, projection=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def update_one(self, query: dict, update: dict):
+        found = [document for document in self.documents if _matches(document, query)][:1]
+        for document in found:
+            document.update(update.get("$set", {}))
+        return SimpleNamespace(matched_count=len(found), modified_count=len(found))
+
+    def count_documents(self, query: dict) -> int:
+        self.exact_counts += 1
+        return len(self.find(query))
+
+    def estimated_document_count(self) -> int:
+        return len(self.documents)
+
+    def aggregate(self, pipeline: list):
+        """$match đầu tiên + $lookup (pipeline con: $match/$sort/$limit) trên self.joined"""
+        self.pipelines.append(pipeline)
+        results = []
+        for document in self.find(pipeline[0]["$match"]):
+            for stage in pipeline[1:]:
+                lookup = stage.get("$lookup")
+                if lookup is None:
+                    continue
+                joined = FakeCursor(m for m in self.joined if m[lookup["foreignField"]] == document[lookup["localField"]])
+                for sub_stage in lookup["pipeline"]:
+                    if "$match" in sub_stage:
+                        joined = FakeCursor(m for m in joined if _matches(m, sub_stage["$match"]))
+                    elif "$sort" in sub_stage:
+                        joined = joined.sort()
+                    elif "$limit" in sub_stage:
+                        joined = joined.limit(sub_stage["$limit"])
+                document[lookup["as"]] = list(joined)
+            results.append(document)
+        return iter(results)
+
+
+def _service() -> ConservationService:
+    service = ConservationService.__new__(ConservationService)
+    service.repo = ConservationRepository.__new__(ConservationRepository)
+    service.repo.collection = FakeCollection("conservations")
+    service.repo.entity_class = Conservation
+    service.repo.sort_field = "createdAt"
+    service.delete_job_repo = DeleteJobRepository.__new__(DeleteJobRepository)
+    service.delete_job_repo.collection = FakeCollection("delete_jobs", unique_active_job=True)
+    invalidate_counts("conservations")
+    return service
+
+
+def _add_conservation(service: ConservationService, title: str, status: str = "active", minutes_ago: int = 0) -> str:
+    created_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    result = service.repo.collection.insert_one({
+        "title": title, "goal": "goal", "facts": [], "messageCount": 3, "status": status,
+        "createdAt": created_at, "updatedAt": created_at
+    })
+    return str(result.inserted_id)
+
+
+def test_concurrent_start_returns_existing_job():
+    """Hai lần start_cascade_delete -> cùng một job (DuplicateKeyError được xử lý)"""
+    print("=== Test 1: Start cascade delete đồng thời ===")
+
+    service = _service()
+    conservation_id = _add_conservation(service, "A")
+
+    first = service.start_cascade_delete(conservation_id)
+    second = service.start_cascade_delete(conservation_id)
+
+    assert first.id == second.id
+    assert len(service.delete_job_repo.collection.documents) == 1
+    assert first.total_messages == 3
+    assert service.repo.collection.documents[0]["status"] == "deleting"
+    print("✅ PASSED\n")
+
+
+def test_deleting_conservation_is_hidden():
+    """Conservation "deleting" không xuất hiện ở get/list/page/with-messages"""
+    print("=== Test 2: Ẩn conservation đang xóa ===")
+
+    service = _service()
+    visible_id = _add_conservation(service, "visible", minutes_ago=1)
+    deleting_id = _add_conservation(service, "deleting", status="deleting")
+
+    assert service.get_by_id(visible_id).title == "visible"
+    assert service.get_by_id(deleting_id) is None
+    assert service.get_by_id("not-an-id") is None
+
+    listed = service.get_all(1, 10)
+    assert [item.id for item in listed["items"]] == [visible_id]
+    # Total ước lượng (estimated_document_count) vẫn tính conservation đang xóa, không scan
+    assert (listed["total"], listed["total_exact"]) == (2, False)
+    assert service.repo.collection.exact_counts == 0
+    assert service.get_all(1, 10, exact_total=True)["total"] == 1
+
+    page = service.get_page(None, 10, include_total=True)
+    assert [item.id for item in page["items"]] == [visible_id]
+    assert page["total"] == 1
+
+    recent = service.get_recent(1, 10)
+    assert [item.id for item in recent["items"]] == [visible_id]
+    assert recent["total_exact"] is False
+    assert service.get_recent(1, 10, exact_total=True)["total"] == 1
+
+    assert service.get_with_messages(visible_id) is not None
+    assert service.get_with_messages(deleting_id) is None
+
+    # Thêm fact vào conservation đang xóa -> không tồn tại
+    try:
+        service.add_fact(deleting_id, "fact")
+        raise AssertionError("ValueError expected")
+    except ValueError:
+        pass
+    print("✅ PASSED\n")
+
+
+def test_with_messages_window():
+    """get_with_messages: cửa sổ limit messages mới nhất, cursor lấy tiếp messages cũ hơn"""
+    print("=== Test 3: Cửa sổ messages ($lookup) ===")
+
+    service = _service()
+    conservation_id = _add_conservation(service, "chat")
+    other_id = _add_conservation(service, "other")
+    base = datetime(2024, 1, 1)
+    for index in range(7):
+        service.repo.collection.joined.append({
+            "_id": ObjectId(), "conversationId": ObjectId(conservation_id), "sender": "user",
+            "text": f"m{index}", "createdAt": base + timedelta(seconds=index)
+        })
+    service.repo.collection.joined.append({
+        "_id": ObjectId(), "conversationId": ObjectId(other_id), "sender": "user",
+        "text": "other", "createdAt": base
+    })
+
+    pages, cursor = [], None
+    while True:
+        result = service.get_with_messages(conservation_id, limit=3, cursor=cursor)
+        pages.append([message.text for message in result["messages"]])
+        assert result["has_more"] == (result["next_cursor"] is not None)
+        assert result["total_messages"] == 3  # messageCount của conservation, không phải cửa sổ
+        cursor = result["next_cursor"]
+        if cursor is None:
+            break
+
+    # Mỗi cửa sổ theo thứ tự thời gian, cửa sổ đầu là các messages mới nhất
+    assert pages == [["m4", "m5", "m6"], ["m1", "m2", "m3"], ["m0"]]
+    # Sub-pipeline chỉ lấy limit + 1 messages
+    lookup = service.repo.collection.pipelines[0][-1]["$lookup"]
+    assert {"$limit": 4} in lookup["pipeline"]
+    assert (lookup["localField"], lookup["foreignField"]) == ("_id", "conversationId")
+
+    try:
+        service.get_with_messages(conservation_id, cursor="not-a-cursor")
+        raise AssertionError("ValueError expected")
+    except ValueError:
+        pass
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 CONSERVATION SERVICE - TESTS\n")
+
+    try:
+        test_concurrent_start_returns_existing_job()
+        test_deleting_conservation_is_hidden()
+        test_with_messages_window()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Test count strategy của BaseRepository.count_total: estimated count khi không
+filter, cache theo filter, invalidate khi collection có insert/delete
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.entities.conservation_entity import Conservation
+from BE.repository.base_repo import BaseRepository
+from BE.repository.counting import count_cache_key, invalidate_counts
+
+
+class CountingCollection:
+    """Đếm số lần gọi count_documents / estimated_document_count"""
+
+    name = "count_cache_test"
+
+    def __init__(self, documents: list):
+        self.documents = documents
+        self.exact_counts = 0
+        self.estimated_counts = 0
+
+    def count_documents(self, query: dict) -> int:
+        self.exact_counts += 1
+        return len([d for d in self.documents if all(d.get(k) == v for k, v in query.items())])
+
+    def estimated_document_count(self) -> int:
+        self.estimated_counts += 1
+        return len(self.documents)
+
+    def insert_one(self, document: dict, session=None):
+        document = {**document, "_id": ObjectId()}
+        self.documents.append(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    def delete_one(self, query: dict, session=None):
+        before = len(self.documents)
+        self.documents = [d for d in self.documents if d["_id"] != query["_id"]]
+        return SimpleNamespace(deleted_count=before - len(self.documents))
+
+
+def _repository() -> BaseRepository:
+    repo = BaseRepository.__new__(BaseRepository)
+    repo.collection = CountingCollection([{"_id": ObjectId(), "title": "a"} for _ in range(3)])
+    repo.entity_class = Conservation
+    invalidate_counts(CountingCollection.name)
+    return repo
+
+
+def test_count_strategy():
+    """Không filter -> estimated; có filter -> count_documents một lần rồi cache"""
+    print("=== Test 1: Count strategy ===")
+
+    repo = _repository()
+    assert repo.count_total() == (3, False)
+    assert repo.collection.estimated_counts == 1 and repo.collection.exact_counts == 0
+
+    assert repo.count_total({"title": "a"}) == (3, True)
+    assert repo.count_total({"title": "a"}) == (3, False)  # Từ cache
+    assert repo.collection.exact_counts == 1
+
+    assert repo.count_total({"title": "a"}, exact=True) == (3, True)
+    assert repo.count_total(exact=True) == (3, True)
+    assert repo.collection.exact_counts == 3
+    print("✅ PASSED\n")
+
+
+def test_invalidate_on_write():
+    """create/delete qua repository xóa count đã cache"""
+    print("=== Test 2: Invalidate khi ghi ===")
+
+    repo = _repository()
+    assert repo.count_total({"title": "a"}) == (3, True)
+
+    created = repo.create(Conservation(title="a", goal="g"))
+    assert repo.count_total({"title": "a"}) == (4, True)
+
+    assert repo.delete(created.id)
+    assert repo.count_total({"title": "a"}) == (3, True)
+    assert repo.collection.exact_counts == 3
+    print("✅ PASSED\n")
+
+
+def test_cache_key():
+    """Key không phụ thuộc thứ tự field, hỗ trợ ObjectId"""
+    print("=== Test 3: Count cache key ===")
+
+    object_id = ObjectId()
+    assert count_cache_key({"a": 1, "b": object_id}) == count_cache_key({"b": object_id, "a": 1})
+    assert count_cache_key({"a": 1}) != count_cache_key({"a": 2})
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 COUNT CACHE - TESTS\n")
+
+    try:
+        test_count_strategy()
+        test_invalidate_on_write()
+        test_cache_key()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
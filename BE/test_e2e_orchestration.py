@@ -20,6 +20,7 @@ from BE.service.context_parsing_service import ContextParsingService
 from BE.service.ai_service import CodeGenerationService
 from BE.entities.session_entity import Session, WorkflowStep
 from BE.model.orchestration_models import SessionCreateRequest
+from BE.repository.session_unit_of_work import SessionUnitOfWork
 
 
 # ====================== MOCK CLASSES ======================
@@ -30,7 +31,7 @@ class MockGeminiRepository:
     def __init__(self):
         self.call_history = []
     
-    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash") -> str:
+    def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash", use_cache: bool = False) -> str:
         print(f"\n[MockGemini] Received prompt (first 100 chars):")
         print(f"  {prompt[:100]}...")
         print(f"[MockGemini] Model: {model_name}")
@@ -154,6 +155,22 @@ class MockSessionRepository:
         self.store[session_id] = s
         print(f"[MockSessionRepo] Updated step to: {new_step.value}")
         return True
+    
+    def apply_changes(self, session_id: str, set_fields=None, push_fields=None) -> bool:
+        s = self.store.get(session_id)
+        if not s:
+            print(f"[MockSessionRepo] Apply changes FAILED: session {session_id} not found")
+            return False
+        for field, value in (set_fields or {}).items():
+            setattr(s, field, WorkflowStep(value) if field == "current_step" else value)
+        for field, items in (push_fields or {}).items():
+            getattr(s, field).extend(items)
+        s.updated_at = datetime.utcnow()
+        print(f"[MockSessionRepo] Applied changes: {sorted(set_fields or {})} + {sorted(push_fields or {})}")
+        return True
+    
+    def unit_of_work(self, session_id: str, write_through_steps: bool = False) -> SessionUnitOfWork:
+        return SessionUnitOfWork(self, session_id, write_through_steps=write_through_steps)
 
 
 class MockContextRepository:
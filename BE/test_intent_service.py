@@ -72,6 +72,39 @@ def test_new_request_chitchat():
     print("✅ PASSED\n")
 
 
+def test_ongoing_refinement_uses_saved_state():
+    """Test luồng A: state đã lưu -> không trích xuất lại, xóa state khi facts đủ"""
+    print("=== Test 4: Ongoing Refinement -> Saved State ===")
+
+    service = IntentClassifierService()
+    facts = service._mock_extract_context("Tạo hàm tính tổng hai số")
+    service._save_facts("session_4", facts)
+
+    request = IntentClassifierRequest(
+        user_message="Hàm nhận hai số nguyên",
+        session_id="session_4"
+    )
+    result = service.classify_intent(request)
+
+    print(f"Intent: {result.intent}")
+
+    assert result.intent == IntentType.GENERATE_CODE
+    assert result.completed_json.details["function_name"] == "example_function"
+    assert service._load_facts("session_4") is None
+    print("✅ PASSED\n")
+
+
+def test_classify_endpoint_runs_in_threadpool():
+    """State backend mongo là blocking -> endpoint /intent/classify phải là def (threadpool)"""
+    print("=== Test 5: Endpoint sync ===")
+
+    import asyncio
+    from BE.controller.intent_controller import classify_intent
+
+    assert not asyncio.iscoroutinefunction(classify_intent)
+    print("✅ PASSED\n")
+
+
 def main():
     """Run all tests"""
     print("🚀 INTENT CLASSIFIER SERVICE - TESTS\n")
@@ -80,6 +113,8 @@ def main():
         test_new_request_generate_code()
         test_new_request_modify_code()
         test_new_request_chitchat()
+        test_ongoing_refinement_uses_saved_state()
+        test_classify_endpoint_runs_in_threadpool()
 
         print("🎉 ALL TESTS PASSED!")
 
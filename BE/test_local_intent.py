@@ -0,0 +1,82 @@
+"""
+Test LocalIntentClassifier (fast path trước khi gọi Gemini)
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.model.orchestration_models import IntentType
+from BE.service.local_intent_classifier import LocalIntentClassifier
+
+
+def test_obvious_prompts_classified_locally():
+    """Prompt rõ ràng (tiếng Việt có/không dấu, tiếng Anh) không cần Gemini"""
+    print("=== Test 1: Obvious prompts ===")
+
+    classifier = LocalIntentClassifier()
+    cases = [
+        ("Tạo hàm tính giai thừa", IntentType.CREATE_NEW),
+        ("viet ham fibonacci", IntentType.CREATE_NEW),
+        ("Sửa lỗi trong hàm vừa tạo", IntentType.MODIFY_EXISTING),
+        ("Refactor this function", IntentType.MODIFY_EXISTING),
+        ("Phân tích đoạn code vừa tạo", IntentType.ANALYZE),
+        ("Explain this code", IntentType.ANALYZE),
+    ]
+    for prompt, expected in cases:
+        result = classifier.classify(prompt)
+        assert result is not None, prompt
+        assert result.intent == expected, prompt
+        assert result.confidence >= classifier.min_confidence, prompt
+
+    print("✅ PASSED\n")
+
+
+def test_ambiguous_prompts_escalated():
+    """Prompt mơ hồ hoặc nhiều intent -> None (caller gọi Gemini)"""
+    print("=== Test 2: Ambiguous prompts ===")
+
+    classifier = LocalIntentClassifier()
+    prompts = [
+        "Chào bạn", "Tạo hàm rồi giải thích nó", "what is the weather", "",
+        # Rule CREATE_NEW khớp "create" trong tên hàm, model không đồng ý
+        "What is wrong with my create_user function?",
+    ]
+    for prompt in prompts:
+        assert classifier.classify(prompt) is None, prompt
+
+    stats = classifier.stats()
+    assert stats["local_hits"] == 0
+    assert stats["escalations"] == len(prompts)
+    print("✅ PASSED\n")
+
+
+def test_disabled():
+    """Tắt classifier -> luôn escalate"""
+    print("=== Test 3: Disabled ===")
+
+    classifier = LocalIntentClassifier(enabled=False)
+    assert classifier.classify("Tạo hàm tính tổng") is None
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 LOCAL INTENT CLASSIFIER - TESTS\n")
+
+    try:
+        test_obvious_prompts_classified_locally()
+        test_ambiguous_prompts_escalated()
+        test_disabled()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
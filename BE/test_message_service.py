@@ -0,0 +1,286 @@
+"""
+Test MessageService.create_messages_batch (transaction + fallback), status code
+của batch endpoint và ConservationRepository.reconcile_message_counts với collection in-memory
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import BE.service.message_service as message_service_module
+from BE.service.message_service import MessageService
+from BE.repository.message_repo import MessageRepository
+from BE.repository.conservation_repo import ConservationRepository
+
+TRANSACTION = object()
+
+
+class FakeMessageCollection:
+    """insert_many giống MongoDB: text "boom" vi phạm validation"""
+
+    name = "messages"
+
+    def __init__(self):
+        self.documents = []
+        self.sessions = []
+
+    def insert_many(self, documents, ordered=False, session=None):
+        self.sessions.append(session)
+        errors = [
+            {"index": index, "errmsg": "Document failed validation"}
+            for index, document in enumerate(documents) if document["text"] == "boom"
+        ]
+        if errors and session is not None:
+            # Transaction abort: không document nào được ghi
+            raise BulkWriteError({"writeErrors": errors})
+        failed = {error["index"] for error in errors}
+        self.documents.extend(document for index, document in enumerate(documents) if index not in failed)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+class FakeConservationRepository:
+    """Ghi lại các lần tăng messageCount"""
+
+    def __init__(self, status: str = "active"):
+        self.status = status
+        self.increments = []
+
+    def find_by_id(self, conservation_id: str, fields=None):
+        return SimpleNamespace(status=self.status)
+
+    def increment_message_count(self, conservation_id: str, amount: int = 1, session=None) -> bool:
+        self.increments.append((amount, session))
+        return True
+
+
+def _service() -> MessageService:
+    service = MessageService.__new__(MessageService)
+    service.repo = MessageRepository.__new__(MessageRepository)
+    service.repo.collection = FakeMessageCollection()
+    service.conservation_repo = FakeConservationRepository()
+    return service
+
+
+def _run_in_fake_transaction(callback):
+    return callback(TRANSACTION)
+
+
+def _create_batch(service: MessageService, items: list) -> dict:
+    """create_messages_batch với run_in_transaction giả (luôn có transaction)"""
+    original = message_service_module.run_in_transaction
+    message_service_module.run_in_transaction = _run_in_fake_transaction
+    try:
+        return service.create_messages_batch(str(ObjectId()), items)
+    finally:
+        message_service_module.run_in_transaction = original
+
+
+def test_batch_in_transaction():
+    """Batch hợp lệ: insert_many + một lần $inc trong cùng transaction"""
+    print("=== Test 1: Batch trong transaction ===")
+
+    service = _service()
+
+    result = _create_batch(service, [
+        {"sender": "user", "text": "Xin chào"},
+        {"sender": "robot", "text": "sai sender"},
+        {"sender": "system", "text": "  Chào bạn  "},
+        {"sender": "user", "text": "   "},
+    ])
+
+    assert result["inserted_count"] == 2
+    assert [message.text for message in result["items"]] == ["Xin chào", "Chào bạn"]
+    assert [error["index"] for error in result["failed"]] == [1, 3]
+    assert service.repo.collection.sessions == [TRANSACTION]
+    assert service.conservation_repo.increments == [(2, TRANSACTION)]
+    print("✅ PASSED\n")
+
+
+def test_batch_falls_back_without_transaction():
+    """Write error làm transaction abort -> ghi lại không transaction, lỗi theo từng message"""
+    print("=== Test 2: Fallback khi transaction abort ===")
+
+    service = _service()
+
+    result = _create_batch(service, [
+        {"sender": "user", "text": ""},
+        {"sender": "user", "text": "một"},
+        {"sender": "user", "text": "boom"},
+        {"sender": "system", "text": "hai"},
+    ])
+
+    assert service.repo.collection.sessions == [TRANSACTION, None]
+    assert [document["text"] for document in service.repo.collection.documents] == ["một", "hai"]
+    assert result["inserted_count"] == 2
+    # Index của lỗi insert được đổi về vị trí trong items ban đầu
+    assert [error["index"] for error in result["failed"]] == [0, 2]
+    # messageCount chỉ tăng theo số message thực sự được insert, không có $inc của transaction đã abort
+    assert service.conservation_repo.increments == [(2, None)]
+    print("✅ PASSED\n")
+
+
+def test_batch_rejects_deleting_conservation():
+    """Conservation đang xóa -> ValueError, không insert gì"""
+    print("=== Test 3: Conservation đang xóa ===")
+
+    service = _service()
+    service.conservation_repo = FakeConservationRepository(status="deleting")
+
+    try:
+        service.create_messages_batch(str(ObjectId()), [{"sender": "user", "text": "hi"}])
+        raise AssertionError("ValueError expected")
+    except ValueError:
+        pass
+    assert service.repo.collection.sessions == []
+    print("✅ PASSED\n")
+
+
+class FakeConservationCollection:
+    """bulk_write áp dụng UpdateOne có điều kiện; on_bulk_write mô phỏng write đồng thời"""
+
+    def __init__(self, documents, on_bulk_write=None):
+        self.documents = {document["_id"]: document for document in documents}
+        self.on_bulk_write = on_bulk_write
+
+    def find(self, query, projection=None):
+        documents = sorted(self.documents.values(), key=lambda document: str(document["_id"]))
+        lower = query.get("_id", {}).get("$gt")
+        if lower is not None:
+            documents = [document for document in documents if str(document["_id"]) > str(lower)]
+        return FakeCursor([dict(document) for document in documents])
+
+    def bulk_write(self, operations, ordered=False):
+        if self.on_bulk_write:
+            self.on_bulk_write(self.documents)
+        matched = 0
+        for operation in operations:
+            document = self.documents.get(operation._filter["_id"])
+            if document is None or document.get("messageCount") != operation._filter["messageCount"]:
+                continue
+            document.update(operation._doc["$set"])
+            matched += 1
+        return SimpleNamespace(matched_count=matched, modified_count=matched)
+
+
+class FakeCursor(list):
+    def sort(self, *args):
+        return self
+
+    def limit(self, count):
+        return FakeCursor(self[:count])
+
+
+def test_reconcile_skips_concurrently_changed_counts():
+    """reconcile không ghi đè messageCount đã được $inc sau lần đọc"""
+    print("=== Test 4: Reconcile có điều kiện ===")
+
+    stale, concurrent, correct = ObjectId(), ObjectId(), ObjectId()
+    counts = {stale: 3, concurrent: 5, correct: 1}
+
+    def message_inserted(documents):
+        # Message mới của `concurrent` được insert (và $inc) trong lúc reconcile
+        documents[concurrent]["messageCount"] += 1
+
+    repo = ConservationRepository.__new__(ConservationRepository)
+    repo.collection = FakeConservationCollection([
+        {"_id": stale, "messageCount": 7},
+        {"_id": concurrent, "messageCount": 4},
+        {"_id": correct, "messageCount": 1},
+    ], on_bulk_write=message_inserted)
+    repo.db = {"messages": SimpleNamespace(
+        aggregate=lambda pipeline: [{"_id": _id, "count": count} for _id, count in counts.items()]
+    )}
+
+    result = repo.reconcile_message_counts()
+
+    assert result == {"checked": 3, "fixed": 1, "skipped": 1}
+    assert repo.collection.documents[stale]["messageCount"] == 3
+    # Giá trị sau $inc được giữ lại, lần reconcile sau sẽ kiểm tra lại
+    assert repo.collection.documents[concurrent]["messageCount"] == 5
+    print("✅ PASSED\n")
+
+
+class StubBatchService:
+    """create_messages_batch trả kết quả cố định (hoặc raise error)"""
+
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def create_messages_batch(self, conversation_id: str, items: list) -> dict:
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def test_batch_endpoint_status():
+    """POST messages:batch: 201 khi tất cả thành công, 207 khi có message lỗi, 400 khi ValueError"""
+    print("=== Test 5: Status code của batch endpoint ===")
+
+    from fastapi import HTTPException, Response
+    from pydantic import ValidationError
+    from BE.controller import conservation_controller
+    from BE.controller.conservation_controller import MessageBatchRequest, add_messages_batch_to_conservation
+    from BE.entities.message_entity import Message
+
+    request = MessageBatchRequest(messages=[{"sender": "user", "text": "a"}, {"sender": "robot", "text": "b"}])
+    message = Message(conversation_id=str(ObjectId()), sender="user", text="a", id=str(ObjectId()))
+    failed = [{"index": 1, "error": "Sender không hợp lệ"}]
+
+    def call(stub):
+        conservation_controller.message_service.override(stub)
+        response = Response(status_code=201)  # status_code mặc định của route
+        body = add_messages_batch_to_conservation(str(ObjectId()), request, response)
+        return response.status_code, body
+
+    try:
+        status_code, body = call(StubBatchService({"items": [message], "inserted_count": 1, "failed": [], "failed_count": 0}))
+        assert status_code == 201 and body["inserted_count"] == 1
+
+        status_code, body = call(StubBatchService({"items": [message], "inserted_count": 1, "failed": failed, "failed_count": 1}))
+        assert status_code == 207 and body["failed"] == failed
+
+        try:
+            call(StubBatchService(error=ValueError("Conservation không tồn tại")))
+            raise AssertionError("HTTPException expected")
+        except HTTPException as e:
+            assert e.status_code == 400
+    finally:
+        conservation_controller.message_service.reset()
+
+    # Batch rỗng bị từ chối bởi validation (422)
+    try:
+        MessageBatchRequest(messages=[])
+        raise AssertionError("ValidationError expected")
+    except ValidationError:
+        pass
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 MESSAGE BATCH + RECONCILE - TESTS\n")
+
+    try:
+        test_batch_in_transaction()
+        test_batch_falls_back_without_transaction()
+        test_batch_rejects_deleting_conservation()
+        test_reconcile_skips_concurrently_changed_counts()
+        test_batch_endpoint_status()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Test ModelRegistry: memoize GenerativeModel theo (name, config, safety), LRU eviction
+(không cần GEMINI_API_KEY - GenerativeModel được thay bằng class giả)
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.utils import gemini_client
+from BE.utils.gemini_client import ModelRegistry
+
+
+class FakeGenerativeModel:
+    """Ghi lại các model được tạo"""
+
+    created = []
+
+    def __init__(self, model_name, generation_config=None, safety_settings=None):
+        self.model_name = model_name
+        self.generation_config = generation_config
+        FakeGenerativeModel.created.append(model_name)
+
+
+def _registry(max_size: int) -> ModelRegistry:
+    FakeGenerativeModel.created = []
+    gemini_client._genai = lambda: SimpleNamespace(GenerativeModel=FakeGenerativeModel)
+    return ModelRegistry(max_size=max_size)
+
+
+def test_memoized_by_config():
+    """Cùng name + config (khác thứ tự key) -> cùng object; config khác -> model mới"""
+    print("=== Test 1: Memoize theo config ===")
+
+    original = gemini_client._genai
+    try:
+        registry = _registry(max_size=4)
+        first = registry.get("flash", {"temperature": 0.2, "top_p": 0.9})
+        assert registry.get("flash", {"top_p": 0.9, "temperature": 0.2}) is first
+        assert registry.get("flash", {"temperature": 0.7}) is not first
+        assert registry.get("flash") is not first
+        assert FakeGenerativeModel.created == ["flash", "flash", "flash"]
+        assert registry.stats() == {"size": 3, "max_size": 4, "hits": 1, "misses": 3, "evictions": 0}
+    finally:
+        gemini_client._genai = original
+    print("✅ PASSED\n")
+
+
+def test_lru_eviction():
+    """Vượt max_size -> bỏ model ít được dùng gần đây nhất"""
+    print("=== Test 2: LRU eviction ===")
+
+    original = gemini_client._genai
+    try:
+        registry = _registry(max_size=2)
+        a = registry.get("a")
+        registry.get("b")
+        assert registry.get("a") is a  # a được dùng gần đây hơn b
+        registry.get("c")              # -> b bị evict
+
+        assert registry.stats()["evictions"] == 1
+        assert registry.get("a") is a
+        registry.get("b")              # Tạo lại b, c bị evict
+        assert FakeGenerativeModel.created == ["a", "b", "c", "b"]
+        assert registry.stats()["size"] == 2
+    finally:
+        gemini_client._genai = original
+    print("✅ PASSED\n")
+
+
+def test_invalidate():
+    """invalidate(name) chỉ bỏ model của name; invalidate() bỏ tất cả"""
+    print("=== Test 3: Invalidate ===")
+
+    original = gemini_client._genai
+    try:
+        registry = _registry(max_size=8)
+        flash = registry.get("flash")
+        registry.get("flash", {"temperature": 0.5})
+        pro = registry.get("pro")
+
+        registry.invalidate("flash")
+        assert registry.stats()["size"] == 1
+        assert registry.get("pro") is pro
+        assert registry.get("flash") is not flash
+
+        registry.invalidate()
+        assert registry.stats()["size"] == 0
+    finally:
+        gemini_client._genai = original
+    print("✅ PASSED\n")
+
+
+def test_single_registry():
+    """Repositories và cache stats dùng cùng module gemini_client (một registry, một lần configure)"""
+    print("=== Test 4: Một registry dùng chung ===")
+
+    import asyncio
+    from BE.repository.gemini_repo import GeminiRepository
+    from BE.repository.async_gemini_repo import AsyncGeminiRepository
+    from BE.controller.agent_controller import cache_stats
+
+    assert GeminiRepository().gemini_client is gemini_client.gemini_ai
+    assert AsyncGeminiRepository().gemini_client is gemini_client.gemini_ai
+    assert asyncio.run(cache_stats())["model_registry"] == gemini_client.gemini_ai.registry.stats()
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 MODEL REGISTRY - TESTS\n")
+
+    try:
+        test_memoized_by_config()
+        test_lru_eviction()
+        test_invalidate()
+        test_single_registry()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Test keyset pagination: cursor encode/decode, keyset_filter + build_page đi
+hết các trang (trùng timestamp, document không có timestamp) không bỏ sót/lặp
+"""
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.repository.pagination import build_page, decode_cursor, encode_cursor, keyset_filter, merge_filters
+
+
+def _matches(document: dict, query: dict) -> bool:
+    """Đánh giá filter của keyset_filter ($or, $lt, equality kể cả None)"""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(_matches(document, part) for part in condition):
+                return False
+            continue
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if value is None or not value < condition["$lt"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _sorted_desc(documents: list) -> list:
+    """Sort như MongoDB (createdAt DESC, _id DESC): null đứng cuối"""
+    return sorted(documents, key=lambda d: (d["createdAt"] is not None, d["createdAt"] or datetime.min, d["_id"]), reverse=True)
+
+
+def _walk(documents: list, limit: int) -> list:
+    """Lấy hết các trang như BaseRepository.find_page"""
+    pages, cursor = [], None
+    while True:
+        query = keyset_filter("createdAt", cursor)
+        candidates = _sorted_desc([d for d in documents if _matches(d, query)])[:limit + 1]
+        page, cursor = build_page(candidates, limit, "createdAt")
+        pages.append(page)
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    """encode_cursor -> decode_cursor giữ nguyên timestamp và _id"""
+    print("=== Test 1: Cursor round trip ===")
+
+    object_id = ObjectId()
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    assert decode_cursor(encode_cursor(timestamp, object_id)) == (timestamp, object_id)
+    assert decode_cursor(encode_cursor(None, object_id)) == (None, object_id)
+
+    for token in ("", "not-a-cursor", encode_cursor(timestamp, object_id)[:-3]):
+        try:
+            decode_cursor(token)
+            raise AssertionError(f"ValueError expected for {token!r}")
+        except ValueError:
+            pass
+    print("✅ PASSED\n")
+
+
+def test_walk_all_pages():
+    """Đi hết các trang: đúng thứ tự, không bỏ sót, không lặp"""
+    print("=== Test 2: Duyệt hết các trang ===")
+
+    base = datetime(2024, 1, 1)
+    documents = []
+    for index in range(23):
+        # Nhiều document trùng timestamp (tie-break bằng _id)
+        documents.append({"_id": ObjectId(), "createdAt": base + timedelta(seconds=index // 3)})
+    # Document cũ không có createdAt
+    documents += [{"_id": ObjectId(), "createdAt": None} for _ in range(4)]
+
+    expected = [d["_id"] for d in _sorted_desc(documents)]
+    for limit in (1, 4, 5, 27, 50):
+        pages = _walk(documents, limit)
+        assert [d["_id"] for page in pages for d in page] == expected, f"limit={limit}"
+        assert all(len(page) == limit for page in pages[:-1])
+    print("✅ PASSED\n")
+
+
+def test_build_page_and_merge_filters():
+    """build_page chỉ trả next_cursor khi còn trang sau; merge_filters bỏ filter rỗng"""
+    print("=== Test 3: build_page + merge_filters ===")
+
+    documents = [{"_id": ObjectId(), "createdAt": datetime(2024, 1, 1)} for _ in range(3)]
+    page, cursor = build_page(documents, 3, "createdAt")
+    assert page == documents and cursor is None
+
+    page, cursor = build_page(documents, 2, "createdAt")
+    assert page == documents[:2]
+    assert decode_cursor(cursor) == (documents[1]["createdAt"], documents[1]["_id"])
+
+    assert keyset_filter("createdAt", None) == {}
+    assert merge_filters(None, {}) == {}
+    assert merge_filters({"a": 1}, None) == {"a": 1}
+    assert merge_filters({"a": 1}, {"b": 2}) == {"$and": [{"a": 1}, {"b": 2}]}
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 KEYSET PAGINATION - TESTS\n")
+
+    try:
+        test_cursor_round_trip()
+        test_walk_all_pages()
+        test_build_page_and_merge_filters()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Test projection: fields/view -> MongoDB projection, entity partial chỉ trả về và
+update các field đã load
+"""
+import sys
+import os
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.entities.conservation_entity import Conservation
+from BE.repository.projection import build_projection, materialize, parse_fields
+
+
+def test_build_projection():
+    """fields ưu tiên hơn view; view "full" và không chọn gì -> full document"""
+    print("=== Test 1: build_projection ===")
+
+    assert build_projection(Conservation) is None
+    assert build_projection(Conservation, view="full") is None
+    assert build_projection(Conservation, view="summary") == {
+        field: 1 for field in Conservation.VIEWS["summary"]
+    }
+    assert build_projection(Conservation, fields=["title"], view="summary") == {"title": 1}
+    assert build_projection(Conservation, fields=[]) == {}
+
+    try:
+        build_projection(Conservation, view="unknown")
+        raise AssertionError("ValueError expected")
+    except ValueError as e:
+        assert "summary" in str(e)
+    print("✅ PASSED\n")
+
+
+def test_parse_fields():
+    """Query param "a, b,," -> ["a", "b"]; không truyền -> None"""
+    print("=== Test 2: parse_fields ===")
+
+    assert parse_fields(None) is None
+    assert parse_fields("title, goal,,") == ["title", "goal"]
+    assert parse_fields("") == []
+    print("✅ PASSED\n")
+
+
+def test_partial_entity():
+    """Entity load bằng projection: response và update chỉ gồm field đã load"""
+    print("=== Test 3: Entity partial ===")
+
+    object_id = ObjectId()
+    projection = build_projection(Conservation, fields=["title", "updatedAt"])
+    conservation = materialize(Conservation, {"_id": object_id, "title": "Cũ", "updatedAt": datetime(2024, 1, 1)}, projection)
+
+    response = conservation.to_response()
+    assert set(response) == {"_id", "title", "updatedAt"}
+    assert response["_id"] == str(object_id)
+
+    conservation.title = "Mới"
+    update = conservation.build_update()
+    # goal/facts/messageCount không được load -> không bị ghi đè bằng default
+    assert set(update["$set"]) == {"title"}
+    assert "$push" not in update
+
+    full = materialize(Conservation, {"_id": object_id, "title": "T", "goal": "G"}, None)
+    assert not full.is_partial
+    assert {"title", "goal", "facts", "messageCount"} <= set(full.to_response())
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 PROJECTION - TESTS\n")
+
+    try:
+        test_build_projection()
+        test_parse_fields()
+        test_partial_entity()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
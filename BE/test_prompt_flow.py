@@ -0,0 +1,194 @@
+"""
+Test luồng F2: process_prompt_async và process_prompt_stream dùng chung StepDAG
+(route theo intent giống nhau), với repository/service giả (không cần MongoDB/Gemini)
+"""
+import sys
+import os
+import asyncio
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.service.agent_orchestration_service import AgentOrchestrationService
+from BE.entities.session_entity import Session, WorkflowStep
+from BE.model.ai_models import CodeGenerationRequest, CodeGenerationResponse
+from BE.model.orchestration_models import AgentRequest, IntentClassifyResponse, IntentType
+
+
+class FakeAsyncSessionRepository:
+    """Session in-memory (async)"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def find_by_id(self, session_id: str):
+        return self.session if session_id == self.session.id else None
+
+    async def update_step(self, session_id: str, new_step: WorkflowStep, session: Session = None) -> bool:
+        self.session.current_step = new_step
+        return True
+
+    async def find_latest_code(self, session_id: str, limit: int = 1):
+        return self.session.code_history[-limit:]
+
+    async def update(self, session: Session):
+        return session
+
+
+class FakeCodeGenService:
+    """Code generation giả: code = prompt, thêm " (modified)" khi request có code hiện có"""
+
+    @staticmethod
+    def _code(request: CodeGenerationRequest) -> str:
+        return f"# {request.prompt}" + (" (modified)" if "Existing code" in (request.additional_context or "") else "")
+
+    async def generate_code_async(self, request: CodeGenerationRequest) -> CodeGenerationResponse:
+        return CodeGenerationResponse(
+            generated_code=self._code(request), explanation="", language="python",
+            timestamp=datetime.now(), success=True
+        )
+
+    async def stream_code(self, request: CodeGenerationRequest):
+        code = self._code(request)
+        yield "code", {"text": code}
+        response = await self.generate_code_async(request)
+        yield "done", response.model_dump(mode="json")
+
+
+class FakeAsyncGeminiRepository:
+    async def generate_code(self, prompt: str, model_name: str = "gemini-2.5-flash", use_cache: bool = False) -> str:
+        return "analysis"
+
+
+def _agent(intent: IntentType, code_history=None) -> AgentOrchestrationService:
+    session = Session(user_id="user_1", id="session_1", code_history=list(code_history or []))
+    agent = AgentOrchestrationService.__new__(AgentOrchestrationService)
+    agent.async_session_repo = FakeAsyncSessionRepository(session)
+    agent.code_gen_service = FakeCodeGenService()
+    agent.async_gemini_repo = FakeAsyncGeminiRepository()
+
+    async def classify_intent_async(request):
+        return IntentClassifyResponse(intent=intent, confidence=0.9, reasoning="test", success=True)
+
+    agent.classify_intent_async = classify_intent_async
+    return agent
+
+
+async def _collect(events):
+    return [item async for item in events]
+
+
+EXISTING = [Session.build_code_entry("def f(): pass", "python")]
+CASES = [
+    # (intent, code history, message mong đợi, generated_code mong đợi)
+    (IntentType.CREATE_NEW, [], "Code generated successfully", "# prompt"),
+    (IntentType.MODIFY_EXISTING, [], "Code generated successfully", "# prompt"),
+    (IntentType.MODIFY_EXISTING, EXISTING, "Code modified successfully", "# prompt (modified)"),
+    (IntentType.ANALYZE, EXISTING, "Code analysis completed", None),
+]
+
+
+def test_async_and_stream_route_alike():
+    """Cùng intent + code history -> process_prompt_async và stream chọn cùng nhánh"""
+    print("=== Test 1: Async và stream route giống nhau ===")
+
+    for intent, history, message, code in CASES:
+        request = AgentRequest(session_id="session_1", user_id="user_1", prompt="prompt")
+
+        response = asyncio.run(_agent(intent, history).process_prompt_async(request))
+        assert response.success, response.error_message
+        assert response.message == message
+        assert response.generated_code == code
+
+        events = asyncio.run(_collect(_agent(intent, history).process_prompt_stream(request)))
+        assert events[0][0] == "intent"
+        assert events[-1][0] == "done", events[-1]
+        assert events[-1][1]["message"] == message
+        assert events[-1][1]["generated_code"] == code
+        # Chỉ relay events của nhánh đã chọn (generate đoán sai bị bỏ)
+        assert [data["text"] for event, data in events if event == "code"] == ([code] if code else [])
+    print("✅ PASSED\n")
+
+
+def test_stream_saves_history():
+    """Stream hoàn tất -> code được thêm vào history của session"""
+    print("=== Test 2: Stream lưu code history ===")
+
+    agent = _agent(IntentType.CREATE_NEW)
+    request = AgentRequest(session_id="session_1", user_id="user_1", prompt="prompt")
+    asyncio.run(_collect(agent.process_prompt_stream(request)))
+
+    session = agent.async_session_repo.session
+    assert session.current_step == WorkflowStep.COMPLETED
+    assert [entry["code"] for entry in session.code_history] == ["# prompt"]
+    print("✅ PASSED\n")
+
+
+def test_stream_missing_session():
+    """Session không tồn tại -> một event error"""
+    print("=== Test 3: Stream với session không tồn tại ===")
+
+    request = AgentRequest(session_id="missing", user_id="user_1", prompt="prompt")
+    events = asyncio.run(_collect(_agent(IntentType.CREATE_NEW).process_prompt_stream(request)))
+    assert [event for event, _ in events] == ["error"]
+    print("✅ PASSED\n")
+
+
+def test_cancelled_prompt_restores_step():
+    """Client ngắt kết nối giữa chừng -> session không bị kẹt ở generating_code"""
+    print("=== Test 4: Hủy giữa chừng ===")
+
+    request = AgentRequest(session_id="session_1", user_id="user_1", prompt="prompt")
+
+    async def cancel_async() -> WorkflowStep:
+        agent = _agent(IntentType.CREATE_NEW)
+
+        async def classify_forever(request):
+            await asyncio.Event().wait()
+
+        agent.classify_intent_async = classify_forever
+        task = asyncio.ensure_future(agent.process_prompt_async(request))
+        await asyncio.sleep(0.01)
+        assert agent.async_session_repo.session.current_step == WorkflowStep.GENERATING_CODE
+        task.cancel()
+        try:
+            await task
+            raise AssertionError("CancelledError expected")
+        except asyncio.CancelledError:
+            pass
+        return agent.async_session_repo.session.current_step
+
+    assert asyncio.run(cancel_async()) == WorkflowStep.IDLE
+
+    async def close_stream() -> WorkflowStep:
+        agent = _agent(IntentType.CREATE_NEW)
+        events = agent.process_prompt_stream(request)
+        assert (await events.__anext__())[0] == "intent"
+        await events.aclose()  # StreamingResponse đóng generator khi client ngắt kết nối
+        return agent.async_session_repo.session.current_step
+
+    assert asyncio.run(close_stream()) == WorkflowStep.IDLE
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 PROMPT FLOW (F2) - TESTS\n")
+
+    try:
+        test_async_and_stream_route_alike()
+        test_stream_saves_history()
+        test_stream_missing_session()
+        test_cancelled_prompt_restores_step()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
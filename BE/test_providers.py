@@ -0,0 +1,107 @@
+"""
+Test lazy providers: instance chỉ được tạo ở lần dùng đầu tiên, override/reset,
+factory lỗi được thử lại
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.utils.providers import get_provider, lazy, provider_stats
+
+
+class CountingService:
+    """Đếm số instance được tạo"""
+
+    instances = 0
+
+    def __init__(self):
+        CountingService.instances += 1
+        self.repo = "real"
+
+    def ping(self) -> str:
+        return f"pong:{self.repo}"
+
+
+def _failing_factory():
+    raise RuntimeError("GEMINI_API_KEY is required")
+
+
+def test_created_on_first_use():
+    """lazy() không tạo instance; lần truy cập attribute đầu tiên tạo đúng một instance"""
+    print("=== Test 1: Tạo ở lần dùng đầu tiên ===")
+
+    CountingService.instances = 0
+    service = lazy(CountingService, name="test.counting")
+    provider = get_provider("test.counting")
+    assert CountingService.instances == 0 and not provider.created
+
+    assert service.ping() == "pong:real"
+    assert service.ping() == "pong:real"
+    assert CountingService.instances == 1
+    assert provider_stats()["test.counting"]["created"] is True
+
+    # Cùng tên -> cùng provider
+    assert lazy(CountingService, name="test.counting") is service
+    print("✅ PASSED\n")
+
+
+def test_override_and_reset():
+    """override() thay instance (fake trong test), gán attribute đi tới instance, reset() tạo lại"""
+    print("=== Test 2: Override + reset ===")
+
+    CountingService.instances = 0
+    service = lazy(CountingService, name="test.override")
+    provider = get_provider("test.override")
+
+    fake = CountingService.__new__(CountingService)
+    fake.repo = "fake"
+    provider.override(fake)
+    assert service.ping() == "pong:fake"
+    assert CountingService.instances == 0
+
+    service.repo = "patched"
+    assert fake.repo == "patched"
+
+    provider.reset()
+    assert not provider.created
+    assert service.ping() == "pong:real"
+    assert CountingService.instances == 1
+    print("✅ PASSED\n")
+
+
+def test_failing_factory_retried():
+    """Factory lỗi: lỗi được raise khi dùng, provider chưa được tạo nên lần sau thử lại"""
+    print("=== Test 3: Factory lỗi ===")
+
+    service = lazy(_failing_factory, name="test.failing")
+    for _ in range(2):
+        try:
+            service.ping()
+            raise AssertionError("RuntimeError expected")
+        except RuntimeError as e:
+            assert str(e) == "GEMINI_API_KEY is required"
+        assert not get_provider("test.failing").created
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 LAZY PROVIDERS - TESTS\n")
+
+    try:
+        test_created_on_first_use()
+        test_override_and_reset()
+        test_failing_factory_retried()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Test SessionCache: generation counter chặn set dữ liệu cũ sau invalidate,
+bản sao khi đọc, tầng dùng chung (shared) và read-through trong SessionRepository
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.entities.session_entity import WorkflowStep
+from BE.repository.session_cache import SessionCache, session_cache
+from BE.repository.session_repo import SessionRepository
+from BE.utils.ttl_cache import TTLCache
+
+
+def test_stale_set_after_invalidate_is_dropped():
+    """Đọc MongoDB -> session bị ghi (invalidate) -> set bản đã đọc bị bỏ qua"""
+    print("=== Test 1: Set cũ sau invalidate ===")
+
+    cache = SessionCache()
+    generation = cache.generation()
+    cache.invalidate("s1")
+    cache.set("s1", {"last_prompt": "old"}, generation)
+    assert cache.get("s1") is None
+
+    # Generation hiện tại -> được lưu
+    cache.set("s1", {"last_prompt": "new"}, cache.generation())
+    assert cache.get("s1") == {"last_prompt": "new"}
+
+    # Invalidate session khác cũng làm generation cũ hết hiệu lực (an toàn, chỉ mất một lần cache)
+    generation = cache.generation()
+    cache.invalidate("s2")
+    cache.set("s3", {"last_prompt": "x"}, generation)
+    assert cache.get("s3") is None
+    print("✅ PASSED\n")
+
+
+def test_get_returns_copy():
+    """Sửa document trả về không làm hỏng cache"""
+    print("=== Test 2: get trả về bản sao ===")
+
+    cache = SessionCache()
+    document = {"context_json": {"facts": ["a"]}}
+    cache.set("s1", document)
+    document["context_json"]["facts"].append("b")
+
+    cached = cache.get("s1")
+    cached["context_json"]["facts"].append("c")
+    assert cache.get("s1") == {"context_json": {"facts": ["a"]}}
+    print("✅ PASSED\n")
+
+
+def test_shared_tier():
+    """Có tầng shared -> không có tầng memory: invalidate ở worker này có hiệu lực ngay ở worker khác"""
+    print("=== Test 3: Tầng shared ===")
+
+    shared = TTLCache(max_entries=16, ttl_seconds=60)
+    writer = SessionCache(shared=shared)
+    reader = SessionCache(shared=shared)  # Worker khác
+    assert reader.memory is None and reader.stats()["memory"] is None
+
+    writer.set("s1", {"last_prompt": "p"})
+    assert reader.get("s1") == {"last_prompt": "p"}
+    assert reader.get("s1") == {"last_prompt": "p"}
+    assert reader.shared_hits == 2
+
+    writer.invalidate("s1")
+    assert shared.get("session:s1") is None
+    assert reader.get("s1") is None
+
+    disabled = SessionCache(enabled=False, shared=shared)
+    disabled.set("s1", {"last_prompt": "p"})
+    assert disabled.get("s1") is None
+    assert shared.get("session:s1") is None
+    print("✅ PASSED\n")
+
+
+class ConcurrentWriteCollection:
+    """find_one trả document, đồng thời mô phỏng một lần ghi session xảy ra trong lúc đọc"""
+
+    def __init__(self, document: dict, write_during_read: bool):
+        self.document = document
+        self.write_during_read = write_during_read
+        self.reads = 0
+
+    def find_one(self, query: dict, projection=None):
+        self.reads += 1
+        if self.write_during_read:
+            session_cache.invalidate(str(self.document["_id"]))
+        return dict(self.document)
+
+
+def test_repository_read_through():
+    """find_by_id chỉ cache kết quả khi không có lần ghi nào trong lúc đọc"""
+    print("=== Test 4: Read-through trong SessionRepository ===")
+
+    session_id = ObjectId()
+    document = {"_id": session_id, "user_id": "user_1", "current_step": WorkflowStep.COMPLETED.value}
+
+    enabled = session_cache.enabled
+    session_cache.enabled = True
+    try:
+        for write_during_read, expected_reads in ((False, 1), (True, 2)):
+            session_cache.clear()
+            repo = SessionRepository.__new__(SessionRepository)
+            repo.collection = ConcurrentWriteCollection(document, write_during_read)
+            repo.history_repo = SimpleNamespace(find_by_session=lambda *args, **kwargs: [])
+
+            assert repo.find_by_id(str(session_id)).user_id == "user_1"
+            assert repo.find_by_id(str(session_id)).user_id == "user_1"
+            assert repo.collection.reads == expected_reads
+    finally:
+        session_cache.enabled = enabled
+        session_cache.clear()
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SESSION CACHE - TESTS\n")
+
+    try:
+        test_stale_set_after_invalidate_is_dropped()
+        test_get_returns_copy()
+        test_shared_tier()
+        test_repository_read_through()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Test SessionRepository write paths với collection in-memory (không cần MongoDB)
+"""
+import sys
+import os
+from types import SimpleNamespace
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bson import ObjectId
+
+from BE.entities.session_entity import Session, WorkflowStep
+from BE.repository.session_repo import SessionRepository
+from BE.repository.session_cache import session_cache
+from BE.repository.session_code_history_repo import SessionCodeHistoryRepository, to_history_document, to_history_entry
+
+
+class FakeCollection:
+    """Collection in-memory: filter theo _id (hoặc $exists), $set, $unset và $push/$each"""
+
+    def __init__(self):
+        self.documents = {}
+
+    def _apply(self, document: dict, update: dict):
+        for field, value in update.get("$set", {}).items():
+            document[field] = value
+        for field, spec in update.get("$push", {}).items():
+            document.setdefault(field, []).extend(spec["$each"])
+        for field in update.get("$unset", {}):
+            document.pop(field, None)
+
+    def find(self, query: dict, projection=None):
+        # Chỉ dùng bởi migrate: {"code_history": {"$exists": True}}
+        (field, _), = query.items()
+        return FakeCursor([dict(d) for d in self.documents.values() if field in d])
+
+    def insert_one(self, document: dict):
+        object_id = ObjectId()
+        self.documents[object_id] = {**document, "_id": object_id}
+        return SimpleNamespace(inserted_id=object_id)
+
+    def find_one(self, query: dict, projection=None):
+        document = self.documents.get(query["_id"])
+        return dict(document) if document else None
+
+    def update_one(self, query: dict, update: dict):
+        document = self.documents.get(query["_id"])
+        if document is not None:
+            self._apply(document, update)
+        matched = 1 if document is not None else 0
+        return SimpleNamespace(matched_count=matched, modified_count=matched)
+
+    def find_one_and_update(self, query: dict, update: dict, projection=None, return_document=False):
+        document = self.documents.get(query["_id"])
+        if document is None:
+            return None
+        self._apply(document, update)
+        return dict(document)
+
+
+class FakeCursor(list):
+    def limit(self, count: int):
+        return FakeCursor(self[:count])
+
+
+class FakeHistoryCollection:
+    """session_code_history in-memory cho SessionCodeHistoryRepository (bulk_write UpdateOne upsert)"""
+
+    def __init__(self):
+        self.documents = []
+
+    def bulk_write(self, operations: list, ordered: bool = True):
+        upserted = matched = 0
+        for operation in operations:
+            query, update = operation._filter, operation._doc
+            if any(all(d.get(k) == v for k, v in query.items()) for d in self.documents):
+                matched += 1
+            else:
+                self.documents.append({**query, **update["$setOnInsert"]})
+                upserted += 1
+        return SimpleNamespace(upserted_count=upserted, matched_count=matched)
+
+
+class FakeHistoryRepository:
+    """session_code_history in-memory"""
+
+    def __init__(self):
+        self.entries = []
+
+    def add(self, session_id: str, entry: dict) -> bool:
+        return self.add_many(session_id, [entry]) > 0
+
+    def add_many(self, session_id: str, entries: list) -> int:
+        self.entries.extend((session_id, entry) for entry in entries)
+        return len(entries)
+
+    def find_by_session(self, session_id: str, skip: int = 0, limit: int = 20) -> list:
+        return [entry for sid, entry in self.entries if sid == session_id][skip:skip + limit]
+
+
+def _repository() -> SessionRepository:
+    repo = SessionRepository.__new__(SessionRepository)
+    repo.collection = FakeCollection()
+    repo.history_repo = FakeHistoryRepository()
+    session_cache.clear()
+    return repo
+
+
+def test_missing_session_writes_no_history():
+    """Session không tồn tại -> không có history mồ côi, trả False/None"""
+    print("=== Test 1: Missing session ===")
+
+    repo = _repository()
+    missing_id = str(ObjectId())
+    entry = Session.build_code_entry("print(1)", "python")
+
+    assert repo.add_code_history(missing_id, entry) is False
+    assert repo.apply_changes(missing_id, {"last_prompt": "x"}, {"code_history": [entry]}) is False
+
+    orphan = Session(user_id="user_1", id=missing_id)
+    orphan.mark_clean()
+    orphan.add_code_to_history("print(2)", "python")
+    assert repo.update(orphan) is None
+
+    assert repo.history_repo.entries == []
+    print("✅ PASSED\n")
+
+
+def test_existing_session_writes_history():
+    """Session tồn tại -> session được update và history được ghi"""
+    print("=== Test 2: Existing session ===")
+
+    repo = _repository()
+    session = repo.create(Session(user_id="user_1"))
+    entry = Session.build_code_entry("print(1)", "python")
+
+    assert repo.add_code_history(session.id, entry) is True
+    assert repo.apply_changes(session.id, {"last_prompt": "x"}, {"code_history": [entry]}) is True
+
+    session.add_code_to_history("print(2)", "python")
+    assert repo.update(session) is not None
+
+    assert [code["code"] for _, code in repo.history_repo.entries] == ["print(1)", "print(1)", "print(2)"]
+    stored = repo.collection.documents[ObjectId(session.id)]
+    assert stored["last_prompt"] == "x"
+    assert "code_history" not in stored
+    print("✅ PASSED\n")
+
+
+def test_update_keeps_newer_step():
+    """update_step ghi step ngoài entity: update() không ghi đè step mới hơn, không ghi khi không đổi gì"""
+    print("=== Test 3: Step ghi ngoài entity ===")
+
+    repo = _repository()
+    created = repo.create(Session(user_id="user_1", current_step=WorkflowStep.COMPLETED))
+    stored = repo.collection.documents[ObjectId(created.id)]
+
+    # Entity đi qua update_step -> snapshot được cập nhật, step mới của entity vẫn được ghi
+    session = repo.find_by_id(created.id)
+    assert repo.update_step(created.id, WorkflowStep.GENERATING_CODE, session)
+    assert session.current_step == WorkflowStep.GENERATING_CODE and not session.is_dirty
+    session.current_step = WorkflowStep.COMPLETED
+    session.last_prompt = "Tạo hàm"
+    assert repo.update(session) is not None
+    assert stored["current_step"] == WorkflowStep.COMPLETED.value
+    assert stored["last_prompt"] == "Tạo hàm"
+
+    # Step mới hơn (ERROR) được ghi ngoài entity -> update() không ghi đè bằng step cũ
+    session = repo.find_by_id(created.id)
+    repo.update_step(created.id, WorkflowStep.ERROR)
+    updated_at = stored["updated_at"]
+    session.last_prompt = "Sửa hàm"
+    session = repo.update(session)
+    assert session is not None
+    assert stored["current_step"] == WorkflowStep.ERROR.value
+    assert stored["last_prompt"] == "Sửa hàm"
+
+    # Không đổi gì -> không ghi
+    repo.collection.find_one_and_update = None
+    assert repo.update(session) is session
+    assert stored["updated_at"] == updated_at
+    print("✅ PASSED\n")
+
+
+def test_code_history_in_separate_collection():
+    """Code history nằm ở session_code_history, session document không chứa history"""
+    print("=== Test 4: Code history collection riêng ===")
+
+    repo = _repository()
+    session = Session(user_id="user_1")
+    session.add_code_to_history("print(1)", "python")
+    created = repo.create(session)
+
+    stored = repo.collection.documents[ObjectId(created.id)]
+    assert "code_history" not in stored
+    assert created.pop_pending_code_entries() == []  # Entries đã được ghi khi create
+
+    for index in range(2, 6):
+        created.add_code_to_history(f"print({index})", "python")
+    assert repo.update(created) is not None
+
+    # Session load lại chỉ đọc history khi cần, theo trang
+    loaded = repo.find_by_id(created.id)
+    assert [entry["code"] for entry in loaded.get_code_history(skip=1, limit=2)] == ["print(2)", "print(3)"]
+    assert len(loaded.get_code_history(limit=20)) == 5
+
+    entry = Session.build_code_entry("print(1)", "python", "mô tả")
+    document = to_history_document(created.id, entry)
+    assert document["session_id"] == created.id
+    assert to_history_entry(document) == entry
+    print("✅ PASSED\n")
+
+
+def test_migration_rerun_after_interruption():
+    """Migrate bị ngắt sau khi ghi history, trước $unset -> chạy lại không ghi trùng entries"""
+    print("=== Test 5: Migrate chạy lại ===")
+
+    repo = _repository()
+    repo.history_repo = SessionCodeHistoryRepository.__new__(SessionCodeHistoryRepository)
+    repo.history_repo.collection = FakeHistoryCollection()
+    repo.history_repo.ensure_indexes = lambda: None
+
+    entries = [Session.build_code_entry(f"print({index})", "python") for index in range(3)]
+    result = repo.collection.insert_one({"user_id": "user_1", "code_history": entries})
+    session_id = str(result.inserted_id)
+
+    # Lần chạy trước đã ghi 2 entries đầu rồi bị ngắt
+    assert repo.history_repo.upsert_migrated(session_id, entries[:2]) == 2
+
+    assert repo.migrate_embedded_code_history() == 1
+    assert repo.migrate_embedded_code_history() == 0
+    documents = repo.history_repo.collection.documents
+    assert sorted((d["source_index"], d["code"]) for d in documents) == [(0, "print(0)"), (1, "print(1)"), (2, "print(2)")]
+    assert "code_history" not in repo.collection.documents[result.inserted_id]
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 SESSION REPOSITORY - TESTS\n")
+
+    try:
+        test_missing_session_writes_no_history()
+        test_existing_session_writes_history()
+        test_update_keeps_newer_step()
+        test_code_history_in_separate_collection()
+        test_migration_rerun_after_interruption()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
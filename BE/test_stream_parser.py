@@ -0,0 +1,80 @@
+"""
+Test CodeFenceStreamParser (streaming /ai/generate/stream)
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.utils.stream_parser import CodeFenceStreamParser
+
+
+RESPONSE = "Here is the code:\n```python\ndef add(a, b):\n    return a + b\n```\nIt adds two numbers."
+
+
+def _run(chunks):
+    parser = CodeFenceStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.finish())
+    code = "".join(text for event, text in events if event == "code")
+    explanation = "".join(text for event, text in events if event == "explanation")
+    return parser, code, explanation
+
+
+def test_single_chunk():
+    """Toàn bộ response trong một chunk"""
+    print("=== Test 1: Single chunk ===")
+
+    parser, code, explanation = _run([RESPONSE])
+
+    assert code == "def add(a, b):\n    return a + b\n"
+    assert explanation == "Here is the code:\n\nIt adds two numbers."
+    assert parser.language == "python"
+    print("✅ PASSED\n")
+
+
+def test_fence_split_across_chunks():
+    """Fence ``` bị cắt giữa các chunk"""
+    print("=== Test 2: Fence split across chunks ===")
+
+    chunks = [RESPONSE[i:i + 2] for i in range(0, len(RESPONSE), 2)]
+    parser, code, explanation = _run(chunks)
+
+    assert code == "def add(a, b):\n    return a + b\n"
+    assert explanation == "Here is the code:\n\nIt adds two numbers."
+    print("✅ PASSED\n")
+
+
+def test_code_emitted_before_fence_closes():
+    """Code event được emit trước khi fence đóng"""
+    print("=== Test 3: Early code events ===")
+
+    parser = CodeFenceStreamParser()
+    events = parser.feed("Intro\n```python\ndef add(a, b):\n")
+
+    assert ("code", "def add(a, b):\n") in events
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 CODE FENCE STREAM PARSER - TESTS\n")
+
+    try:
+        test_single_chunk()
+        test_fence_split_across_chunks()
+        test_code_emitted_before_fence_closes()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Test structured output helpers (gemini_schema, loads_lenient)
+"""
+import sys
+import os
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.model.intent_models import FunctionDetails
+from BE.utils.structured_output import gemini_schema, loads_lenient
+
+
+def test_lenient_parser_repairs_common_errors():
+    """Code fence, text thừa, trailing comma, comment, nháy đơn, Python literals"""
+    print("=== Test 1: Lenient parser ===")
+
+    cases = [
+        ('Here you go:\n```json\n{"a": 1, "b": [1, 2,],}\n```\nHope it helps', {"a": 1, "b": [1, 2]}),
+        ("{'name': 'x', 'ok': True, 'n': None}", {"name": "x", "ok": True, "n": None}),
+        ('{"a": 1, // comment\n "b": /* note */ 2}', {"a": 1, "b": 2}),
+        ('Sure! {"purpose": "it\'s ok"} and more {"x": 1}', {"purpose": "it's ok"}),
+    ]
+    for text, expected in cases:
+        assert loads_lenient(text) == expected, text
+
+    print("✅ PASSED\n")
+
+
+def test_lenient_parser_truncated_and_invalid():
+    """JSON bị cắt được đóng lại; text không có JSON -> None"""
+    print("=== Test 2: Truncated / invalid ===")
+
+    assert loads_lenient('{"a": [1, 2, {"b": "trunc') == {"a": [1, 2, {"b": "trunc"}]}
+    assert loads_lenient("no json here") is None
+    assert loads_lenient("") is None
+    print("✅ PASSED\n")
+
+
+def test_gemini_schema():
+    """Schema không có $ref/anyOf, type viết hoa, Optional -> nullable"""
+    print("=== Test 3: Gemini schema ===")
+
+    schema = gemini_schema(FunctionDetails, fields=["function_name", "inputs", "outputs"], required=["function_name"])
+
+    assert schema["type"] == "OBJECT"
+    assert list(schema["properties"]) == ["function_name", "inputs", "outputs"]
+    assert schema["required"] == ["function_name"]
+    assert schema["properties"]["function_name"] == {
+        "type": "STRING", "nullable": True, "description": "Tên hàm gợi ý"
+    }
+    assert schema["properties"]["inputs"]["items"]["properties"]["name"]["type"] == "STRING"
+    assert schema["properties"]["outputs"]["nullable"] is True
+    assert "$ref" not in str(schema) and "anyOf" not in str(schema)
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 STRUCTURED OUTPUT - TESTS\n")
+
+    try:
+        test_lenient_parser_repairs_common_errors()
+        test_lenient_parser_truncated_and_invalid()
+        test_gemini_schema()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Test chuẩn hóa text cho search (bỏ dấu tiếng Việt) và filter $text của conservation
+"""
+import sys
+import os
+import unicodedata
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from BE.utils.text_normalize import normalize_many, normalize_text
+from BE.entities.conservation_entity import Conservation
+from BE.repository.conservation_repo import ConservationRepository
+
+
+def test_normalize_text():
+    """Bỏ dấu (kể cả đ/Đ), lowercase, ký tự đặc biệt -> khoảng trắng"""
+    print("=== Test 1: normalize_text ===")
+
+    assert normalize_text("Xây dựng API Đăng nhập") == "xay dung api dang nhap"
+    assert normalize_text("Tiếng Việt có dấu: ắ ằ ẳ ẵ ặ ố ồ ổ ỗ ộ ư ự") == "tieng viet co dau a a a a a o o o o o u u"
+    assert normalize_text("  hello,   WORLD!! (v2.0) ") == "hello world v2 0"
+    assert normalize_text("đường đi") == normalize_text("duong di")
+    # Dạng NFC và NFD cho cùng kết quả
+    assert normalize_text("Trường") == normalize_text("Trừờng") == "truong"
+    assert normalize_text("") == ""
+    assert normalize_text(None) == ""
+    assert normalize_text("!!! ---") == ""
+    print("✅ PASSED\n")
+
+
+def test_normalize_many():
+    """Nối các đoạn đã chuẩn hóa, bỏ đoạn rỗng"""
+    print("=== Test 2: normalize_many ===")
+
+    assert normalize_many(["Hàm Đệ quy", "", "!!!", "Sắp xếp"]) == "ham de quy sap xep"
+    assert normalize_many([]) == ""
+    print("✅ PASSED\n")
+
+
+def test_search_fields_and_filter():
+    """Field search của conservation và query dùng cùng cách chuẩn hóa"""
+    print("=== Test 3: search fields + $text filter ===")
+
+    conservation = Conservation(title="Đăng nhập JWT", goal="Xây dựng API", facts=["Dùng FastAPI", "Lưu token"])
+    assert conservation.build_search_fields() == {
+        "title": "dang nhap jwt",
+        "goal": "xay dung api",
+        "facts": "dung fastapi luu token"
+    }
+
+    assert ConservationRepository.build_search_filter("ĐĂNG nhập") == {"$text": {"$search": "dang nhap"}}
+    assert ConservationRepository.build_search_filter("  ?! ") is None
+    print("✅ PASSED\n")
+
+
+def main():
+    """Run all tests"""
+    print("🚀 TEXT NORMALIZE - TESTS\n")
+
+    try:
+        test_normalize_text()
+        test_normalize_many()
+        test_search_fields_and_filter()
+
+        print("🎉 ALL TESTS PASSED!")
+
+    except Exception as e:
+        print(f"❌ TEST FAILED: {e}")
+        import traceback
+        traceback.print_exc()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+import asyncio
+from typing import Awaitable, TypeVar
+
+from fastapi import HTTPException, Request
+
+T = TypeVar('T')
+
+# Non-standard status code (nginx convention) for "client closed request"
+CLIENT_CLOSED_REQUEST = 499
+
+
+async def run_until_disconnected(request: Request, awaitable: Awaitable[T], poll_interval: float = 0.5) -> T:
+    """
+    Await a coroutine, cancelling it if the HTTP client disconnects first
+
+    Args:
+        request: Incoming FastAPI request (used to detect disconnects)
+        awaitable: Coroutine doing the actual work (e.g. a Gemini call)
+        poll_interval: Seconds between disconnect checks
+
+    Returns:
+        Result of the awaitable
+
+    Raises:
+        HTTPException: 499 if the client went away before the work finished
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
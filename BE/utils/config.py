@@ -24,13 +24,81 @@ class EnvironmentConfig:
         
         # Database (optional)
         self.MONGODB_URI: Optional[str] = os.getenv('MONGODB_URI')
+        self.MONGO_USERNAME: str = os.getenv('MONGO_USERNAME', 'mongo')
+        self.MONGO_PASSWORD: str = os.getenv('MONGO_PASSWORD', 'OtfagZQFKuslkxmpTCZTlvctRGsQBLnk')
+        self.MONGO_HOST: str = os.getenv('MONGO_HOST', 'shortline.proxy.rlwy.net')
+        self.MONGO_PORT: int = int(os.getenv('MONGO_PORT', '21101'))
+        self.MONGO_DATABASE: str = os.getenv('MONGO_DATABASE', 'basic-hackathon')
+        
+        # MongoDB connection pool (shared by every repository in the process)
+        self.MONGO_MAX_POOL_SIZE: int = int(os.getenv('MONGO_MAX_POOL_SIZE', '50'))
+        self.MONGO_MIN_POOL_SIZE: int = int(os.getenv('MONGO_MIN_POOL_SIZE', '0'))
+        self.MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', '60000'))
+        self.MONGO_TIMEOUT_MS: int = int(os.getenv('MONGO_TIMEOUT_MS', '10000'))
+        
+        # Create the indexes declared by the repositories on startup (idempotent)
+        self.MONGO_ENSURE_INDEXES: bool = os.getenv('MONGO_ENSURE_INDEXES', 'True').lower() == 'true'
+        
+        # Write messages and conservation messageCount in one transaction (needs a replica set)
+        self.MONGO_TRANSACTIONS: bool = os.getenv('MONGO_TRANSACTIONS', 'True').lower() == 'true'
+        
+        # Recompute conservation messageCount from messages periodically (0 = disabled)
+        self.MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS: float = float(os.getenv('MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS', '3600'))
+        
+        # Cascade delete of conservations: messages removed in background batches
+        self.CASCADE_DELETE_BATCH_SIZE: int = int(os.getenv('CASCADE_DELETE_BATCH_SIZE', '1000'))
+        self.CASCADE_DELETE_BATCH_DELAY_SECONDS: float = float(os.getenv('CASCADE_DELETE_BATCH_DELAY_SECONDS', '0.05'))
+        # A running job without progress for this long is considered dead and can be resumed
+        self.CASCADE_DELETE_STALE_SECONDS: float = float(os.getenv('CASCADE_DELETE_STALE_SECONDS', '300'))
+        
+        # Cached totals for filtered paginated queries (unfiltered totals use estimated_document_count)
+        self.COUNT_CACHE_TTL_SECONDS: float = float(os.getenv('COUNT_CACHE_TTL_SECONDS', '30'))
+        self.COUNT_CACHE_MAX_ENTRIES: int = int(os.getenv('COUNT_CACHE_MAX_ENTRIES', '1024'))
+        
+        # Number of server worker processes (uvicorn/gunicorn read the same variable)
+        self.WEB_CONCURRENCY: int = int(os.getenv('WEB_CONCURRENCY', '1'))
+        
+        # Read-through cache of session documents (invalidated on every session write).
+        # In-process only, so it is turned off when WEB_CONCURRENCY > 1
+        self.SESSION_CACHE_ENABLED: bool = os.getenv('SESSION_CACHE_ENABLED', 'True').lower() == 'true'
+        self.SESSION_CACHE_TTL_SECONDS: float = float(os.getenv('SESSION_CACHE_TTL_SECONDS', '30'))
+        self.SESSION_CACHE_MAX_ENTRIES: int = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '1024'))
+        
+        # Write session step transitions immediately instead of batching them with the final update
+        self.SESSION_STEP_WRITE_THROUGH: bool = os.getenv('SESSION_STEP_WRITE_THROUGH', 'False').lower() == 'true'
         
         # API Configuration
         self.PREFIX_API: str = os.getenv('PREFIX_API', '/api')
         self.APP_NAME: str = os.getenv('APP_NAME', 'AI Agent API')
         
-        # Gemini API Key
-        self.GEMINI_API_KEY: str = self._get_required_env('GEMINI_API_KEY')
+        # Gemini API Key - only required when Gemini is first used (see get_gemini_api_key)
+        self.GEMINI_API_KEY: str = os.getenv('GEMINI_API_KEY', '')
+        
+        # Create the lazily-provided services/clients in the startup hook instead of on first request
+        self.WARM_UP_PROVIDERS: bool = os.getenv('WARM_UP_PROVIDERS', 'True').lower() == 'true'
+        
+        # Multi-turn refinement state of IntentClassifierService: "memory" (per worker) or "mongo" (shared)
+        self.REFINEMENT_STATE_BACKEND: str = os.getenv('REFINEMENT_STATE_BACKEND', 'memory').lower()
+        self.REFINEMENT_STATE_TTL_SECONDS: float = float(os.getenv('REFINEMENT_STATE_TTL_SECONDS', '1800'))
+        self.REFINEMENT_STATE_MAX_ENTRIES: int = int(os.getenv('REFINEMENT_STATE_MAX_ENTRIES', '4096'))
+        
+        # Local intent classifier: answer obvious prompts without a Gemini call
+        self.LOCAL_INTENT_ENABLED: bool = os.getenv('LOCAL_INTENT_ENABLED', 'True').lower() == 'true'
+        self.LOCAL_INTENT_MIN_CONFIDENCE: float = float(os.getenv('LOCAL_INTENT_MIN_CONFIDENCE', '0.85'))
+        
+        # Gemini async calls: max in-flight requests per worker and per-call timeout
+        self.GEMINI_MAX_CONCURRENCY: int = int(os.getenv('GEMINI_MAX_CONCURRENCY', '8'))
+        self.GEMINI_TIMEOUT_SECONDS: float = float(os.getenv('GEMINI_TIMEOUT_SECONDS', '60'))
+        
+        # Ask Gemini for schema-constrained JSON when extracting context (plain text + lenient parser otherwise)
+        self.GEMINI_STRUCTURED_OUTPUT: bool = os.getenv('GEMINI_STRUCTURED_OUTPUT', 'True').lower() == 'true'
+        
+        # LLM response cache (in-process LRU + optional MongoDB tier); intent/context extraction
+        # always use it, code generation and review only when the request sets use_cache=true
+        self.LLM_CACHE_ENABLED: bool = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+        self.LLM_CACHE_TTL_SECONDS: int = int(os.getenv('LLM_CACHE_TTL_SECONDS', '3600'))
+        self.LLM_CACHE_MAX_ENTRIES: int = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '512'))
+        self.LLM_CACHE_MONGO: bool = os.getenv('LLM_CACHE_MONGO', 'False').lower() == 'true'
     
     def _get_required_env(self, key: str) -> str:
         """Get required environment variable or raise error"""
@@ -50,8 +118,25 @@ class EnvironmentConfig:
             'debug': self.DEBUG,
             'cors_origins': self.CORS_ORIGINS,
             'mongodb_uri': self.MONGODB_URI,
+            'mongo_host': self.MONGO_HOST,
+            'mongo_database': self.MONGO_DATABASE,
+            'mongo_max_pool_size': self.MONGO_MAX_POOL_SIZE,
+            'mongo_min_pool_size': self.MONGO_MIN_POOL_SIZE,
+            'mongo_max_idle_time_ms': self.MONGO_MAX_IDLE_TIME_MS,
+            'mongo_ensure_indexes': self.MONGO_ENSURE_INDEXES,
+            'mongo_transactions': self.MONGO_TRANSACTIONS,
+            'message_count_reconcile_interval_seconds': self.MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS,
             'prefix_api': self.PREFIX_API,
             'app_name': self.APP_NAME,
+            'gemini_max_concurrency': self.GEMINI_MAX_CONCURRENCY,
+            'gemini_timeout_seconds': self.GEMINI_TIMEOUT_SECONDS,
+            'gemini_structured_output': self.GEMINI_STRUCTURED_OUTPUT,
+            'llm_cache_enabled': self.LLM_CACHE_ENABLED,
+            'web_concurrency': self.WEB_CONCURRENCY,
+            'session_cache_enabled': self.SESSION_CACHE_ENABLED,
+            'local_intent_enabled': self.LOCAL_INTENT_ENABLED,
+            'refinement_state_backend': self.REFINEMENT_STATE_BACKEND,
+            'llm_cache_mongo': self.LLM_CACHE_MONGO,
             'gemini_api_key': '***' + self.GEMINI_API_KEY[-4:] if self.GEMINI_API_KEY else None
         }
 
@@ -79,8 +164,8 @@ def get_env_variable(key: str, default: str = None) -> str:
 
 
 def get_gemini_api_key() -> str:
-    """Get Gemini API key from environment"""
-    return env.GEMINI_API_KEY
+    """Get Gemini API key from environment (raises if missing)"""
+    return env.GEMINI_API_KEY or env._get_required_env('GEMINI_API_KEY')
 
 
 def get_app_config() -> dict:
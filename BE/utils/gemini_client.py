@@ -1,40 +1,137 @@
-import google.generativeai as genai
-from typing import Optional
-from utils.config import env
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from BE.utils.config import env
+
+
+def _genai():
+    """Import google.generativeai khi cần (import nặng, không chạy lúc import module)"""
+    import google.generativeai as genai
+    return genai
+
+
+class ModelRegistry:
+    """Bounded LRU registry of GenerativeModel objects keyed by (name, generation_config, safety_settings)"""
+
+    def __init__(self, max_size: int = 16):
+        self.max_size = max_size
+        self._models: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _freeze(value: Any) -> str:
+        """Turn a config dict/list into a stable, hashable key part"""
+        if value is None:
+            return ""
+        return json.dumps(value, sort_keys=True, default=str)
+
+    def get(self, model_name: str, generation_config: Optional[Dict[str, Any]] = None,
+            safety_settings: Optional[Any] = None):
+        """Get a cached model or build and cache a new one"""
+        key = (model_name, self._freeze(generation_config), self._freeze(safety_settings))
+
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+
+            self.misses += 1
+            model = _genai().GenerativeModel(
+                model_name,
+                generation_config=generation_config,
+                safety_settings=safety_settings
+            )
+            self._models[key] = model
+            if len(self._models) > self.max_size:
+                self._models.popitem(last=False)
+                self.evictions += 1
+            return model
+
+    def invalidate(self, model_name: Optional[str] = None):
+        """Drop cached models (all of them, or only those for model_name)"""
+        with self._lock:
+            if model_name is None:
+                self._models.clear()
+                return
+            for key in [k for k in self._models if k[0] == model_name]:
+                del self._models[key]
+
+    def stats(self) -> dict:
+        """Registry counters"""
+        return {
+            "size": len(self._models),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
 
 
 class GeminiAI:
-    """Gemini AI client singleton - similar to Node.js export pattern"""
-    
+    """
+    Gemini AI client singleton - similar to Node.js export pattern
+
+    genai được configure ở lần dùng đầu tiên (model / get_model / generate_content),
+    nên import module không cần GEMINI_API_KEY hay network
+    """
+
     _instance = None
     _model = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(GeminiAI, cls).__new__(cls)
             cls._instance._initialize()
         return cls._instance
-    
+
     def _initialize(self):
-        """Initialize Gemini AI with API key from environment"""
-        if not env.GEMINI_API_KEY:
-            raise ValueError("GEMINI_API_KEY is required")
-        
-        # Configure Gemini API
-        genai.configure(api_key=env.GEMINI_API_KEY)
-        
-        # Create default model
-        self._model = genai.GenerativeModel('gemini-2.5-flash')
-    
+        """Khởi tạo registry; chưa configure genai"""
+        # Memoized model objects, so requests don't rebuild GenerativeModel each time
+        self.registry = ModelRegistry()
+        self._configured = False
+        self._configure_lock = threading.Lock()
+
+    def _ensure_configured(self):
+        """Configure Gemini API với API key từ environment (một lần)"""
+        if self._configured:
+            return
+        with self._configure_lock:
+            if self._configured:
+                return
+            if not env.GEMINI_API_KEY:
+                raise ValueError("GEMINI_API_KEY is required")
+
+            # Configure Gemini API
+            _genai().configure(api_key=env.GEMINI_API_KEY)
+
+            # Create default model
+            self._model = self.registry.get('gemini-2.5-flash')
+            self._configured = True
+
+    @property
+    def is_configured(self) -> bool:
+        """genai đã được configure chưa"""
+        return self._configured
+
     @property
     def model(self):
         """Get the Gemini model instance"""
+        self._ensure_configured()
         return self._model
-    
+
     def generate_content(self, prompt: str, **kwargs):
-        return self._model.generate_content(prompt, **kwargs)
-    
-    def get_model(self, model_name: str = 'gemini-2.5-flash'):
-        return genai.GenerativeModel(model_name)
+        return self.model.generate_content(prompt, **kwargs)
+
+    def get_model(self, model_name: str = 'gemini-2.5-flash', generation_config: Optional[Dict[str, Any]] = None,
+                  safety_settings: Optional[Any] = None):
+        self._ensure_configured()
+        return self.registry.get(model_name, generation_config, safety_settings)
 # Create and export singleton instance (similar to Node.js default export)
 gemini_ai = GeminiAI()
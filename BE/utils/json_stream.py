@@ -0,0 +1,30 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+
+async def stream_json_object(
+    head: Dict[str, Any],
+    array_key: str,
+    items: AsyncIterator[Dict[str, Any]],
+    tail: Dict[str, Any] = None
+) -> AsyncIterator[str]:
+    """
+    Stream one JSON object whose `array_key` member is produced item by item
+
+    Output: {**head, array_key: [item, item, ...], **tail} without holding the array in memory
+    """
+    prefix = _dumps(head)[:-1]
+    separator = ", " if head else ""
+    yield f"{prefix}{separator}{_dumps(array_key)}: ["
+
+    first = True
+    async for item in items:
+        yield ("" if first else ", ") + _dumps(item)
+        first = False
+
+    suffix = "".join(f", {_dumps(key)}: {_dumps(value)}" for key, value in (tail or {}).items())
+    yield f"]{suffix}}}"
@@ -0,0 +1,120 @@
+"""
+LLM Response Cache - Content-addressed cache cho response của Gemini
+"""
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, Dict, Optional
+
+from BE.utils.config import env
+from BE.utils.ttl_cache import TTLCache
+
+
+class LLMResponseCache:
+    """
+    Cache response theo hash của (model, normalized prompt, generation params)
+
+    - Tầng 1: in-process LRU + TTL
+    - Tầng 2 (optional, LLM_CACHE_MONGO): llm_cache collection với TTL index
+    """
+
+    def __init__(self, enabled: bool = True, ttl_seconds: int = 3600, max_entries: int = 512,
+                 use_mongo: bool = False):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self.use_mongo = use_mongo
+        self.memory = TTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._mongo_repo = None
+        self.mongo_hits = 0
+
+    @staticmethod
+    def normalize_prompt(prompt: str) -> str:
+        """Chuẩn hóa prompt: bỏ khoảng trắng thừa để các prompt tương đương có cùng key"""
+        return re.sub(r"\s+", " ", prompt or "").strip()
+
+    def make_key(self, model_name: Optional[str], prompt: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """Tạo cache key (sha256) từ model, prompt đã chuẩn hóa và generation params"""
+        payload = json.dumps(
+            [model_name or "", self.normalize_prompt(prompt), params or {}],
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def mongo_repo(self):
+        """LLMCacheRepository (tạo lazy để không mở kết nối khi chỉ dùng tầng memory)"""
+        if self._mongo_repo is None and self.use_mongo:
+            from BE.repository.llm_cache_repo import LLMCacheRepository
+            self._mongo_repo = LLMCacheRepository()
+        return self._mongo_repo
+
+    def get(self, key: str) -> Optional[str]:
+        """Lấy response từ cache (memory trước, sau đó MongoDB)"""
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None or not self.use_mongo:
+            return value
+
+        value = self.mongo_repo.get(key)
+        if value is not None:
+            self.mongo_hits += 1
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key: str, response: str, model_name: Optional[str] = None):
+        """Lưu response vào tất cả các tầng cache"""
+        if not self.enabled or not response:
+            return
+
+        self.memory.set(key, response)
+        if self.use_mongo:
+            self.mongo_repo.set(key, response, model_name or "", self.ttl_seconds)
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() cho async callers - tầng MongoDB chạy trong thread để không block event loop"""
+        if not self.enabled:
+            return None
+
+        value = self.memory.get(key)
+        if value is not None or not self.use_mongo:
+            return value
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, response: str, model_name: Optional[str] = None):
+        """set() cho async callers"""
+        if not self.enabled or not response:
+            return
+
+        if self.use_mongo:
+            await asyncio.to_thread(self.set, key, response, model_name)
+        else:
+            self.memory.set(key, response)
+
+    def invalidate(self, key: str):
+        """Xóa một entry khỏi tất cả các tầng"""
+        self.memory.delete(key)
+        if self.use_mongo:
+            self.mongo_repo.delete(key)
+
+    def stats(self) -> dict:
+        """Cache counters"""
+        return {
+            "enabled": self.enabled,
+            "mongo_tier": self.use_mongo,
+            "memory": self.memory.stats(),
+            "mongo_hits": self.mongo_hits
+        }
+
+
+# Create and export singleton instance
+llm_cache = LLMResponseCache(
+    enabled=env.LLM_CACHE_ENABLED,
+    ttl_seconds=env.LLM_CACHE_TTL_SECONDS,
+    max_entries=env.LLM_CACHE_MAX_ENTRIES,
+    use_mongo=env.LLM_CACHE_MONGO
+)
@@ -0,0 +1,159 @@
+"""
+MongoDB connection manager - một MongoClient (có pool) cho mỗi URI trong process
+"""
+import threading
+from typing import Dict, Optional
+from urllib.parse import quote_plus
+
+from pymongo import MongoClient
+from pymongo.collection import Collection
+from pymongo.database import Database
+
+from BE.utils.config import env
+
+try:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+except ImportError:  # motor is optional - only needed by the async repositories
+    AsyncIOMotorClient = None
+    AsyncIOMotorCollection = None
+    AsyncIOMotorDatabase = None
+
+
+class MongoConnectionManager:
+    """MongoDB client manager singleton - similar to GeminiAI in gemini_client"""
+
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(MongoConnectionManager, cls).__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Khởi tạo registry client theo URI"""
+        self._clients: Dict[str, MongoClient] = {}
+        self._async_clients: Dict[str, "AsyncIOMotorClient"] = {}
+        self._transaction_support: Dict[str, bool] = {}
+        self._lock = threading.Lock()
+
+    def build_uri(self) -> str:
+        """
+        Tạo MongoDB URI từ EnvironmentConfig (ưu tiên MONGODB_URI nếu có)
+
+        directConnection chỉ thêm vào URI ghép từ host/port (một node); MONGODB_URI
+        giữ nguyên options của nó (mongodb+srv, replica set discovery)
+        """
+        if env.MONGODB_URI:
+            return env.MONGODB_URI
+
+        password_encoded = quote_plus(env.MONGO_PASSWORD)
+        return (
+            f"mongodb://{env.MONGO_USERNAME}:{password_encoded}@{env.MONGO_HOST}:{env.MONGO_PORT}/"
+            f"{env.MONGO_DATABASE}?authSource=admin&directConnection=true"
+        )
+
+    def get_client(self, uri: Optional[str] = None) -> MongoClient:
+        """
+        Lấy MongoClient dùng chung cho URI (tạo mới ở lần gọi đầu tiên)
+
+        Args:
+            uri: MongoDB URI (default: URI từ EnvironmentConfig)
+
+        Returns:
+            MongoClient: Client có connection pool dùng chung
+        """
+        uri = uri or self.build_uri()
+        client = self._clients.get(uri)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(uri)
+            if client is None:
+                client = MongoClient(uri, **self._client_options())
+                self._clients[uri] = client
+            return client
+
+    def _client_options(self) -> dict:
+        """Options dùng chung cho MongoClient và AsyncIOMotorClient"""
+        return {
+            "serverSelectionTimeoutMS": env.MONGO_TIMEOUT_MS,
+            "connectTimeoutMS": env.MONGO_TIMEOUT_MS,
+            "maxPoolSize": env.MONGO_MAX_POOL_SIZE,
+            "minPoolSize": env.MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": env.MONGO_MAX_IDLE_TIME_MS
+        }
+
+    def get_async_client(self, uri: Optional[str] = None) -> "AsyncIOMotorClient":
+        """
+        Lấy AsyncIOMotorClient (motor) dùng chung cho URI
+
+        Raises:
+            ImportError: Nếu motor chưa được cài đặt
+        """
+        if AsyncIOMotorClient is None:
+            raise ImportError("motor is required for async repositories: pip install motor")
+
+        uri = uri or self.build_uri()
+        client = self._async_clients.get(uri)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._async_clients.get(uri)
+            if client is None:
+                client = AsyncIOMotorClient(uri, **self._client_options())
+                self._async_clients[uri] = client
+            return client
+
+    def get_async_database(self, database: Optional[str] = None,
+                           uri: Optional[str] = None) -> "AsyncIOMotorDatabase":
+        """Lấy async database (default: MONGO_DATABASE)"""
+        return self.get_async_client(uri)[database or env.MONGO_DATABASE]
+
+    def get_async_collection(self, collection_name: str, database: Optional[str] = None,
+                             uri: Optional[str] = None) -> "AsyncIOMotorCollection":
+        """Lấy async collection từ motor client dùng chung"""
+        return self.get_async_database(database, uri)[collection_name]
+
+    def supports_transactions(self, uri: Optional[str] = None) -> bool:
+        """
+        Server có hỗ trợ multi-document transaction không (replica set hoặc mongos)
+
+        Kết quả được cache theo URI; MONGO_TRANSACTIONS=false để tắt hẳn
+        """
+        if not env.MONGO_TRANSACTIONS:
+            return False
+
+        uri = uri or self.build_uri()
+        supported = self._transaction_support.get(uri)
+        if supported is None:
+            hello = self.get_client(uri).admin.command("hello")
+            supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+            self._transaction_support[uri] = supported
+        return supported
+
+    def get_database(self, database: Optional[str] = None, uri: Optional[str] = None) -> Database:
+        """Lấy database (default: MONGO_DATABASE)"""
+        return self.get_client(uri)[database or env.MONGO_DATABASE]
+
+    def get_collection(self, collection_name: str, database: Optional[str] = None,
+                       uri: Optional[str] = None) -> Collection:
+        """Lấy collection từ client dùng chung"""
+        return self.get_database(database, uri)[collection_name]
+
+    def close(self):
+        """Đóng tất cả clients (gọi khi app shutdown)"""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            for client in self._async_clients.values():
+                client.close()
+            self._clients.clear()
+            self._async_clients.clear()
+            self._transaction_support.clear()
+
+
+# Create and export singleton instance (similar to gemini_ai)
+mongo_manager = MongoConnectionManager()
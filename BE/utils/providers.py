@@ -0,0 +1,127 @@
+"""
+Providers - Lazy singletons cho services/clients dùng ở module level
+
+Controller khai báo `service = lazy(ConservationService)` thay vì tạo service
+lúc import: instance (và Mongo/Gemini clients bên trong) chỉ được tạo ở lần
+truy cập attribute đầu tiên, hoặc ở startup hook qua warm_up().
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar, cast
+
+T = TypeVar("T")
+
+
+class LazyProvider(Generic[T]):
+    """Tạo instance ở lần dùng đầu tiên; truy cập attribute được chuyển tới instance"""
+
+    def __init__(self, name: str, factory: Callable[[], T]):
+        self._name = name
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._init_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        """Lấy instance (tạo nếu chưa có)"""
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                started = time.perf_counter()
+                self._instance = self._factory()
+                self._init_seconds = time.perf_counter() - started
+            return self._instance
+
+    @property
+    def created(self) -> bool:
+        """Instance đã được tạo chưa"""
+        return self._instance is not None
+
+    def override(self, instance: T):
+        """Dùng instance có sẵn (test/fake) thay cho factory"""
+        with self._lock:
+            self._instance = instance
+            self._init_seconds = 0.0
+
+    def reset(self):
+        """Bỏ instance hiện tại, lần dùng sau tạo lại"""
+        with self._lock:
+            self._instance = None
+            self._init_seconds = None
+
+    def stats(self) -> dict:
+        """Trạng thái provider"""
+        return {
+            "created": self.created,
+            "init_ms": round(self._init_seconds * 1000, 2) if self._init_seconds is not None else None
+        }
+
+    def __getattr__(self, item: str) -> Any:
+        # Chỉ được gọi khi attribute không có trên provider -> chuyển tới instance
+        if item.startswith("__"):
+            raise AttributeError(item)
+        return getattr(self.get(), item)
+
+    def __setattr__(self, key: str, value: Any):
+        # Attribute public (vd gán fake repo trong test) được gán lên instance
+        if key.startswith("_"):
+            object.__setattr__(self, key, value)
+        else:
+            setattr(self.get(), key, value)
+
+    def __repr__(self) -> str:
+        return f"LazyProvider(name={self._name}, created={self.created})"
+
+
+_providers: Dict[str, LazyProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def lazy(factory: Callable[[], T], name: Optional[str] = None) -> T:
+    """
+    Đăng ký provider và trả về proxy dùng như instance
+
+    Args:
+        factory: Hàm/class tạo instance (không tham số)
+        name: Tên provider (default: module.qualname của factory); cùng tên -> dùng chung provider
+    """
+    if name is None:
+        qualname = getattr(factory, "__qualname__", None) or repr(factory)
+        name = f"{getattr(factory, '__module__', '')}.{qualname}".lstrip(".")
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = LazyProvider(name, factory)
+            _providers[name] = provider
+    return cast(T, provider)
+
+
+def get_provider(name: str) -> Optional[LazyProvider]:
+    """Lấy provider theo tên"""
+    return _providers.get(name)
+
+
+def warm_up() -> Dict[str, Optional[str]]:
+    """
+    Tạo tất cả providers đã đăng ký (gọi trong startup hook, chạy trong thread)
+
+    Returns:
+        Dict: tên provider -> lỗi (None nếu tạo thành công)
+    """
+    errors: Dict[str, Optional[str]] = {}
+    for name, provider in list(_providers.items()):
+        try:
+            provider.get()
+            errors[name] = None
+        except Exception as e:
+            # Provider lỗi sẽ được thử lại ở lần dùng đầu tiên
+            errors[name] = str(e)
+    return errors
+
+
+def provider_stats() -> Dict[str, dict]:
+    """Trạng thái + thời gian khởi tạo của các providers"""
+    return {name: provider.stats() for name, provider in _providers.items()}
@@ -0,0 +1,21 @@
+import json
+from typing import Any, AsyncIterator, Tuple
+
+# Headers that stop proxies (nginx, Railway) from buffering the event stream
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event frame with a JSON payload"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """Turn an async iterator of (event, data) tuples into SSE frames"""
+    async for event, data in events:
+        yield format_sse(event, data)
@@ -0,0 +1,110 @@
+"""
+Step DAG - Chạy các bước async của agent theo dependency
+
+Các bước không phụ thuộc nhau chạy song song (latency ~ max thay vì tổng).
+Callback on_done của một bước có thể hủy bước đang chạy hoặc thêm bước mới
+(vd intent trả về ANALYZE -> hủy generate, chạy analyze).
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+# Step nhận kết quả của các bước đã xong (name -> result)
+StepFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+StepCallback = Callable[[Any, "StepDAG"], None]
+
+
+@dataclass
+class Step:
+    """Một bước trong DAG"""
+    name: str
+    func: StepFunc
+    depends_on: Tuple[str, ...] = ()
+    on_done: Optional[StepCallback] = None
+
+
+class StepDAG:
+    """
+    Executor nhỏ cho các bước async có dependency
+
+    - add(): khai báo bước (có thể gọi trong lúc run, từ on_done)
+    - cancel(): hủy bước (và các bước phụ thuộc nó)
+    - run(): chạy tới khi không còn bước nào; lỗi của một bước hủy các bước còn lại
+      rồi được raise lại
+    """
+
+    def __init__(self):
+        self._steps: Dict[str, Step] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._started: Dict[str, float] = {}
+        self.results: Dict[str, Any] = {}
+        self.cancelled: Set[str] = set()
+        self.timings: Dict[str, float] = {}  # name -> thời gian chạy (ms)
+
+    def add(self, name: str, func: StepFunc, depends_on: Iterable[str] = (),
+            on_done: Optional[StepCallback] = None) -> "StepDAG":
+        """Khai báo bước mới"""
+        if name in self._steps:
+            raise ValueError(f"Step '{name}' đã tồn tại")
+        self._steps[name] = Step(name, func, tuple(depends_on), on_done)
+        return self
+
+    def cancel(self, name: str):
+        """Hủy bước (đang chạy hoặc chưa chạy) và các bước phụ thuộc"""
+        if name in self.cancelled or name in self.results:
+            return
+        self.cancelled.add(name)
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+        for step in list(self._steps.values()):
+            if name in step.depends_on:
+                self.cancel(step.name)
+
+    def _start_ready_steps(self):
+        """Start các bước đã đủ dependency"""
+        for step in list(self._steps.values()):
+            if step.name in self.results or step.name in self._tasks or step.name in self.cancelled:
+                continue
+            if all(dep in self.results for dep in step.depends_on):
+                self._started[step.name] = time.perf_counter()
+                self._tasks[step.name] = asyncio.ensure_future(step.func(dict(self.results)))
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Chạy DAG
+
+        Returns:
+            Dict: name -> kết quả (không có các bước đã bị hủy)
+
+        Raises:
+            ValueError: Nếu có bước không bao giờ chạy được (dependency thiếu hoặc vòng)
+        """
+        try:
+            while True:
+                self._start_ready_steps()
+                if not self._tasks:
+                    break
+
+                done, _ = await asyncio.wait(set(self._tasks.values()), return_when=asyncio.FIRST_COMPLETED)
+                for name, task in list(self._tasks.items()):
+                    # Bước có thể đã bị hủy bởi on_done của bước khác trong cùng vòng
+                    if task not in done or self._tasks.get(name) is not task:
+                        continue
+                    del self._tasks[name]
+                    self.results[name] = task.result()
+                    self.timings[name] = round((time.perf_counter() - self._started[name]) * 1000, 2)
+
+                    step = self._steps[name]
+                    if step.on_done is not None:
+                        step.on_done(self.results[name], self)
+
+            blocked = [name for name in self._steps if name not in self.results and name not in self.cancelled]
+            if blocked:
+                raise ValueError(f"Steps không chạy được (dependency thiếu hoặc vòng): {blocked}")
+            return self.results
+        finally:
+            for task in self._tasks.values():
+                task.cancel()
+            self._tasks.clear()
@@ -0,0 +1,76 @@
+from typing import List, Tuple
+
+FENCE = "```"
+
+
+class CodeFenceStreamParser:
+    """
+    Incremental parser for streamed LLM output
+
+    Splits text into ``explanation`` and ``code`` events as soon as the first
+    markdown code fence boundaries are seen, mirroring
+    CodeGenerationService._parse_generation_response (first fenced block is the code).
+    Fence markers split across chunks are held back until they can be decided.
+    """
+
+    TEXT = "text"
+    FENCE_HEADER = "fence_header"
+    CODE = "code"
+    AFTER = "after"
+
+    def __init__(self):
+        self.state = self.TEXT
+        self.language = None
+        self._buffer = ""
+
+    @staticmethod
+    def _pending_backticks(text: str) -> int:
+        """Number of trailing backticks (max 2) that may be the start of a fence"""
+        count = 0
+        while count < len(FENCE) - 1 and count < len(text) and text[-1 - count] == "`":
+            count += 1
+        return count
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Consume a chunk and return the events that can be emitted so far"""
+        events: List[Tuple[str, str]] = []
+        self._buffer += chunk or ""
+
+        while self._buffer:
+            if self.state == self.AFTER:
+                events.append(("explanation", self._buffer))
+                self._buffer = ""
+
+            elif self.state == self.FENCE_HEADER:
+                newline = self._buffer.find("\n")
+                if newline == -1:
+                    break
+                self.language = self._buffer[:newline].strip() or None
+                self._buffer = self._buffer[newline + 1:]
+                self.state = self.CODE
+
+            else:
+                event = "code" if self.state == self.CODE else "explanation"
+                index = self._buffer.find(FENCE)
+                if index == -1:
+                    keep = self._pending_backticks(self._buffer)
+                    ready = self._buffer[:len(self._buffer) - keep]
+                    if ready:
+                        events.append((event, ready))
+                    self._buffer = self._buffer[len(ready):]
+                    break
+
+                if index:
+                    events.append((event, self._buffer[:index]))
+                self._buffer = self._buffer[index + len(FENCE):]
+                self.state = self.FENCE_HEADER if self.state == self.TEXT else self.AFTER
+
+        return events
+
+    def finish(self) -> List[Tuple[str, str]]:
+        """Flush whatever is still buffered at the end of the stream"""
+        if not self._buffer:
+            return []
+        event = "code" if self.state in (self.CODE, self.FENCE_HEADER) else "explanation"
+        text, self._buffer = self._buffer, ""
+        return [(event, text)]
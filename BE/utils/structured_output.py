@@ -0,0 +1,207 @@
+"""
+Structured Output - JSON schema cho Gemini structured output + parser JSON dễ dãi
+
+- gemini_schema(): chuyển pydantic model thành response_schema của Gemini
+  (OpenAPI subset: không $ref/anyOf, type viết hoa, nullable)
+- loads_lenient(): parse JSON từ response của model, sửa các lỗi hay gặp
+  (code fence, text thừa trước/sau, trailing comma, comment, nháy đơn,
+  True/False/None, JSON bị cắt giữa chừng)
+- JsonParseMetrics: đếm số lần parse thành công theo từng cách
+"""
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from pydantic import BaseModel
+
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)```", re.DOTALL)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+# ==================== SCHEMA ====================
+
+def _convert_schema(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển một node JSON schema (pydantic) sang schema của Gemini"""
+    if "$ref" in node:
+        return _convert_schema(defs[node["$ref"].split("/")[-1]], defs)
+
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        result = _convert_schema(options[0], defs) if len(options) == 1 else {"type": "STRING"}
+        if len(options) < len(node["anyOf"]):
+            result["nullable"] = True
+        if "description" in node:
+            result.setdefault("description", node["description"])
+        return result
+
+    result: Dict[str, Any] = {}
+    if "type" in node:
+        result["type"] = node["type"].upper()
+    if "description" in node:
+        result["description"] = node["description"]
+    if "enum" in node:
+        result["enum"] = list(node["enum"])
+    if "items" in node:
+        result["items"] = _convert_schema(node["items"], defs)
+    if "properties" in node:
+        result["type"] = "OBJECT"
+        result["properties"] = {
+            name: _convert_schema(child, defs) for name, child in node["properties"].items()
+        }
+        if node.get("required"):
+            result["required"] = list(node["required"])
+    return result
+
+
+def gemini_schema(model: Type[BaseModel], fields: Optional[Iterable[str]] = None,
+                  required: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    response_schema cho Gemini từ pydantic model
+
+    Args:
+        fields: Chỉ giữ các field này (default: tất cả)
+        required: Các field bắt buộc có trong output (giá trị vẫn có thể null nếu nullable)
+    """
+    source = model.model_json_schema()
+    schema = _convert_schema(source, source.get("$defs", {}))
+    if fields is not None:
+        keep = list(fields)
+        schema["properties"] = {name: schema["properties"][name] for name in keep if name in schema["properties"]}
+    if required is not None:
+        schema["required"] = [name for name in required if name in schema["properties"]]
+    else:
+        schema.pop("required", None)
+    return schema
+
+
+# ==================== LENIENT PARSER ====================
+
+def _strip_trailing_comma(out: List[str]):
+    """Bỏ dấu phẩy (và khoảng trắng) ngay trước dấu đóng ngoặc"""
+    while out and out[-1].isspace():
+        out.pop()
+    if out and out[-1] == ",":
+        out.pop()
+
+
+def _repair(text: str, start: int) -> str:
+    """Quét từ '{'/'[' tại start tới ngoặc đóng tương ứng và sửa cú pháp trên đường đi"""
+    out: List[str] = []
+    stack: List[str] = []
+    quote: Optional[str] = None
+    i = start
+    n = len(text)
+
+    while i < n:
+        ch = text[i]
+
+        if quote is not None:
+            if ch == "\\" and i + 1 < n:
+                # \' chỉ hợp lệ trong string nháy đơn, JSON không có escape này
+                out.append("'" if text[i + 1] == "'" else text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                out.append('"')
+                quote = None
+            elif ch == '"':
+                # Nháy kép bên trong string nháy đơn
+                out.append('\\"')
+            else:
+                out.append(ch)
+            i += 1
+            continue
+
+        if ch in "\"'":
+            quote = ch
+            out.append('"')
+        elif ch == "/" and text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = n if newline == -1 else newline
+            continue
+        elif ch == "/" and text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+            continue
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            out.append(ch)
+        elif ch in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+        elif ch.isalpha():
+            match = re.match(r"[A-Za-z_]+", text[i:])
+            word = match.group(0)
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(ch)
+        i += 1
+
+    # JSON bị cắt giữa chừng: đóng string và các ngoặc còn mở
+    if quote is not None:
+        out.append('"')
+    while stack:
+        _strip_trailing_comma(out)
+        out.append(stack.pop())
+    return "".join(out)
+
+
+def loads_lenient(text: str) -> Optional[Any]:
+    """
+    Parse JSON object/array đầu tiên trong text, sửa các lỗi cú pháp hay gặp
+
+    Returns:
+        Giá trị đã parse, None nếu không sửa được
+    """
+    if not text:
+        return None
+
+    fenced = _FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index != -1]
+    if not starts:
+        return None
+
+    try:
+        return json.loads(_repair(text, min(starts)), strict=False)
+    except ValueError:
+        return None
+
+
+# ==================== METRICS ====================
+
+class JsonParseMetrics:
+    """Đếm kết quả parse theo cách thành công: structured / strict / repaired / failed"""
+
+    PATHS = ("structured", "strict", "repaired", "failed")
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, path: str):
+        with self._lock:
+            self._counts[path] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = {path: self._counts[path] for path in self.PATHS}
+        total = sum(counts.values())
+        counts["total"] = total
+        counts["failure_rate"] = round(counts["failed"] / total, 4) if total else 0.0
+        return counts
+
+
+# Create and export singleton instance
+json_parse_metrics = JsonParseMetrics()
@@ -0,0 +1,27 @@
+"""
+Text Normalize - Chuẩn hóa text cho search (bỏ dấu tiếng Việt, lowercase)
+"""
+import re
+import unicodedata
+from typing import Iterable
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Chuẩn hóa text: bỏ dấu (kể cả đ -> d), lowercase, chỉ giữ chữ/số
+
+    Ví dụ: "Xây dựng API Đăng nhập" -> "xay dung api dang nhap"
+    """
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return _NON_WORD.sub(" ", stripped.lower()).strip()
+
+
+def normalize_many(texts: Iterable[str]) -> str:
+    """Chuẩn hóa và nối nhiều đoạn text"""
+    return " ".join(part for part in (normalize_text(text) for text in texts) if part)
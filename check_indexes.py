@@ -0,0 +1,46 @@
+"""
+Diagnostic: tạo index đã khai báo và explain() mọi query shape của repositories
+Báo các query đang COLLSCAN (full scan) hoặc sort trong memory
+
+Usage:
+    python check_indexes.py            # chỉ explain
+    python check_indexes.py --ensure   # tạo index trước rồi explain
+"""
+import sys
+
+from BE.repository.index_manager import index_manager
+from BE.utils.mongo_client import mongo_manager
+
+
+def check_indexes(ensure: bool = False):
+    """Explain các query shape và in kết quả"""
+    try:
+        if ensure:
+            for collection, names in index_manager.ensure_indexes().items():
+                print(f"✅ {collection}: {', '.join(names)}")
+
+        reports = index_manager.explain_query_shapes()
+        for report in reports:
+            label = f"{report['collection']}.{report['query']}"
+            if report["error"]:
+                print(f"⚠️  {label}: {report['error']}")
+            elif report["collscan"]:
+                print(f"❌ {label}: COLLSCAN ({' -> '.join(report['stages'])})")
+            elif report["in_memory_sort"]:
+                print(f"⚠️  {label}: in-memory SORT ({' -> '.join(report['stages'])})")
+            else:
+                print(f"✅ {label}: {', '.join(report['indexes'])}")
+
+        collscans = index_manager.find_collscans(reports)
+        print(f"\n{len(reports)} query shape(s), {len(collscans)} COLLSCAN")
+        return not collscans
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+    finally:
+        mongo_manager.close()
+
+
+if __name__ == "__main__":
+    ok = check_indexes(ensure="--ensure" in sys.argv)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,73 @@
+"""
+Diagnostic: đo thời gian import của app và thời gian khởi tạo các lazy providers
+
+Import chạy trong subprocess với `python -X importtime` (mỗi lần đo là một
+interpreter mới, không bị ảnh hưởng bởi module đã cache), in các module chậm nhất.
+
+Usage:
+    python measure_startup.py                  # đo import BE.app
+    python measure_startup.py BE.main          # đo module khác
+    python measure_startup.py --warm-up        # thêm: tạo providers và in init time
+"""
+import subprocess
+import sys
+import time
+
+TOP_N = 15
+
+
+def measure_import(module: str):
+    """Chạy `python -X importtime -c "import module"` và in các import chậm nhất"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [part.strip() for part in line.replace("import time:", "|", 1).split("|")]
+            rows.append((int(cumulative_us), int(self_us), name.strip()))
+        except ValueError:
+            continue
+
+    if result.returncode != 0:
+        error = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+        print(f"❌ import {module} failed:")
+        print("\n".join(error[-5:]))
+        return False
+
+    total = max((cumulative for cumulative, _, name in rows if name == module), default=0)
+    print(f"✅ import {module}: {total / 1000:.1f} ms")
+    print(f"\nTop {TOP_N} cumulative imports:")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:TOP_N]:
+        print(f"  {cumulative / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+    return True
+
+
+def measure_warm_up(module: str):
+    """Import module rồi tạo tất cả providers, in thời gian khởi tạo từng provider"""
+    started = time.perf_counter()
+    __import__(module)
+    print(f"\nimport {module} (in-process): {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    from BE.utils.providers import provider_stats, warm_up
+    errors = warm_up()
+    for name, stats in provider_stats().items():
+        if errors.get(name):
+            print(f"  ⚠️  {name}: {errors[name]}")
+        else:
+            print(f"  ✅ {name}: {stats['init_ms']} ms")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    target = args[0] if args else "BE.app"
+    ok = measure_import(target)
+    if ok and "--warm-up" in sys.argv:
+        measure_warm_up(target)
+    sys.exit(0 if ok else 1)
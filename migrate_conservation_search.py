@@ -0,0 +1,24 @@
+"""
+Migration: tạo field search (title/goal/facts đã bỏ dấu) cho conservations cũ
+Cần chạy một lần để text index search_text bao phủ dữ liệu có sẵn; có thể chạy lại an toàn
+"""
+from BE.repository.conservation_repo import ConservationRepository
+from BE.utils.mongo_client import mongo_manager
+
+
+def migrate():
+    """Backfill field search cho conservations chưa có"""
+    try:
+        repo = ConservationRepository()
+        updated = repo.backfill_search_fields()
+        print(f"✅ Backfilled search fields of {updated} conservation(s)")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+    finally:
+        mongo_manager.close()
+
+
+if __name__ == "__main__":
+    migrate()
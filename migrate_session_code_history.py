@@ -0,0 +1,24 @@
+"""
+Migration: chuyển sessions.code_history (embedded array) sang collection session_code_history
+Chạy một lần sau khi deploy; có thể chạy lại an toàn
+"""
+from BE.repository.session_repo import SessionRepository
+from BE.utils.mongo_client import mongo_manager
+
+
+def migrate():
+    """Migrate toàn bộ sessions còn code_history embedded"""
+    try:
+        repo = SessionRepository()
+        migrated = repo.migrate_embedded_code_history()
+        print(f"✅ Migrated code history of {migrated} session(s)")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+    finally:
+        mongo_manager.close()
+
+
+if __name__ == "__main__":
+    migrate()
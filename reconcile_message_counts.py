@@ -0,0 +1,25 @@
+"""
+Reconcile: tính lại messageCount của conservations từ messages collection
+Chạy khi counter bị lệch (server không có transaction, xóa messages trực tiếp trong DB...)
+App cũng tự chạy định kỳ theo MESSAGE_COUNT_RECONCILE_INTERVAL_SECONDS; có thể chạy lại an toàn
+"""
+from BE.repository.conservation_repo import ConservationRepository
+from BE.utils.mongo_client import mongo_manager
+
+
+def reconcile():
+    """Sửa messageCount bị lệch"""
+    try:
+        repo = ConservationRepository()
+        result = repo.reconcile_message_counts()
+        print(f"✅ Checked {result['checked']} conservation(s), fixed {result['fixed']}")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        return False
+    finally:
+        mongo_manager.close()
+
+
+if __name__ == "__main__":
+    reconcile()